@@ -1,49 +1,62 @@
-from flask import Flask, request, jsonify, current_app
+from flask import Flask, request, jsonify, g
 from flask_cors import CORS
-from logica import reservas
 from logica.auth import auth_bp
 from sqlalchemy import text
-from logica.negocios import obtener_tipo_negocio_por_tenant
-from config.bd import engine, Base
+from logica.negocios import obtener_tipo_negocio, cache_tenants
+from logica.versiones import cache_disponibilidad
+from logica.singleflight import vuelos_disponibilidad
+from config.bd import engine, Base, obtener_db, obtener_db_lectura, cerrar_db, marcar_lectura_primario
+from config.seguridad import JWT_SECRET_KEY, ORIGENES_CORS, CABECERAS_EXPUESTAS
+from config.serializacion import ProveedorJSON
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity, get_jwt
 from functools import wraps
-from logica.reservas.factory import *
+from logica.reservas.factory import obtener_reserva_handler, registro_reservas
+from logica.reservas.disponibilidad import DISPONIBILIDAD_MAX_DIAS
+from logica.reservas.indice_ocupacion import (
+    INDICE_OCUPACION, calentar_indice_ocupacion, registrar_lugar_nuevo, indice_ocupacion, iniciar_revision
+)
+from logica.reservas.paginacion import leer_filtros, siguiente_cursor, CABECERA_CURSOR
+from logica.streaming import formato_stream, filas_por_lotes, respuesta_stream
+from logica.exportacion import formato_exportacion, respuesta_exportacion
+from logica.importacion import archivo_de_peticion
+from logica.etag import etag_peticion, no_modificada, con_etag, estadisticas as estadisticas_etag
 from logica.decoradores import *
-from logica.admin.lugares_admin import actualizar_lugar_admin, eliminar_lugar_admin, listar_lugares_admin
+from logica.admin.lugares_admin import actualizar_lugar_admin, eliminar_lugar_admin, listar_lugares_admin, importar_lugares_admin
 from logica.admin.admin_factory import obtener_admin_handler
 import traceback # Importa traceback
 from init_db import inicializar_base_de_datos
 import os
 
 app = Flask(__name__)
+# jsonify con orjson si está instalado (ver config/serializacion.py)
+app.json = ProveedorJSON(app)
 
-origins = [
-    "http://localhost:3000",
-    "https://reservas.systempiura.com",
-    "http://reservas.systempiura.com"
-]
-CORS(app, origins=origins, supports_credentials=True)
+CORS(app, origins=ORIGENES_CORS, supports_credentials=True, expose_headers=CABECERAS_EXPUESTAS)
 
 # JWT Configuración
-app.config['JWT_SECRET_KEY'] = 'supersecreto'
+app.config['JWT_SECRET_KEY'] = JWT_SECRET_KEY
 jwt = JWTManager(app)
 
 # Inicializar tablas
 #Base.metadata.create_all(bind=engine)
 
 # =========================================================================
-# MANTENIENDO TU PATRÓN DE CONEXIÓN GLOBAL
+# CONEXIONES DEL POOL: UNA POR PETICIÓN
 # =========================================================================
 with app.app_context():
     # 1. Llama a tu script de inicialización
     if os.getenv("RUN_INIT_DB", "true").lower() == "true":
          inicializar_base_de_datos()
-    
-    # 2. Establece tu conexión global que usa el resto de la app
-    print("Estableciendo conexión de BD global para la app Flask...")
-    current_app.db = engine.connect()
-    current_app.db.commit() # Limpia la transacción
-    print("✅ Conexión de BD global lista.")
+    # 2. Índice de ocupación en memoria (opcional, ver indice_ocupacion.py)
+    if INDICE_OCUPACION:
+        with engine.connect() as conexion:
+            calentar_indice_ocupacion(conexion)
+        iniciar_revision(engine)
+
+# 3. Cada petición usa obtener_db() (o obtener_db_lectura() en las rutas GET)
+#    y la conexión vuelve al pool al terminar
+app.teardown_appcontext(cerrar_db)
+app.after_request(marcar_lectura_primario)
 
 
 #==========================login ================================================
@@ -66,9 +79,11 @@ def admin_required(fn):
 @app.errorhandler(Exception)
 def handle_exception(e):
     # Manejador de errores global
-    # Intenta hacer rollback en la conexión compartida
+    # Intenta hacer rollback en las conexiones que haya abierto esta petición
     try:
-        current_app.db.rollback()
+        for db in (g.get("db"), g.get("db_lectura")):
+            if db is not None:
+                db.rollback()
     except Exception as rb_e:
         print(f"Error durante el rollback en el manejador de errores: {rb_e}")
         
@@ -80,20 +95,21 @@ def handle_exception(e):
 @app.route('/api/usuario/info', methods=['GET'])
 @jwt_required()
 def obtener_info_usuario():
+    db = obtener_db_lectura()
     try:
         usuario_id = get_jwt_identity()
         query = text("SELECT id, nombre, correo, rol_id, tenant_id FROM usuarios WHERE id = :usuario_id")
-        result = current_app.db.execute(query, {"usuario_id": usuario_id}).fetchone()
+        result = db.execute(query, {"usuario_id": usuario_id}).fetchone()
         
         # Hacemos commit para cerrar la transacción de este SELECT
-        current_app.db.commit() 
+        db.commit() 
         
         if result:
             return jsonify(dict(result._mapping))
         else:
             return jsonify({"error": "Sesión inválida. Usuario no encontrado."}), 401
     except Exception as e:
-        current_app.db.rollback() # <-- ¡LA SOLUCIÓN!
+        db.rollback() # <-- ¡LA SOLUCIÓN!
         traceback.print_exc()
         return jsonify({"error": f"Error en base de datos: {str(e)}"}), 500
 
@@ -104,16 +120,17 @@ def obtener_info_usuario():
 @jwt_required()
 @extraer_identidad
 def hacer_reserva(identidad):
+    db = obtener_db()
     try:
         datos = request.json
         tenant_id = identidad["tenant_id"]
         usuario_id = identidad["usuario_id"]
 
-        tipo_negocio = obtener_tipo_negocio_por_tenant(tenant_id)
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
         if not tipo_negocio:
             return jsonify({"error": "No se pudo obtener el tipo de negocio. Verifica los datos."}), 400
 
-        handler = obtener_reserva_handler(tipo_negocio, db=current_app.db, tenant_id=tenant_id)
+        handler = obtener_reserva_handler(tipo_negocio, db=db, tenant_id=tenant_id)
 
         datos['usuario_id'] = usuario_id
         datos['tenant_id'] = tenant_id 
@@ -122,32 +139,59 @@ def hacer_reserva(identidad):
         # Asumiendo que crear_reserva hace commit/rollback
         return jsonify(resultado)
     except Exception as e:
-        current_app.db.rollback() # <-- ¡LA SOLUCIÓN!
+        db.rollback() # <-- ¡LA SOLUCIÓN!
         traceback.print_exc()
         return jsonify({"error": f"Error al crear reserva: {str(e)}"}), 500
 
 #==============================listar reservas ============================================================
 
+def con_cursor(respuesta, reservas, filtros):
+    # La lista va en el cuerpo como siempre; el cursor de la página siguiente, en la cabecera
+    cursor = siguiente_cursor(reservas, filtros)
+    if cursor:
+        respuesta.headers[CABECERA_CURSOR] = cursor
+    return respuesta
+
 ## RUTA REFACTORIZADA ##
 @app.route('/api/reservas', methods=['GET'])
 @jwt_required()
 @extraer_identidad
 def listar_reservas(identidad):
+    """
+    ?limite=100&cursor=...&desde=YYYY-MM-DD&hasta=YYYY-MM-DD&lugar_id=..&tipo_embarcacion=..
+    Si hay más páginas, la cabecera X-Siguiente-Cursor trae el cursor de la siguiente.
+    Con &stream=json|ndjson devuelve todas las filas por trozos (sin límite por defecto).
+    """
+    try:
+        formato = formato_stream(request)
+        filtros = leer_filtros(request.args, stream=formato is not None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db = obtener_db_lectura()
     try:
         tenant_id = identidad["tenant_id"]
         usuario_id = identidad["usuario_id"] # <-- Aquí tienes el ID
-        tipo_negocio = obtener_tipo_negocio_por_tenant(tenant_id)
-        handler = obtener_reserva_handler(tipo_negocio, db=current_app.db, tenant_id=tenant_id)
+        etag = etag_peticion(db, tenant_id, usuario_id)
+        respuesta = no_modificada(etag)
+        if respuesta:
+            db.commit()
+            return respuesta
+
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        handler = obtener_reserva_handler(tipo_negocio, db=db, tenant_id=tenant_id)
         
         # --- CAMBIO AQUÍ ---
         # Ya no necesitamos el 'if hasattr'.
         # Pasamos el usuario_id directamente como argumento.
-        reservas = handler.listar_reservas(usuario_id=usuario_id)
+        reservas = handler.listar_reservas(usuario_id=usuario_id, filtros=filtros, stream=formato is not None)
+        if formato:
+            return con_etag(respuesta_stream(db, reservas, formato), etag)
         
-        current_app.db.commit() # <-- Cierra la transacción
-        return jsonify(reservas)
+        db.commit() # <-- Cierra la transacción
+        return con_etag(con_cursor(jsonify(reservas), reservas, filtros), etag)
     except Exception as e:
-        current_app.db.rollback() # <-- ¡LA SOLUCIÓN!
+        db.rollback() # <-- ¡LA SOLUCIÓN!
         traceback.print_exc()
         return jsonify({"error": f"Error al listar reservas: {str(e)}"}), 500
 
@@ -155,14 +199,21 @@ def listar_reservas(identidad):
 @app.route('/api/admin/lugares', methods=['GET'])
 @admin_required
 def listar_lugares_admin_route():
+    db = obtener_db_lectura()
     try:
         identidad = get_jwt()
         tenant_id = identidad.get("tenant_id")
-        resultado = listar_lugares_admin(tenant_id) # Asumiendo que esta usa current_app.db
-        current_app.db.commit() # <-- Cierra la transacción
-        return jsonify(resultado)
+        etag = etag_peticion(db, tenant_id, get_jwt_identity())
+        respuesta = no_modificada(etag)
+        if respuesta:
+            db.commit()
+            return respuesta
+
+        resultado = listar_lugares_admin(db, tenant_id)
+        db.commit() # <-- Cierra la transacción
+        return con_etag(jsonify(resultado), etag)
     except Exception as e:
-        current_app.db.rollback() # <-- ¡LA SOLUCIÓN!
+        db.rollback() # <-- ¡LA SOLUCIÓN!
         traceback.print_exc()
         return jsonify({"error": f"Error al listar lugares: {str(e)}"}), 500
 
@@ -173,6 +224,7 @@ def listar_lugares_admin_route():
 @jwt_required()
 @extraer_identidad
 def consultar_disponibilidad(identidad):
+    db = obtener_db_lectura()
     try:
         tenant_id = identidad.get("tenant_id")
         fecha_inicio = request.args.get('inicio')
@@ -183,62 +235,193 @@ def consultar_disponibilidad(identidad):
 
         # Validar formato de fecha
         from datetime import datetime
-        datetime.strptime(fecha_inicio, '%Y-%m-%d')
-        datetime.strptime(fecha_fin, '%Y-%m-%d')
+        inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
+        fin = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
+        if (fin - inicio).days + 1 > DISPONIBILIDAD_MAX_DIAS:
+            return jsonify({"error": f"El rango no puede pasar de {DISPONIBILIDAD_MAX_DIAS} días"}), 400
+
+        # La disponibilidad es la misma para todo el tenant
+        etag = etag_peticion(db, tenant_id)
+        respuesta = no_modificada(etag)
+        if respuesta:
+            db.commit()
+            return respuesta
             
-        tipo_negocio = obtener_tipo_negocio_por_tenant(tenant_id) # Esta fue la que falló
+        tipo_negocio = obtener_tipo_negocio(identidad, db) # Esta fue la que falló
         
-        handler = obtener_reserva_handler(tipo_negocio, db=current_app.db, tenant_id=tenant_id)
+        handler = obtener_reserva_handler(tipo_negocio, db=db, tenant_id=tenant_id)
         disponibilidad = handler.consultar_disponibilidad_por_dias(
             fecha_inicio=fecha_inicio,
             fecha_fin=fecha_fin
         )
-        current_app.db.commit() # <-- Cierra la transacción
-        return jsonify(disponibilidad)
+        db.commit() # <-- Cierra la transacción
+        return con_etag(jsonify(disponibilidad), etag)
         
     except ValueError:
         # Este error es por formato de fecha, no de BD, no necesita rollback
         return jsonify({"error": "Formato de fecha inválido. Usa 'YYYY-MM-DD'"}), 400
     except Exception as e:
-        current_app.db.rollback() # <-- ¡LA SOLUCIÓN!
+        db.rollback() # <-- ¡LA SOLUCIÓN!
         traceback.print_exc()
         return jsonify({"error": f"Error al consultar disponibilidad: {str(e)}"}), 500
 
 
+#------------------------------- buscar huecos libres -------------------------------------------------------
+
+BUSQUEDA_HORIZONTE_MAX = DISPONIBILIDAD_MAX_DIAS
+BUSQUEDA_RESULTADOS_MAX = 50
+
+@app.route('/api/disponibilidad/busqueda', methods=['GET'])
+@jwt_required()
+@extraer_identidad
+def buscar_disponibilidad(identidad):
+    """
+    ?duracion_dias=7[&desde=YYYY-MM-DD][&horizonte=365][&lugar_id=..][&zona=..][&n=1]
+    Devuelve las n primeras ventanas en las que cabe la estancia completa.
+    """
+    db = obtener_db_lectura()
+    try:
+        from datetime import datetime, date
+        duracion_dias = int(request.args.get('duracion_dias', ''))
+        horizonte = int(request.args.get('horizonte', 365))
+        n = int(request.args.get('n', 1))
+        lugar_id = request.args.get('lugar_id', type=int)
+        zona = request.args.get('zona') or None
+        desde = request.args.get('desde')
+        desde = datetime.strptime(desde, '%Y-%m-%d').date() if desde else date.today()
+    except ValueError:
+        return jsonify({"error": "Parámetros inválidos: 'duracion_dias', 'horizonte' y 'n' son enteros y 'desde' es 'YYYY-MM-DD'"}), 400
+
+    if duracion_dias < 1 or not 1 <= horizonte <= BUSQUEDA_HORIZONTE_MAX or not 1 <= n <= BUSQUEDA_RESULTADOS_MAX:
+        return jsonify({"error": f"Rangos válidos: duracion_dias >= 1, horizonte 1..{BUSQUEDA_HORIZONTE_MAX}, n 1..{BUSQUEDA_RESULTADOS_MAX}"}), 400
+
+    try:
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        handler = obtener_reserva_handler(tipo_negocio, db=db, tenant_id=identidad.get("tenant_id"))
+        ventanas = handler.buscar_ventanas(duracion_dias, desde, horizonte,
+                                           lugar_id=lugar_id, zona=zona, n=n)
+        db.commit() # <-- Cierra la transacción
+        return jsonify(ventanas)
+    except Exception as e:
+        db.rollback()
+        traceback.print_exc()
+        return jsonify({"error": f"Error al buscar disponibilidad: {str(e)}"}), 500
+
+#------------------------------- comprobar varias fechas a la vez -------------------------------------------------------
+
+LOTE_CANDIDATOS_MAX = 200
+
+@app.route('/api/disponibilidad/lote', methods=['POST'])
+@jwt_required()
+@extraer_identidad
+def consultar_disponibilidad_lote(identidad):
+    """
+    Body: {"candidatos": [{"lugar_id": 1, "fecha_entrada": "YYYY-MM-DD", "fecha_salida": "YYYY-MM-DD"}, ...]}
+    """
+    candidatos = (request.get_json(silent=True) or {}).get("candidatos")
+    if not isinstance(candidatos, list) or not all(isinstance(c, dict) for c in candidatos):
+        return jsonify({"error": "Debes enviar 'candidatos' como lista de objetos"}), 400
+    if len(candidatos) > LOTE_CANDIDATOS_MAX:
+        return jsonify({"error": f"Como máximo {LOTE_CANDIDATOS_MAX} candidatos por petición"}), 400
+
+    db = obtener_db_lectura()
+    try:
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        handler = obtener_reserva_handler(tipo_negocio, db=db, tenant_id=identidad.get("tenant_id"))
+        resultados = handler.consultar_lote(candidatos)
+        db.commit() # <-- Cierra la transacción
+        return jsonify(resultados)
+    except ValueError as e:
+        # Candidatos que abarcan demasiados días entre todos
+        db.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        traceback.print_exc()
+        return jsonify({"error": f"Error al consultar disponibilidad: {str(e)}"}), 500
+
 #==============FUNCIONES ADMINISTRADOR ====================================
 
 ## RUTA REFACTORIZADA ##
 @app.route('/api/admin/reservas', methods=['GET'])
 @admin_required
 def listar_reservas_admin_route():
+    """Mismos parámetros que /api/reservas (también &stream=...), más &usuario_id=.."""
+    try:
+        formato = formato_stream(request)
+        filtros = leer_filtros(request.args, admin=True, stream=formato is not None)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db = obtener_db_lectura()
     try:
         identidad = get_jwt()
         tenant_id = identidad.get("tenant_id")
-        tipo_negocio = obtener_tipo_negocio_por_tenant(tenant_id)
+        etag = etag_peticion(db, tenant_id, get_jwt_identity())
+        respuesta = no_modificada(etag)
+        if respuesta:
+            db.commit()
+            return respuesta
+
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
         
         print("solucionando el link")
         print("🧪 Tipo de negocio:", tipo_negocio)
         
-        handler = obtener_admin_handler(tipo_negocio, current_app.db, tenant_id)
-        reservas = handler.listar_reserva()
-        current_app.db.commit() # <-- Cierra la transacción
-        return jsonify(reservas)
+        handler = obtener_admin_handler(tipo_negocio, db, tenant_id)
+        reservas = handler.listar_reserva(filtros=filtros, stream=formato is not None)
+        if formato:
+            return con_etag(respuesta_stream(db, reservas, formato), etag)
+        db.commit() # <-- Cierra la transacción
+        return con_etag(con_cursor(jsonify(reservas), reservas, filtros), etag)
     except Exception as e:
-        current_app.db.rollback() # <-- ¡LA SOLUCIÓN!
+        db.rollback() # <-- ¡LA SOLUCIÓN!
         traceback.print_exc()
         return jsonify({"error": f"Error al listar reservas de admin: {str(e)}"}), 500
 
+@app.route('/api/admin/reservas/exportar', methods=['GET'])
+@admin_required
+def exportar_reservas_admin_route():
+    """
+    Todas las reservas del tenant como fichero: ?formato=csv (por defecto) o
+    ndjson, con los filtros de /api/admin/reservas (&desde=..&hasta=.. para
+    un rango de fechas). Lo escribe Postgres con COPY (ver exportacion.py).
+    """
+    try:
+        formato = formato_exportacion(request.args)
+        filtros = leer_filtros(request.args, admin=True, stream=True)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db = obtener_db_lectura()
+    try:
+        identidad = get_jwt()
+        tenant_id = identidad.get("tenant_id")
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        handler = obtener_admin_handler(tipo_negocio, db, tenant_id)
+        trozos = handler.exportar_reservas(filtros, formato)
+        nombre = "_".join(["reservas", str(tenant_id)] + [str(f) for f in (filtros["desde"], filtros["hasta"]) if f])
+        return respuesta_exportacion(db, trozos, formato, nombre)
+    except NotImplementedError as e:
+        db.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        traceback.print_exc()
+        return jsonify({"error": f"Error al exportar reservas: {str(e)}"}), 500
+
 ## RUTA REFACTORIZADA ##
 @app.route('/api/admin/reservas', methods=['POST'])
 @admin_required
 def crear_reserva_admin():
+    db = obtener_db()
     try:
         identidad = get_jwt()
         tenant_id = identidad.get("tenant_id")
         datos = request.json
 
-        tipo_negocio = obtener_tipo_negocio_por_tenant(tenant_id)
-        handler = obtener_admin_handler(tipo_negocio, current_app.db, tenant_id)
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        handler = obtener_admin_handler(tipo_negocio, db, tenant_id)
         datos['tenant_id'] = tenant_id
         if 'usuario_id' not in datos:
             datos['usuario_id'] = identidad.get("usuario_id") 
@@ -247,25 +430,88 @@ def crear_reserva_admin():
         respuesta, status = handler.crear_reserva(datos)
         return jsonify(respuesta), status
     except Exception as e:
-        current_app.db.rollback() # <-- ¡LA SOLUCIÓN!
+        db.rollback() # <-- ¡LA SOLUCIÓN!
         traceback.print_exc()
         return jsonify({"error": f"Error al crear reserva de admin: {str(e)}"}), 500
 
+LOTE_RESERVAS_MAX = 500
+
+@app.route('/api/admin/reservas/lote', methods=['POST'])
+@admin_required
+def crear_reservas_lote_admin():
+    """
+    Body: {"reservas": [{...como en POST /api/admin/reservas...}, ...],
+           "modo": "todo_o_nada" (por defecto) | "parcial"}
+    """
+    db = obtener_db()
+    try:
+        identidad = get_jwt()
+        tenant_id = identidad.get("tenant_id")
+        datos = request.get_json(silent=True) or {}
+        reservas = datos.get("reservas")
+        if not isinstance(reservas, list) or not reservas or not all(isinstance(r, dict) for r in reservas):
+            return jsonify({"error": "Debes enviar 'reservas' como lista de objetos"}), 400
+        if len(reservas) > LOTE_RESERVAS_MAX:
+            return jsonify({"error": f"Como máximo {LOTE_RESERVAS_MAX} reservas por lote"}), 400
+        # Sin usuario_id la reserva queda a nombre del administrador
+        for reserva in reservas:
+            reserva.setdefault('usuario_id', get_jwt_identity())
+
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        handler = obtener_admin_handler(tipo_negocio, db, tenant_id)
+        # handler.crear_reservas_lote hace commit/rollback
+        respuesta, status = handler.crear_reservas_lote(reservas, datos.get("modo", "todo_o_nada"))
+        return jsonify(respuesta), status
+    except NotImplementedError as e:
+        db.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        traceback.print_exc()
+        return jsonify({"error": f"Error al crear reservas en lote: {str(e)}"}), 500
+
+@app.route('/api/admin/reservas/importar', methods=['POST'])
+@admin_required
+def importar_reservas_admin():
+    """
+    CSV con cabecera en el cuerpo (Content-Type: text/csv) o en el campo
+    'archivo' de un multipart. Columnas en logica/admin/muelle_admin.py
+    (COLUMNAS_IMPORTACION_RESERVAS). ?modo=todo_o_nada (por defecto) | parcial
+    """
+    db = obtener_db()
+    try:
+        identidad = get_jwt()
+        tenant_id = identidad.get("tenant_id")
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        handler = obtener_admin_handler(tipo_negocio, db, tenant_id)
+        # handler.importar_reservas hace commit/rollback
+        respuesta, status = handler.importar_reservas(archivo_de_peticion(request),
+                                                      request.args.get("modo", "todo_o_nada"))
+        return jsonify(respuesta), status
+    except NotImplementedError as e:
+        db.rollback()
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        db.rollback()
+        traceback.print_exc()
+        return jsonify({"error": f"Error al importar reservas: {str(e)}"}), 500
+
 ## RUTA REFACTORIZADA ##
 @app.route('/api/admin/reservas/<int:reserva_id>', methods=['PUT'])
 @admin_required
 def editar_reserva_admin(reserva_id):
+    db = obtener_db()
     try:
         identidad = get_jwt()
         tenant_id = identidad.get("tenant_id")
         datos = request.json
 
-        tipo_negocio = obtener_tipo_negocio_por_tenant(tenant_id)
-        handler = obtener_admin_handler(tipo_negocio, current_app.db, tenant_id)
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        handler = obtener_admin_handler(tipo_negocio, db, tenant_id)
         # Asumiendo que handler.editar_reserva hace commit/rollback
         return jsonify(handler.editar_reserva(reserva_id, datos))
     except Exception as e:
-        current_app.db.rollback() # <-- ¡LA SOLUCIÓN!
+        db.rollback() # <-- ¡LA SOLUCIÓN!
         traceback.print_exc()
         return jsonify({"error": f"Error al editar reserva: {str(e)}"}), 500
 
@@ -273,16 +519,17 @@ def editar_reserva_admin(reserva_id):
 @app.route('/api/admin/reservas/<int:reserva_id>', methods=['DELETE'])
 @admin_required
 def eliminar_reserva_admin(reserva_id):
+    db = obtener_db()
     try:
         identidad = get_jwt()
         tenant_id = identidad.get("tenant_id")
 
-        tipo_negocio = obtener_tipo_negocio_por_tenant(tenant_id)
-        handler = obtener_admin_handler(tipo_negocio, current_app.db, tenant_id)
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        handler = obtener_admin_handler(tipo_negocio, db, tenant_id)
         # Asumiendo que handler.eliminar_reserva hace commit/rollback
         return jsonify(handler.eliminar_reserva(reserva_id))
     except Exception as e:
-        current_app.db.rollback() # <-- ¡LA SOLUCIÓN!
+        db.rollback() # <-- ¡LA SOLUCIÓN!
         traceback.print_exc()
         return jsonify({"error": f"Error al eliminar reserva: {str(e)}"}), 500
 
@@ -290,16 +537,17 @@ def eliminar_reserva_admin(reserva_id):
 @app.route('/api/admin/lugares/<int:lugar_id>', methods=['PUT'])
 @admin_required
 def editar_lugar_admin(lugar_id):
+    db = obtener_db()
     try:
         identidad = get_jwt()
         tenant_id = identidad.get("tenant_id")
         datos = request.json
 
-        resultado = actualizar_lugar_admin(tenant_id, lugar_id, datos)
+        resultado = actualizar_lugar_admin(db, tenant_id, lugar_id, datos)
         # Asumiendo que actualizar_lugar_admin hace commit/rollback
         return jsonify(resultado)
     except Exception as e:
-        current_app.db.rollback() # <-- ¡LA SOLUCIÓN!
+        db.rollback() # <-- ¡LA SOLUCIÓN!
         traceback.print_exc()
         return jsonify({"error": f"Error al editar lugar: {str(e)}"}), 500
 
@@ -307,15 +555,16 @@ def editar_lugar_admin(lugar_id):
 @app.route('/api/admin/lugares/<int:lugar_id>', methods=['DELETE'])
 @admin_required
 def eliminar_lugar_admin_route(lugar_id):
+    db = obtener_db()
     try:
         identidad = get_jwt()
         tenant_id = identidad.get("tenant_id")
 
-        resultado = eliminar_lugar_admin(tenant_id, lugar_id)
+        resultado = eliminar_lugar_admin(db, tenant_id, lugar_id)
         # Asumiendo que eliminar_lugar_admin hace commit/rollback
         return jsonify(resultado)
     except Exception as e:
-        current_app.db.rollback() # <-- ¡LA SOLUCIAN!
+        db.rollback() # <-- ¡LA SOLUCIAN!
         traceback.print_exc()
         return jsonify({"error": f"Error al eliminar lugar: {str(e)}"}), 500
 
@@ -332,9 +581,11 @@ def crear_lugar():
     if not tenant_id:
         return jsonify({"error": "No se pudo obtener el tenant_id"}), 400
     
+    db = obtener_db()
+    
     try:
         # Obtener el tipo de negocio del tenant
-        tipo_negocio = obtener_tipo_negocio_por_tenant(tenant_id)
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
         if not tipo_negocio:
             return jsonify({"error": "No se pudo obtener el tipo de negocio"}), 400
             
@@ -352,39 +603,89 @@ def crear_lugar():
             VALUES (:nombre, :capacidad, :tenant_id, :tipo, :zona)
             RETURNING id
         """)
-        result = current_app.db.execute(query, datos)
-        current_app.db.commit() # <-- Correcto
+        result = db.execute(query, datos)
+        db.commit() # <-- Correcto
         
         lugar_id = result.fetchone()[0]
+        registrar_lugar_nuevo(tenant_id, lugar_id)
         return jsonify({
             "mensaje": "Lugar creado exitosamente",
             "id": lugar_id
         }), 201
         
     except Exception as e:
-        current_app.db.rollback() # <-- Correcto
+        db.rollback() # <-- Correcto
         traceback.print_exc()
         return jsonify({"error": f"Error al crear lugar: {str(e)}"}), 500
 
 
+@app.route('/api/admin/lugares/importar', methods=['POST'])
+@admin_required
+def importar_lugares():
+    """
+    CSV con las columnas nombre, capacidad y zona, en el cuerpo (text/csv)
+    o en el campo 'archivo' de un multipart. ?modo=todo_o_nada (por defecto) | parcial
+    """
+    db = obtener_db()
+    try:
+        identidad = get_jwt()
+        tenant_id = identidad.get("tenant_id")
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        if not tipo_negocio:
+            return jsonify({"error": "No se pudo obtener el tipo de negocio"}), 400
+        # importar_lugares_admin hace commit/rollback
+        respuesta, status = importar_lugares_admin(db, tenant_id, tipo_negocio, archivo_de_peticion(request),
+                                                   request.args.get("modo", "todo_o_nada"))
+        return jsonify(respuesta), status
+    except Exception as e:
+        db.rollback()
+        traceback.print_exc()
+        return jsonify({"error": f"Error al importar lugares: {str(e)}"}), 500
+
+
+SQL_USUARIOS_TENANT = text("SELECT id, nombre, correo FROM usuarios WHERE tenant_id = :tenant_id AND rol_id = 1")
+
 ## RUTA REFACTORIZADA ##
 @app.route('/api/admin/usuarios', methods=['GET'])
 @admin_required
 def listar_usuarios_mismo_tenant():
+    """Con ?stream=json|ndjson (o Accept: application/x-ndjson) devuelve los usuarios por trozos"""
+    try:
+        formato = formato_stream(request)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    db = obtener_db_lectura()
     try:
         identidad = get_jwt()
         tenant_id = identidad.get("tenant_id")
-        query = text("SELECT id, nombre, correo FROM usuarios WHERE tenant_id = :tenant_id AND rol_id = 1")
-        result = current_app.db.execute(query, {"tenant_id": tenant_id})
+        if formato:
+            usuarios = filas_por_lotes(db, SQL_USUARIOS_TENANT, {"tenant_id": tenant_id})
+            return respuesta_stream(db, usuarios, formato)
+
+        result = db.execute(SQL_USUARIOS_TENANT, {"tenant_id": tenant_id})
         
         usuarios = [dict(row._mapping) for row in result]
-        current_app.db.commit() # <-- Cierra la transacción
+        db.commit() # <-- Cierra la transacción
         
         return jsonify(usuarios)
     except Exception as e:
-        current_app.db.rollback() # <-- ¡LA SOLUCIÓN!
+        db.rollback() # <-- ¡LA SOLUCIÓN!
         traceback.print_exc()
         return jsonify({"error": f"Error al listar usuarios: {str(e)}"}), 500
 
+## Métricas internas (cuántas consultas se ahorran las caches)
+@app.route('/api/admin/metricas', methods=['GET'])
+@admin_required
+def metricas_admin():
+    return jsonify({
+        "cache_tenants": cache_tenants.estadisticas(),
+        "cache_disponibilidad": cache_disponibilidad.estadisticas(),
+        "vuelos_disponibilidad": vuelos_disponibilidad.estadisticas(),
+        "handlers_cargados": registro_reservas.tipos_cargados(),
+        "indice_ocupacion": indice_ocupacion.estadisticas(),
+        "etag": estadisticas_etag()
+    })
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
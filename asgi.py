@@ -0,0 +1,224 @@
+# asgi.py
+#
+# Modo de servicio asíncrono (opcional). Expone las rutas de lectura que el
+# front consulta sin parar (/api/reservas, /api/disponibilidad y el listado de
+# admin) sobre un engine asyncpg, así una petición esperando a Postgres no
+# ocupa un hilo. Usa los mismos handlers que app.py.
+#
+# Arranque:
+#   pip install -r requirements-async.txt
+#   uvicorn asgi:app --host 0.0.0.0 --port 8000
+#
+# El modo Flask (python app.py) sigue funcionando igual que siempre.
+
+import traceback
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+import jwt
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+from config.bd_async import async_engine, ejecutar_en_conexion
+from config.seguridad import JWT_SECRET_KEY, ORIGENES_CORS, CABECERAS_EXPUESTAS
+from config.serializacion import a_json
+from logica.negocios import obtener_tipo_negocio
+from logica.etag import calcular_etag, cliente_tiene
+from logica.versiones import version_tenant
+from logica.reservas.factory import obtener_reserva_handler
+from logica.reservas.disponibilidad import DISPONIBILIDAD_MAX_DIAS
+from logica.reservas.paginacion import leer_filtros, siguiente_cursor, CABECERA_CURSOR
+from logica.admin.admin_factory import obtener_admin_handler
+
+
+class RespuestaJSON(JSONResponse):
+    # Igual que jsonify (config/serializacion.py): fechas ISO, orjson si está
+    def render(self, content):
+        return a_json(content)
+
+
+class NoAutorizado(Exception):
+    pass
+
+
+def extraer_identidad(request):
+    # Mismo token que emite /api/login (flask_jwt_extended, HS256)
+    cabecera = request.headers.get("Authorization", "")
+    if not cabecera.startswith("Bearer "):
+        raise NoAutorizado("Falta el token de acceso")
+    try:
+        claims = jwt.decode(cabecera[len("Bearer "):], JWT_SECRET_KEY, algorithms=["HS256"])
+    except jwt.PyJWTError as e:
+        raise NoAutorizado(str(e))
+    if claims.get("type") != "access":
+        raise NoAutorizado("Se requiere un token de acceso")
+    return {
+        "usuario_id": claims.get("sub"),
+        "tenant_id": claims.get("tenant_id"),
+        "rol_id": claims.get("rol_id"),
+        "tipo_negocio": claims.get("tipo_negocio"),
+    }
+
+
+def con_identidad(fn):
+    async def wrapper(request):
+        try:
+            identidad = extraer_identidad(request)
+        except NoAutorizado as e:
+            return RespuestaJSON({"msg": str(e)}, status_code=401)
+        return await fn(request, identidad)
+    return wrapper
+
+
+#==============================listar reservas ============================================================
+
+def cabeceras_etag(etag):
+    return {"ETag": f'"{etag}"', "Vary": "Authorization"}
+
+
+async def consulta_condicional(request, tenant_id, quien, consultar):
+    """
+    Como en app.py (ver logica/etag.py): calcula el ETag con la versión del
+    tenant y solo ejecuta consultar(db) si el cliente no lo tiene ya.
+    Devuelve (etag, resultado); resultado es None si toca contestar 304.
+    """
+    ruta = f"{request.url.path}?{request.url.query}"
+    if_none_match = request.headers.get("if-none-match")
+
+    def condicional(db):
+        etag = calcular_etag(version_tenant(db, tenant_id), tenant_id, quien, ruta)
+        if cliente_tiene(if_none_match, etag):
+            db.commit()
+            return etag, None
+        return etag, consultar(db)
+
+    return await ejecutar_en_conexion(condicional)
+
+
+def no_modificada(etag):
+    return Response(status_code=304, headers=cabeceras_etag(etag))
+
+
+def con_cursor(reservas, filtros, etag):
+    # Igual que en app.py: la lista en el cuerpo y el cursor de la página siguiente en la cabecera
+    cabeceras = cabeceras_etag(etag)
+    cursor = siguiente_cursor(reservas, filtros)
+    if cursor:
+        cabeceras[CABECERA_CURSOR] = cursor
+    return RespuestaJSON(reservas, headers=cabeceras)
+
+
+@con_identidad
+async def listar_reservas(request, identidad):
+    tenant_id = identidad["tenant_id"]
+    usuario_id = identidad["usuario_id"]
+    try:
+        filtros = leer_filtros(request.query_params)
+    except ValueError as e:
+        return RespuestaJSON({"error": str(e)}, status_code=400)
+
+    def consultar(db):
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        handler = obtener_reserva_handler(tipo_negocio, db=db, tenant_id=tenant_id)
+        reservas = handler.listar_reservas(usuario_id=usuario_id, filtros=filtros)
+        db.commit()
+        return reservas
+
+    try:
+        etag, reservas = await consulta_condicional(request, tenant_id, usuario_id, consultar)
+        if reservas is None:
+            return no_modificada(etag)
+        return con_cursor(reservas, filtros, etag)
+    except Exception as e:
+        traceback.print_exc()
+        return RespuestaJSON({"error": f"Error al listar reservas: {str(e)}"}, status_code=500)
+
+#------------------------------- ver disponibilidad de cupos -------------------------------------------------------
+
+@con_identidad
+async def consultar_disponibilidad(request, identidad):
+    tenant_id = identidad.get("tenant_id")
+    fecha_inicio = request.query_params.get('inicio')
+    fecha_fin = request.query_params.get('fin')
+
+    if not fecha_inicio or not fecha_fin:
+        return RespuestaJSON({"error": "Debes proporcionar 'inicio' y 'fin'"}, status_code=400)
+
+    try:
+        inicio = datetime.strptime(fecha_inicio, '%Y-%m-%d').date()
+        fin = datetime.strptime(fecha_fin, '%Y-%m-%d').date()
+    except ValueError:
+        return RespuestaJSON({"error": "Formato de fecha inválido. Usa 'YYYY-MM-DD'"}, status_code=400)
+    if (fin - inicio).days + 1 > DISPONIBILIDAD_MAX_DIAS:
+        return RespuestaJSON({"error": f"El rango no puede pasar de {DISPONIBILIDAD_MAX_DIAS} días"}, status_code=400)
+
+    def consultar(db):
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        handler = obtener_reserva_handler(tipo_negocio, db=db, tenant_id=tenant_id)
+        disponibilidad = handler.consultar_disponibilidad_por_dias(
+            fecha_inicio=fecha_inicio,
+            fecha_fin=fecha_fin
+        )
+        db.commit()
+        return disponibilidad
+
+    try:
+        etag, disponibilidad = await consulta_condicional(request, tenant_id, None, consultar)
+        if disponibilidad is None:
+            return no_modificada(etag)
+        return RespuestaJSON(disponibilidad, headers=cabeceras_etag(etag))
+    except Exception as e:
+        traceback.print_exc()
+        return RespuestaJSON({"error": f"Error al consultar disponibilidad: {str(e)}"}, status_code=500)
+
+#==============FUNCIONES ADMINISTRADOR ====================================
+
+@con_identidad
+async def listar_reservas_admin(request, identidad):
+    if identidad.get("rol_id") != 2:
+        return RespuestaJSON({"error": "Acceso denegado: solo administradores"}, status_code=403)
+    tenant_id = identidad.get("tenant_id")
+    try:
+        filtros = leer_filtros(request.query_params, admin=True)
+    except ValueError as e:
+        return RespuestaJSON({"error": str(e)}, status_code=400)
+
+    def consultar(db):
+        tipo_negocio = obtener_tipo_negocio(identidad, db)
+        handler = obtener_admin_handler(tipo_negocio, db, tenant_id)
+        reservas = handler.listar_reserva(filtros=filtros)
+        db.commit()
+        return reservas
+
+    try:
+        etag, reservas = await consulta_condicional(request, tenant_id, identidad["usuario_id"], consultar)
+        if reservas is None:
+            return no_modificada(etag)
+        return con_cursor(reservas, filtros, etag)
+    except Exception as e:
+        traceback.print_exc()
+        return RespuestaJSON({"error": f"Error al listar reservas de admin: {str(e)}"}, status_code=500)
+
+
+@asynccontextmanager
+async def ciclo_de_vida(app):
+    yield
+    # Devuelve las conexiones del pool al apagar el servidor
+    await async_engine.dispose()
+
+
+app = Starlette(
+    routes=[
+        Route('/api/reservas', listar_reservas, methods=['GET']),
+        Route('/api/disponibilidad', consultar_disponibilidad, methods=['GET']),
+        Route('/api/admin/reservas', listar_reservas_admin, methods=['GET']),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=ORIGENES_CORS, allow_credentials=True,
+                   allow_methods=["*"], allow_headers=["*"], expose_headers=CABECERAS_EXPUESTAS),
+    ],
+    lifespan=ciclo_de_vida,
+)
@@ -0,0 +1,169 @@
+# benchmarks/bench_admision.py
+#
+# Muchas reservas simultáneas (cada hilo con su conexión) sobre pocos lugares
+# con poca capacidad:
+# - "sin bloqueo" / "por lugar": alta paso a paso de admin
+#   (crear_reserva_admin_muelle) sin y con el bloqueo de admisión por lugar
+#   (bloquear_lugares en logica/versiones.py).
+# - "una llamada": ReservaMuelle.crear_reserva, que bloquea y valida dentro
+#   de la función crear_reserva_muelle() de la BD.
+# Al terminar
+# cada ronda suma, por lugar y día, las reservas que pasan de la capacidad
+# (sobreventas) y mide reservas intentadas por segundo.
+#
+# Sin bloqueo, dos altas del mismo lugar leen el mismo cupo libre y luego
+# chocan en la fila del lugar (la FK de reservas_generales la toma en modo
+# compartido y la versión la quiere en exclusivo): Postgres aborta una por
+# deadlock (columna "otros") o, si no llegan a cruzarse, se sobrevende. Con
+# bloqueo (y en una llamada) tiene que salir siempre 0 en las dos columnas.
+#
+#   DATABASE_URL=postgresql://... python benchmarks/bench_admision.py
+
+import contextlib
+import io
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, text
+
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+from config.bd import DATABASE_URL
+from logica.admin import reservas_admin
+from logica.admin.reservas_admin import crear_reserva_admin_muelle
+from logica.reservas.muelle import ReservaMuelle
+from logica.versiones import bloquear_lugares
+
+HILOS = [1, 4, 16, 32]
+INTENTOS = int(os.getenv("BENCH_INTENTOS", "2000"))
+LUGARES = int(os.getenv("BENCH_LUGARES", "16"))
+CAPACIDAD = int(os.getenv("BENCH_CAPACIDAD", "3"))
+HORIZONTE = int(os.getenv("BENCH_HORIZONTE", "60"))
+
+engine = create_engine(DATABASE_URL, pool_size=max(HILOS), max_overflow=0)
+
+# Lo que se hacía antes: leer la capacidad sin bloquear nada
+SQL_CAPACIDAD_SIN_BLOQUEO = text("""
+    SELECT id, capacidad FROM lugares
+    WHERE id = ANY(CAST(:lugares AS INTEGER[])) AND tenant_id = :tenant_id
+""")
+
+
+def capacidad_sin_bloqueo(db, tenant_id, lugar_ids):
+    rows = db.execute(SQL_CAPACIDAD_SIN_BLOQUEO, {
+        "lugares": [int(lugar_id) for lugar_id in lugar_ids], "tenant_id": tenant_id})
+    return {row.id: row.capacidad for row in rows}
+
+
+# Reservas de más sumadas sobre todos los (lugar, día) por encima de su capacidad
+SQL_SOBREVENTAS = text("""
+    SELECT COALESCE(SUM(x.ocupadas - x.capacidad), 0) FROM (
+        SELECT l.capacidad, COUNT(*) AS ocupadas
+        FROM reservas_generales rg
+        JOIN reservas_muelle rm ON rm.reserva_id = rg.id
+        JOIN lugares l ON l.id = rg.lugar_id
+        CROSS JOIN LATERAL generate_series(rm.fecha_entrada, rm.fecha_salida, interval '1 day') d(dia)
+        WHERE rg.tenant_id = :tenant_id
+        GROUP BY l.id, l.capacidad, d.dia
+    ) x
+    WHERE x.ocupadas > x.capacidad
+""")
+
+SQL_VACIAR = text("""
+    DELETE FROM reservas_generales WHERE tenant_id = :tenant_id
+""")
+
+
+def intentos(lugares, usuario_id, n):
+    hoy = date.today()
+    for _ in range(n):
+        entrada = hoy + timedelta(days=random.randrange(HORIZONTE))
+        yield {
+            "fecha": str(hoy),
+            "usuario_id": usuario_id,
+            "tenant_id": TENANT_PRUEBA,
+            "lugar_id": random.choice(lugares),
+            "fecha_entrada": str(entrada),
+            "fecha_salida": str(entrada + timedelta(days=random.randrange(6))),
+            "tipo_embarcacion": "Yate",
+        }
+
+
+def reservar_admin(db, datos):
+    return crear_reserva_admin_muelle(db, TENANT_PRUEBA, datos)
+
+
+def reservar_usuario(db, datos):
+    return ReservaMuelle(db, TENANT_PRUEBA).crear_reserva(datos)
+
+
+MODOS = [
+    ("sin bloqueo", reservar_admin, capacidad_sin_bloqueo),
+    ("por lugar", reservar_admin, bloquear_lugares),
+    ("una llamada", reservar_usuario, bloquear_lugares),
+]
+
+
+def ronda(hilos, lista, alta):
+    def reservar(datos):
+        with engine.connect() as db:
+            _, status = alta(db, dict(datos))
+            return status
+
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(hilos) as pool:
+        inicio = time.perf_counter()
+        estados = list(pool.map(reservar, lista))
+        total = time.perf_counter() - inicio
+    return estados, total
+
+
+def vaciar():
+    with engine.connect() as conexion:
+        conexion.execute(text("DELETE FROM ocupacion_diaria WHERE tenant_id = :t"), {"t": TENANT_PRUEBA})
+        conexion.execute(text("""
+            DELETE FROM reservas_muelle WHERE reserva_id IN
+                (SELECT id FROM reservas_generales WHERE tenant_id = :tenant_id)
+        """), {"tenant_id": TENANT_PRUEBA})
+        conexion.execute(SQL_VACIAR, {"tenant_id": TENANT_PRUEBA})
+        conexion.commit()
+
+
+def main():
+    random.seed(11)
+    with engine.connect() as conexion:
+        usuario_id = sembrar(conexion, 0, n_lugares=LUGARES, capacidad=CAPACIDAD)
+        lugares = [row[0] for row in conexion.execute(
+            text("SELECT id FROM lugares WHERE tenant_id = :t"), {"t": TENANT_PRUEBA})]
+    lista = list(intentos(lugares, usuario_id, INTENTOS))
+
+    try:
+        # Calentamiento: conexiones del pool y consultas compiladas
+        ronda(max(HILOS), lista[:max(HILOS) * 4], reservar_usuario)
+
+        print(f"{INTENTOS} intentos sobre {LUGARES} lugares de capacidad {CAPACIDAD} ({HORIZONTE} días)")
+        print(f"{'admisión':>12} | {'hilos':>5} | {'creadas':>7} | {'409':>5} | {'otros':>5} | "
+              f"{'sobreventas':>11} | {'intentos/s':>10}")
+        print("-" * 78)
+        for nombre, alta, bloqueo in MODOS:
+            reservas_admin.bloquear_lugares = bloqueo
+            for hilos in HILOS:
+                vaciar()
+                estados, total = ronda(hilos, lista, alta)
+
+                with engine.connect() as conexion:
+                    sobreventas = conexion.execute(SQL_SOBREVENTAS, {"tenant_id": TENANT_PRUEBA}).scalar()
+                creadas = estados.count(201)
+                rechazadas = estados.count(409)
+                otros = len(estados) - creadas - rechazadas
+                print(f"{nombre:>12} | {hilos:>5} | {creadas:>7} | {rechazadas:>5} | {otros:>5} | "
+                      f"{sobreventas:>11} | {len(estados) / total:>10.0f}")
+    finally:
+        reservas_admin.bloquear_lugares = bloquear_lugares
+        with engine.connect() as conexion:
+            borrar(conexion)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_async_vs_sync.py
+#
+# Comparación de latencia y throughput entre el modo Flask (app.py) y el modo
+# asíncrono (asgi.py) para las rutas que el front consulta más.
+#
+# 1. Levanta los dos servidores contra la misma BD local:
+#      RUN_INIT_DB=true python app.py                       # :5000
+#      uvicorn asgi:app --port 8000 --workers 1             # :8000
+# 2. Ejecuta:
+#      python benchmarks/bench_async_vs_sync.py
+#
+# Variables: SYNC_URL, ASYNC_URL, BENCH_CORREO, BENCH_CLAVE, BENCH_PETICIONES
+
+import json
+import os
+import statistics
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+SYNC_URL = os.getenv("SYNC_URL", "http://localhost:5000")
+ASYNC_URL = os.getenv("ASYNC_URL", "http://localhost:8000")
+CORREO = os.getenv("BENCH_CORREO", "admin@systempiura.com")
+CLAVE = os.getenv("BENCH_CLAVE", "admin123")
+PETICIONES = int(os.getenv("BENCH_PETICIONES", "1000"))
+CONCURRENCIAS = [1, 10, 50, 200]
+
+
+def login():
+    cuerpo = json.dumps({"correo": CORREO, "clave": CLAVE}).encode()
+    peticion = urllib.request.Request(f"{SYNC_URL}/api/login", data=cuerpo,
+                                      headers={"Content-Type": "application/json"})
+    with urllib.request.urlopen(peticion) as respuesta:
+        return json.load(respuesta)["access_token"]
+
+
+def pedir(url, token):
+    inicio = time.perf_counter()
+    peticion = urllib.request.Request(url, headers={"Authorization": f"Bearer {token}"})
+    with urllib.request.urlopen(peticion, timeout=60) as respuesta:
+        respuesta.read()
+    return time.perf_counter() - inicio
+
+
+def medir(url, token, concurrencia):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as ejecutor:
+        latencias = list(ejecutor.map(lambda _: pedir(url, token), range(PETICIONES)))
+    total = time.perf_counter() - inicio
+    latencias.sort()
+    return {
+        "rps": PETICIONES / total,
+        "p50": statistics.median(latencias) * 1000,
+        "p95": latencias[int(len(latencias) * 0.95) - 1] * 1000,
+    }
+
+
+def main():
+    token = login()
+    hoy = date.today()
+    rutas = [
+        "/api/reservas",
+        f"/api/disponibilidad?inicio={hoy}&fin={hoy + timedelta(days=30)}",
+    ]
+    for ruta in rutas:
+        print(f"\n{ruta}  ({PETICIONES} peticiones)")
+        print(f"{'conc.':>6} | {'modo':>6} | {'req/s':>8} | {'p50 ms':>8} | {'p95 ms':>8}")
+        print("-" * 48)
+        for concurrencia in CONCURRENCIAS:
+            for modo, base in (("sync", SYNC_URL), ("async", ASYNC_URL)):
+                r = medir(base + ruta, token, concurrencia)
+                print(f"{concurrencia:>6} | {modo:>6} | {r['rps']:>8.1f} | {r['p50']:>8.1f} | {r['p95']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# benchmarks/bench_crear_reserva.py
+#
+# Idas y vueltas a Postgres por reserva creada: el alta paso a paso
+# (bloqueo, COUNT, dos INSERT, ocupación diaria, versión y commit, como hace
+# crear_reserva_admin_muelle) frente a ReservaMuelle.crear_reserva, que hace
+# todo con la función crear_reserva_muelle() de la BD y el commit.
+#
+# Para imitar un enlace lento a la BD se duerme BENCH_LATENCIA_MS antes de
+# cada sentencia y de cada commit/rollback (0 = sin latencia añadida).
+#
+#   DATABASE_URL=postgresql://... python benchmarks/bench_crear_reserva.py
+
+import contextlib
+import io
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, event, text
+
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+from config.bd import DATABASE_URL
+from logica.admin.reservas_admin import crear_reserva_admin_muelle
+from logica.reservas.muelle import ReservaMuelle
+
+RESERVAS = int(os.getenv("BENCH_RESERVAS", "300"))
+LATENCIAS_MS = [0, 1, 5]
+
+engine = create_engine(DATABASE_URL)
+latencia = 0.0
+idas = 0
+
+
+def ida_y_vuelta(*args):
+    global idas
+    idas += 1
+    if latencia:
+        time.sleep(latencia)
+
+
+event.listen(engine, "before_cursor_execute", ida_y_vuelta)
+event.listen(engine, "commit", ida_y_vuelta)
+event.listen(engine, "rollback", ida_y_vuelta)
+
+
+def paso_a_paso(db, datos):
+    return crear_reserva_admin_muelle(db, TENANT_PRUEBA, datos)
+
+
+def una_llamada(db, datos):
+    return ReservaMuelle(db, TENANT_PRUEBA).crear_reserva(datos)
+
+
+def altas(lugares, usuario_id, n):
+    hoy = date.today()
+    for _ in range(n):
+        entrada = hoy + timedelta(days=random.randrange(365))
+        yield {
+            "usuario_id": usuario_id,
+            "tenant_id": TENANT_PRUEBA,
+            "lugar_id": random.choice(lugares),
+            "fecha": str(hoy),
+            "fecha_entrada": str(entrada),
+            "fecha_salida": str(entrada + timedelta(days=random.randrange(8))),
+            "tipo_embarcacion": "Yate",
+        }
+
+
+def medir(alta, lista):
+    global idas
+    estados = []
+    with engine.connect() as db, contextlib.redirect_stdout(io.StringIO()):
+        idas = 0
+        inicio = time.perf_counter()
+        for datos in lista:
+            _, status = alta(db, dict(datos))
+            estados.append(status)
+        total = time.perf_counter() - inicio
+    return total * 1000 / len(lista), idas / len(lista), estados
+
+
+def main():
+    global latencia
+    random.seed(5)
+    with engine.connect() as conexion:
+        usuario_id = sembrar(conexion, 20000, n_lugares=50, capacidad=20)
+        lugares = [row[0] for row in conexion.execute(
+            text("SELECT id FROM lugares WHERE tenant_id = :t"), {"t": TENANT_PRUEBA})]
+    try:
+        print(f"{RESERVAS} altas por modo y latencia (sobre 20000 reservas existentes)")
+        print(f"{'latencia ms':>11} | {'modo':>12} | {'idas/alta':>9} | {'ms/alta':>8} | {'creadas':>7}")
+        print("-" * 60)
+        for latencia_ms in LATENCIAS_MS:
+            latencia = latencia_ms / 1000
+            for nombre, alta in (("paso a paso", paso_a_paso), ("una llamada", una_llamada)):
+                ms, idas_por_alta, estados = medir(alta, list(altas(lugares, usuario_id, RESERVAS)))
+                print(f"{latencia_ms:>11} | {nombre:>12} | {idas_por_alta:>9.1f} | {ms:>8.2f} | "
+                      f"{estados.count(201):>7}")
+    finally:
+        latencia = 0.0
+        with engine.connect() as conexion:
+            borrar(conexion)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+# benchmarks/bench_etag.py
+#
+# Refresco de un cliente que ya tiene los datos: la misma petición GET con
+# y sin If-None-Match (ETag de la respuesta anterior) sobre un tenant con
+# muchas reservas. Con el ETag vigente la ruta solo consulta la versión del
+# tenant y contesta 304 sin cuerpo.
+#
+#   DATABASE_URL=postgresql://... python benchmarks/bench_etag.py
+
+import os
+import time
+from datetime import date, timedelta
+
+os.environ.setdefault("RUN_INIT_DB", "false")
+
+from flask_jwt_extended import create_access_token
+
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+from config.bd import engine
+import app as aplicacion
+
+RESERVAS = int(os.getenv("BENCH_RESERVAS", "100000"))
+PETICIONES = int(os.getenv("BENCH_PETICIONES", "200"))
+
+hoy = date.today()
+RUTAS = [
+    "/api/admin/reservas?limite=1000",
+    "/api/admin/lugares",
+    f"/api/disponibilidad?inicio={hoy}&fin={hoy + timedelta(days=90)}",
+]
+
+
+def medir(cliente, ruta, cabeceras):
+    inicio = time.perf_counter()
+    for _ in range(PETICIONES):
+        respuesta = cliente.get(ruta, headers=cabeceras)
+        bytes_cuerpo = len(respuesta.get_data())
+    return (time.perf_counter() - inicio) * 1000 / PETICIONES, respuesta.status_code, bytes_cuerpo
+
+
+def main():
+    cliente = aplicacion.app.test_client()
+    with engine.connect() as conexion:
+        try:
+            usuario_id = sembrar(conexion, RESERVAS, n_lugares=200)
+            with aplicacion.app.app_context():
+                token = create_access_token(identity=str(usuario_id), additional_claims={
+                    "rol_id": 2, "tenant_id": TENANT_PRUEBA, "tipo_negocio": "muelle"})
+            cabeceras = {"Authorization": f"Bearer {token}"}
+
+            print(f"{RESERVAS} reservas, {PETICIONES} peticiones por caso (ms/petición)")
+            print(f"{'ruta':>40} | {'sin ETag':>8} | {'304':>8} | {'bytes 200':>9}")
+            print("-" * 76)
+            for ruta in RUTAS:
+                etag = cliente.get(ruta, headers=cabeceras).headers["ETag"]
+                completa_ms, _, bytes_cuerpo = medir(cliente, ruta, cabeceras)
+                condicional_ms, estado, _ = medir(cliente, ruta, {**cabeceras, "If-None-Match": etag})
+                assert estado == 304, f"{ruta}: se esperaba 304 y llegó {estado}"
+                print(f"{ruta[:40]:>40} | {completa_ms:>8.2f} | {condicional_ms:>8.2f} | {bytes_cuerpo:>9}")
+        finally:
+            borrar(conexion)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/bench_exportacion.py
+#
+# Volcado completo de las reservas de un tenant (N reservas):
+# - "stream":   /api/admin/reservas?stream=ndjson (cursor del servidor,
+#               cada fila pasa por un dict y se codifica en Python)
+# - "csv" / "ndjson": /api/admin/reservas/exportar (COPY ... TO STDOUT,
+#               Postgres escribe las filas y Python solo pasa los bytes)
+# Lee la respuesta por trozos como lo haría el servidor WSGI y mide el pico
+# de memoria de Python (tracemalloc), el tiempo y los MB/s. Al final corta
+# una exportación a medias y comprueba que la conexión no queda ocupada.
+#
+#   DATABASE_URL=postgresql://... python benchmarks/bench_exportacion.py
+
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("RUN_INIT_DB", "false")
+
+from flask_jwt_extended import create_access_token
+
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+from config.bd import engine
+import app as aplicacion
+
+TAMANOS = [int(n) for n in os.getenv("BENCH_RESERVAS", "100000,500000").split(",")]
+
+MODOS = [
+    ("stream", "/api/admin/reservas?stream=ndjson"),
+    ("csv", "/api/admin/reservas/exportar?formato=csv"),
+    ("ndjson", "/api/admin/reservas/exportar?formato=ndjson"),
+]
+
+
+def pedir(cliente, ruta, cabeceras):
+    respuesta = cliente.get(ruta, headers=cabeceras, buffered=False)
+    total = sum(len(trozo) for trozo in respuesta.response)
+    respuesta.close()
+    return total
+
+
+def main():
+    cliente = aplicacion.app.test_client()
+    print(f"{'reservas':>8} | {'modo':>6} | {'pico MB':>8} | {'segundos':>8} | {'MB':>7} | {'MB/s':>7}")
+    print("-" * 60)
+    with engine.connect() as conexion:
+        try:
+            for n in TAMANOS:
+                usuario_id = sembrar(conexion, n, n_lugares=200)
+                with aplicacion.app.app_context():
+                    token = create_access_token(identity=str(usuario_id), additional_claims={
+                        "rol_id": 2, "tenant_id": TENANT_PRUEBA, "tipo_negocio": "muelle"})
+                cabeceras = {"Authorization": f"Bearer {token}"}
+
+                for nombre, ruta in MODOS:
+                    tracemalloc.start()
+                    inicio = time.perf_counter()
+                    enviados = pedir(cliente, ruta, cabeceras)
+                    segundos = time.perf_counter() - inicio
+                    _, pico = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    mb = enviados / 2**20
+                    print(f"{n:>8} | {nombre:>6} | {pico / 2**20:>8.1f} | {segundos:>8.2f} | "
+                          f"{mb:>7.1f} | {mb / segundos:>7.1f}")
+
+            respuesta = cliente.get(MODOS[1][1], headers=cabeceras, buffered=False)
+            next(iter(respuesta.response))
+            respuesta.close()
+            print(f"Exportación cortada a medias: {engine.pool.checkedout()} conexiones ocupadas "
+                  f"(la de este script)")
+        finally:
+            borrar(conexion)
+
+
+if __name__ == "__main__":
+    main()
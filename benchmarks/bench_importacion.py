@@ -0,0 +1,88 @@
+# benchmarks/bench_importacion.py
+#
+# Alta de un muelle nuevo desde CSV: LUGARES lugares y N reservas.
+# - "una a una": AdminReservaMuelle.crear_reserva por cada fila (lo que
+#                hace POST /api/admin/reservas), medido con
+#                BENCH_UNA_A_UNA filas y extrapolado a N
+# - "importar":  importar_lugares_admin + importar_reservas (COPY a una
+#                tabla temporal, validación y cupo en SQL, INSERT ... SELECT)
+#
+#   DATABASE_URL=postgresql://... python benchmarks/bench_importacion.py
+
+import contextlib
+import io
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+from config.bd import engine
+from logica.admin.lugares_admin import importar_lugares_admin
+from logica.admin.muelle_admin import AdminReservaMuelle
+
+RESERVAS = [int(n) for n in os.getenv("BENCH_RESERVAS", "10000,100000").split(",")]
+LUGARES = int(os.getenv("BENCH_LUGARES", "150"))
+UNA_A_UNA = int(os.getenv("BENCH_UNA_A_UNA", "500"))
+
+
+def csv_lugares():
+    lineas = ["nombre,capacidad,zona"] + [f"Amarre {n},100,Zona {n % 4}" for n in range(1, LUGARES + 1)]
+    return io.BytesIO("\n".join(lineas).encode())
+
+
+def filas_reservas(n, correo):
+    hoy = date.today()
+    for _ in range(n):
+        entrada = hoy + timedelta(days=random.randrange(730))
+        salida = entrada + timedelta(days=random.randrange(15))
+        yield correo, f"Amarre {random.randint(1, LUGARES)}", entrada, salida
+
+
+def csv_reservas(n, correo):
+    lineas = ["correo,lugar,fecha_entrada,fecha_salida,tipo_embarcacion,requiere_motor"]
+    lineas += [f"{c},{l},{e},{s},Yate,no" for c, l, e, s in filas_reservas(n, correo)]
+    return io.BytesIO("\n".join(lineas).encode())
+
+
+def una_a_una(conexion, usuario_id, correo):
+    lugares = dict(conexion.execute(
+        __import__("sqlalchemy").text("SELECT nombre, id FROM lugares WHERE tenant_id = :t"),
+        {"t": TENANT_PRUEBA}).all())
+    conexion.commit()
+    handler = AdminReservaMuelle(conexion, TENANT_PRUEBA)
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # crear_reserva escribe cada alta
+        for _, lugar, entrada, salida in filas_reservas(UNA_A_UNA, correo):
+            handler.crear_reserva({"usuario_id": usuario_id, "lugar_id": lugares[lugar],
+                                   "fecha_entrada": str(entrada), "fecha_salida": str(salida),
+                                   "tipo_embarcacion": "Yate"})
+    return (time.perf_counter() - inicio) / UNA_A_UNA
+
+
+def main():
+    correo = f"bench-{TENANT_PRUEBA}@example.com"
+    print(f"{LUGARES} lugares; 'una a una' extrapolado desde {UNA_A_UNA} reservas")
+    print(f"{'reservas':>8} | {'una a una s':>11} | {'importar s':>10} | {'importadas':>10}")
+    print("-" * 50)
+    with engine.connect() as conexion:
+        try:
+            for n in RESERVAS:
+                usuario_id = sembrar(conexion, 0, n_lugares=0)
+                respuesta, _ = importar_lugares_admin(conexion, TENANT_PRUEBA, "muelle", csv_lugares())
+                assert respuesta["importadas"] == LUGARES, respuesta
+                por_fila = una_a_una(conexion, usuario_id, correo)
+
+                sembrar(conexion, 0, n_lugares=0)
+                archivo = csv_reservas(n, correo)
+                inicio = time.perf_counter()
+                importar_lugares_admin(conexion, TENANT_PRUEBA, "muelle", csv_lugares())
+                respuesta, _ = AdminReservaMuelle(conexion, TENANT_PRUEBA).importar_reservas(archivo, "parcial")
+                segundos = time.perf_counter() - inicio
+                print(f"{n:>8} | {por_fila * n:>11.1f} | {segundos:>10.2f} | {respuesta['importadas']:>10}")
+        finally:
+            borrar(conexion)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# benchmarks/bench_indice_ocupacion.py
+#
+# Comprobación de cupo al crear una reserva: el máximo por día en SQL
+# (SQL_OCUPACION_MAXIMA, lo que hacen los handlers sin índice) frente al
+# índice en memoria de logica/reservas/indice_ocupacion.py. También verifica
+# que el índice da el mismo máximo por día que la BD.
+#
+#   DATABASE_URL=... python benchmarks/bench_indice_ocupacion.py
+
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+from config.bd import engine
+from logica.reservas.indice_ocupacion import IndiceOcupacion
+from logica.reservas.muelle import SQL_OCUPACION_MAXIMA
+from logica.reservas.ocupacion import reconstruir_ocupacion
+
+RESERVAS = int(os.getenv("BENCH_RESERVAS", "100000"))
+LUGARES = int(os.getenv("BENCH_LUGARES", "200"))
+CONSULTAS = int(os.getenv("BENCH_CONSULTAS", "500"))
+
+def consultas_aleatorias(lugares, n):
+    hoy = date.today()
+    for _ in range(n):
+        entrada = hoy + timedelta(days=random.randrange(700))
+        yield {
+            "tenant_id": TENANT_PRUEBA,
+            "lugar_id": random.choice(lugares),
+            "fecha_entrada": entrada,
+            "fecha_salida": entrada + timedelta(days=random.randrange(15)),
+            "excluir": None,
+        }
+
+
+def cronometrar_sql(conexion, consulta, lista):
+    inicio = time.perf_counter()
+    resultados = [conexion.execute(consulta, p).scalar() for p in lista]
+    conexion.commit()
+    return (time.perf_counter() - inicio) * 1000 / len(lista), resultados
+
+
+def main():
+    random.seed(7)
+    with engine.connect() as conexion:
+        try:
+            sembrar(conexion, RESERVAS, n_lugares=LUGARES)
+            reconstruir_ocupacion(conexion, TENANT_PRUEBA)
+            lugares = [row[0] for row in conexion.execute(
+                text("SELECT id FROM lugares WHERE tenant_id = :t"), {"t": TENANT_PRUEBA})]
+
+            indice = IndiceOcupacion(730)
+            inicio = time.perf_counter()
+            indice.calentar(conexion, TENANT_PRUEBA)
+            conexion.commit()
+            calentado = (time.perf_counter() - inicio) * 1000
+
+            lista = list(consultas_aleatorias(lugares, CONSULTAS))
+            dia_ms, maximos_bd = cronometrar_sql(conexion, SQL_OCUPACION_MAXIMA, lista)
+
+            inicio = time.perf_counter()
+            maximos_indice = [
+                indice.maximo_ocupadas(p["tenant_id"], p["lugar_id"], p["fecha_entrada"], p["fecha_salida"])
+                for p in lista
+            ]
+            indice_ms = (time.perf_counter() - inicio) * 1000 / len(lista)
+
+            assert maximos_indice == maximos_bd, "El índice no coincide con la BD"
+
+            print(f"{RESERVAS} reservas, {LUGARES} lugares, {CONSULTAS} comprobaciones")
+            print(f"  calentar índice:           {calentado:10.1f} ms (una vez)")
+            print(f"  máximo por día (SQL):      {dia_ms:10.3f} ms/comprobación")
+            print(f"  índice en memoria:         {indice_ms:10.3f} ms/comprobación")
+        finally:
+            borrar(conexion)
+
+
+if __name__ == "__main__":
+    main()
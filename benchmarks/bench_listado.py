@@ -0,0 +1,74 @@
+# benchmarks/bench_listado.py
+#
+# Listado de admin de un tenant con muchas reservas: la lista entera (lo que
+# devolvía /api/admin/reservas antes de paginar) frente a una página de
+# 'limite' filas al principio y muy al fondo (siguiendo el cursor), y con
+# filtro de lugar y de fechas. Mide ms por petición y bytes del JSON.
+#
+#   DATABASE_URL=postgresql://... python benchmarks/bench_listado.py
+
+import json
+import os
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+from config.bd import engine
+from logica.admin.muelle_admin import SQL_LISTAR_RESERVAS_ADMIN
+from logica.reservas.paginacion import leer_filtros, siguiente_cursor, decodificar_cursor
+
+RESERVAS = int(os.getenv("BENCH_RESERVAS", "100000"))
+LIMITE = int(os.getenv("BENCH_LIMITE", "100"))
+REPETICIONES = int(os.getenv("BENCH_REPETICIONES", "20"))
+
+
+def listar(conexion, filtros):
+    filas = conexion.execute(SQL_LISTAR_RESERVAS_ADMIN, {**filtros, "tenant_id": TENANT_PRUEBA}).mappings()
+    reservas = [dict(fila) for fila in filas]
+    conexion.commit()
+    return reservas
+
+
+def medir(conexion, filtros):
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        reservas = listar(conexion, filtros)
+    ms = (time.perf_counter() - inicio) * 1000 / REPETICIONES
+    return ms, len(reservas), len(json.dumps(reservas, default=str))
+
+
+def main():
+    with engine.connect() as conexion:
+        try:
+            sembrar(conexion, RESERVAS, n_lugares=200)
+            lugar_id = conexion.execute(
+                text("SELECT MIN(id) FROM lugares WHERE tenant_id = :t"), {"t": TENANT_PRUEBA}).scalar()
+            conexion.commit()
+
+            pagina = leer_filtros({"limite": LIMITE}, admin=True)
+            # Cursor a mitad del listado: la página 'profunda' que con OFFSET saldría cara
+            mitad = listar(conexion, {**pagina, "limite": RESERVAS // 2})
+            cursor_fecha, cursor_id = decodificar_cursor(siguiente_cursor(mitad, {"limite": RESERVAS // 2}))
+            hoy = date.today()
+
+            casos = [
+                ("lista entera", {**pagina, "limite": RESERVAS}),
+                ("primera página", pagina),
+                ("página a mitad", {**pagina, "cursor_fecha": cursor_fecha, "cursor_id": cursor_id}),
+                ("por lugar", {**pagina, "lugar_id": lugar_id}),
+                ("por fechas", {**pagina, "desde": hoy + timedelta(days=300), "hasta": hoy + timedelta(days=330)}),
+            ]
+            print(f"{RESERVAS} reservas, páginas de {LIMITE}")
+            print(f"{'listado':>15} | {'ms':>8} | {'filas':>7} | {'KB JSON':>8}")
+            print("-" * 48)
+            for nombre, filtros in casos:
+                ms, filas, bytes_json = medir(conexion, filtros)
+                print(f"{nombre:>15} | {ms:>8.2f} | {filas:>7} | {bytes_json / 1024:>8.1f}")
+        finally:
+            borrar(conexion)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+# benchmarks/bench_modelo_lectura.py
+#
+# Página del listado de admin leída de dos formas sobre un tenant con muchas
+# reservas:
+# - "join":    reservas_generales + reservas_muelle + usuarios + lugares
+#              (lo que hacía /api/admin/reservas antes del modelo de lectura)
+# - "listado": SQL_LISTAR_RESERVAS_ADMIN sobre reservas_listado
+# con y sin filtros y con un cursor a mitad del listado. Mide ms por página.
+#
+#   DATABASE_URL=postgresql://... python benchmarks/bench_modelo_lectura.py
+
+import os
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+from config.bd import engine
+from logica.admin.muelle_admin import SQL_LISTAR_RESERVAS_ADMIN
+from logica.reservas.paginacion import leer_filtros, siguiente_cursor, decodificar_cursor
+
+RESERVAS = int(os.getenv("BENCH_RESERVAS", "100000"))
+LIMITE = int(os.getenv("BENCH_LIMITE", "100"))
+REPETICIONES = int(os.getenv("BENCH_REPETICIONES", "50"))
+
+SQL_LISTAR_CON_JOINS = text("""
+    SELECT rg.id AS reserva_id, rg.fecha, rg.usuario_id, rg.lugar_id,
+           rm.fecha_entrada, rm.fecha_salida, rm.tipo_embarcacion,
+           rm.requiere_pintura, rm.requiere_mecanica, rm.requiere_motor,
+           u.nombre AS usuario, l.nombre AS lugar
+    FROM reservas_generales rg
+    JOIN reservas_muelle rm ON rg.id = rm.reserva_id
+    JOIN usuarios u ON rg.usuario_id = u.id
+    JOIN lugares l ON rg.lugar_id = l.id
+    WHERE rg.tenant_id = :tenant_id
+      AND (CAST(:usuario_id AS INTEGER) IS NULL OR rg.usuario_id = :usuario_id)
+      AND (CAST(:lugar_id AS INTEGER) IS NULL OR rg.lugar_id = :lugar_id)
+      AND (CAST(:tipo_embarcacion AS VARCHAR) IS NULL OR rm.tipo_embarcacion = :tipo_embarcacion)
+      AND (CAST(:desde AS DATE) IS NULL OR rm.fecha_salida >= :desde)
+      AND (CAST(:hasta AS DATE) IS NULL OR rm.fecha_entrada <= :hasta)
+      AND (CAST(:cursor_fecha AS DATE) IS NULL
+           OR (rm.fecha_entrada, rm.reserva_id) < (CAST(:cursor_fecha AS DATE), CAST(:cursor_id AS INTEGER)))
+    ORDER BY rm.fecha_entrada DESC, rm.reserva_id DESC
+    LIMIT :limite
+""")
+
+
+def listar(conexion, consulta, filtros):
+    reservas = [dict(fila) for fila in conexion.execute(
+        consulta, {**filtros, "tenant_id": TENANT_PRUEBA}).mappings()]
+    conexion.commit()
+    return reservas
+
+
+def medir(conexion, consulta, filtros):
+    inicio = time.perf_counter()
+    for _ in range(REPETICIONES):
+        reservas = listar(conexion, consulta, filtros)
+    return (time.perf_counter() - inicio) * 1000 / REPETICIONES, reservas
+
+
+def main():
+    with engine.connect() as conexion:
+        try:
+            sembrar(conexion, RESERVAS, n_lugares=200)
+            lugar_id = conexion.execute(
+                text("SELECT MIN(id) FROM lugares WHERE tenant_id = :t"), {"t": TENANT_PRUEBA}).scalar()
+            conexion.execute(text("ANALYZE reservas_generales, reservas_muelle, reservas_listado"))
+            conexion.commit()
+
+            pagina = leer_filtros({"limite": LIMITE}, admin=True)
+            mitad = listar(conexion, SQL_LISTAR_RESERVAS_ADMIN, {**pagina, "limite": RESERVAS // 2})
+            cursor_fecha, cursor_id = decodificar_cursor(siguiente_cursor(mitad, {"limite": RESERVAS // 2}))
+            hoy = date.today()
+
+            casos = [
+                ("primera página", pagina),
+                ("página a mitad", {**pagina, "cursor_fecha": cursor_fecha, "cursor_id": cursor_id}),
+                ("por lugar", {**pagina, "lugar_id": lugar_id}),
+                ("por fechas", {**pagina, "desde": hoy + timedelta(days=300), "hasta": hoy + timedelta(days=330)}),
+            ]
+            print(f"{RESERVAS} reservas, páginas de {LIMITE} (ms/página)")
+            print(f"{'listado':>15} | {'join':>8} | {'listado':>8}")
+            print("-" * 38)
+            for nombre, filtros in casos:
+                join_ms, antes = medir(conexion, SQL_LISTAR_CON_JOINS, filtros)
+                listado_ms, ahora = medir(conexion, SQL_LISTAR_RESERVAS_ADMIN, filtros)
+                assert antes == ahora, f"{nombre}: los dos listados no coinciden"
+                print(f"{nombre:>15} | {join_ms:>8.2f} | {listado_ms:>8.2f}")
+        finally:
+            borrar(conexion)
+
+
+if __name__ == "__main__":
+    main()
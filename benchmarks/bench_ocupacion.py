@@ -0,0 +1,103 @@
+# benchmarks/bench_ocupacion.py
+#
+# Tiempo de /api/disponibilidad con la consulta anterior (generate_series x
+# lugares x reservas) frente a la tabla ocupacion_diaria.
+#
+# Uso:
+#   DATABASE_URL=postgresql://... python benchmarks/bench_ocupacion.py
+#   BENCH_TAMANOS=10000,100000 python benchmarks/bench_ocupacion.py
+#
+# Siembra un tenant de prueba (ver datos_prueba.py) y lo borra al terminar.
+
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from config.bd import engine
+from logica.reservas.muelle import ReservaMuelle, SQL_ESTANCIAS_EN_RANGO
+from logica.reservas.disponibilidad import SQL_OCUPACION_DIARIA_RANGO
+from logica.reservas.ocupacion import reconstruir_ocupacion
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+
+TAMANOS = [int(n) for n in os.getenv("BENCH_TAMANOS", "10000,100000,1000000").split(",")]
+LUGARES = int(os.getenv("BENCH_LUGARES", "200"))
+REPETICIONES = int(os.getenv("BENCH_REPETICIONES", "3"))
+VENTANAS = [30, 365]
+
+# Consulta que usaba consultar_disponibilidad_por_dias antes de ocupacion_diaria
+SQL_ANTERIOR = text("""
+    WITH dias AS (
+        SELECT generate_series(:fecha_inicio, :fecha_fin, interval '1 day')::date AS dia
+    ),
+    ocupacion AS (
+        SELECT
+            l.id AS lugar_id,
+            l.nombre AS nombre,
+            l.capacidad AS capacidad,
+            d.dia,
+            COUNT(DISTINCT rm.reserva_id) AS ocupadas
+        FROM lugares l
+        JOIN dias d ON TRUE
+        LEFT JOIN reservas_generales rg ON l.id = rg.lugar_id
+        LEFT JOIN reservas_muelle rm ON rg.id = rm.reserva_id
+            AND d.dia BETWEEN rm.fecha_entrada AND rm.fecha_salida
+        WHERE l.tenant_id = :tenant_id
+        GROUP BY l.id, l.nombre, l.capacidad, d.dia
+        ORDER BY l.id, d.dia
+    )
+    SELECT * FROM ocupacion
+""")
+
+
+def cronometrar(conexion, consulta, parametros):
+    mejor = None
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        conexion.execute(consulta, parametros).fetchall()
+        conexion.commit()
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor * 1000
+
+
+def main():
+    hoy = date.today()
+    print(f"{'reservas':>10} | {'días':>5} | {'anterior ms':>12} | {'tabla ms':>9} | "
+          f"{'barrido ms':>10} | {'handler ms':>10}")
+    print("-" * 73)
+    with engine.connect() as conexion:
+        try:
+            for n in TAMANOS:
+                sembrar(conexion, n, n_lugares=LUGARES)
+                reconstruir_ocupacion(conexion, TENANT_PRUEBA)
+                conexion.execute(text("ANALYZE ocupacion_diaria"))
+                conexion.commit()
+                for dias in VENTANAS:
+                    parametros = {
+                        "tenant_id": TENANT_PRUEBA,
+                        "fecha_inicio": hoy,
+                        "fecha_fin": hoy + timedelta(days=dias - 1),
+                        "lugares": None,
+                    }
+                    anterior = cronometrar(conexion, SQL_ANTERIOR, parametros)
+                    nueva = cronometrar(conexion, SQL_OCUPACION_DIARIA_RANGO, parametros)
+                    barrido = cronometrar(conexion, SQL_ESTANCIAS_EN_RANGO, parametros)
+
+                    handler = ReservaMuelle(conexion, TENANT_PRUEBA)
+                    inicio = time.perf_counter()
+                    handler.consultar_disponibilidad_por_dias(
+                        str(parametros["fecha_inicio"]), str(parametros["fecha_fin"]))
+                    completo = (time.perf_counter() - inicio) * 1000
+
+                    print(f"{n:>10} | {dias:>5} | {anterior:>12.1f} | {nueva:>9.1f} | "
+                          f"{barrido:>10.1f} | {completo:>10.1f}")
+        finally:
+            borrar(conexion)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_ocupacion_maxima.py
+#
+# Comprobación de cupo de una estancia de 1, 30 y 365 días con las tres
+# formas que ha tenido el código:
+# - "por día":   generate_series con un día por fila, COUNT por día y MAX
+#                (el alta de admin antes de SQL_OCUPACION_MAXIMA)
+# - "COUNT":     reservas que se solapan con el rango (la edición y el alta
+#                de usuario antes); cuenta como simultáneas reservas que no
+#                coinciden ningún día, así que rechaza de más
+# - "barrido":   SQL_OCUPACION_MAXIMA (+1/-1 por estancia y suma acumulada)
+# Verifica que "barrido" da el mismo pico que "por día" y cuenta en cuántas
+# comprobaciones COUNT da más que el pico real.
+#
+#   DATABASE_URL=postgresql://... python benchmarks/bench_ocupacion_maxima.py
+
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+from config.bd import engine
+from logica.reservas.muelle import SQL_OCUPACION_MAXIMA
+
+RESERVAS = int(os.getenv("BENCH_RESERVAS", "100000"))
+LUGARES = int(os.getenv("BENCH_LUGARES", "200"))
+CONSULTAS = int(os.getenv("BENCH_CONSULTAS", "200"))
+DURACIONES = [1, 30, 365]
+
+SQL_POR_DIA = text("""
+    SELECT COALESCE(MAX(ocupadas), 0) FROM (
+        SELECT COUNT(*) AS ocupadas
+        FROM generate_series(CAST(:fecha_entrada AS DATE), CAST(:fecha_salida AS DATE), interval '1 day') d(dia)
+        JOIN reservas_muelle rm ON d.dia BETWEEN rm.fecha_entrada AND rm.fecha_salida
+        JOIN reservas_generales rg ON rm.reserva_id = rg.id
+        WHERE rg.lugar_id = :lugar_id AND rg.tenant_id = :tenant_id
+        GROUP BY d.dia
+    ) x
+""")
+
+SQL_COUNT = text("""
+    SELECT COUNT(*) FROM reservas_generales rg
+    JOIN reservas_muelle rm ON rg.id = rm.reserva_id
+    WHERE rg.lugar_id = :lugar_id
+      AND rg.tenant_id = :tenant_id
+      AND daterange(rm.fecha_entrada, rm.fecha_salida, '[]') &&
+          daterange(CAST(:fecha_entrada AS DATE), CAST(:fecha_salida AS DATE), '[]')
+""")
+
+
+def consultas(lugares, duracion, n):
+    hoy = date.today()
+    for _ in range(n):
+        entrada = hoy + timedelta(days=random.randrange(730 - duracion))
+        yield {
+            "tenant_id": TENANT_PRUEBA,
+            "lugar_id": random.choice(lugares),
+            "fecha_entrada": entrada,
+            "fecha_salida": entrada + timedelta(days=duracion - 1),
+            "excluir": None,
+        }
+
+
+def cronometrar(conexion, consulta, lista):
+    inicio = time.perf_counter()
+    resultados = [conexion.execute(consulta, p).scalar() for p in lista]
+    conexion.commit()
+    return (time.perf_counter() - inicio) * 1000 / len(lista), resultados
+
+
+def main():
+    random.seed(3)
+    with engine.connect() as conexion:
+        try:
+            sembrar(conexion, RESERVAS, n_lugares=LUGARES)
+            lugares = [row[0] for row in conexion.execute(
+                text("SELECT id FROM lugares WHERE tenant_id = :t"), {"t": TENANT_PRUEBA})]
+
+            print(f"{RESERVAS} reservas, {LUGARES} lugares, {CONSULTAS} comprobaciones por duración (ms/comprobación)")
+            print(f"{'días':>5} | {'por día':>8} | {'COUNT':>8} | {'barrido':>8} | {'COUNT > pico':>12}")
+            print("-" * 55)
+            for duracion in DURACIONES:
+                lista = list(consultas(lugares, duracion, CONSULTAS))
+                por_dia_ms, picos = cronometrar(conexion, SQL_POR_DIA, lista)
+                count_ms, counts = cronometrar(conexion, SQL_COUNT, lista)
+                barrido_ms, barridos = cronometrar(conexion, SQL_OCUPACION_MAXIMA, lista)
+
+                assert barridos == picos, "El barrido no coincide con el máximo por día"
+                de_mas = sum(c > p for c, p in zip(counts, picos))
+                print(f"{duracion:>5} | {por_dia_ms:>8.3f} | {count_ms:>8.3f} | {barrido_ms:>8.3f} | "
+                      f"{de_mas / len(lista):>11.0%}")
+        finally:
+            borrar(conexion)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# benchmarks/bench_pool_conexiones.py
+#
+# Compara el patrón anterior (una sola conexión global compartida por todas
+# las peticiones) con el pool de conexiones por petición de config/bd.py.
+#
+# Uso:
+#   DATABASE_URL=postgresql://... python benchmarks/bench_pool_conexiones.py
+#
+# Cada "petición" simulada hace una consulta con pg_sleep para imitar el
+# tiempo de ida y vuelta a Postgres. Con la conexión global el throughput
+# se queda plano; con el pool crece con el número de hilos.
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from config.bd import engine, DB_POOL_SIZE, DB_MAX_OVERFLOW
+
+PETICIONES = int(os.getenv("BENCH_PETICIONES", "400"))
+LATENCIA_MS = float(os.getenv("BENCH_LATENCIA_MS", "5"))
+HILOS = [1, 2, 4, 8, 16, 32]
+
+CONSULTA = text("SELECT pg_sleep(:segundos), COUNT(*) FROM negocios")
+
+
+def peticion_global(conexion, candado):
+    # Una sola conexión: las peticiones se forman en fila
+    with candado:
+        conexion.execute(CONSULTA, {"segundos": LATENCIA_MS / 1000}).fetchall()
+        conexion.commit()
+
+
+def peticion_pool():
+    # Igual que obtener_db()/cerrar_db(): se toma y se devuelve al pool
+    with engine.connect() as conexion:
+        conexion.execute(CONSULTA, {"segundos": LATENCIA_MS / 1000}).fetchall()
+        conexion.commit()
+
+
+def medir(funcion, hilos):
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as ejecutor:
+        list(ejecutor.map(lambda _: funcion(), range(PETICIONES)))
+    return PETICIONES / (time.perf_counter() - inicio)
+
+
+def main():
+    print(f"Pool: size={DB_POOL_SIZE} overflow={DB_MAX_OVERFLOW} | "
+          f"{PETICIONES} peticiones, latencia simulada {LATENCIA_MS} ms\n")
+    print(f"{'hilos':>6} | {'global (req/s)':>15} | {'pool (req/s)':>13}")
+    print("-" * 42)
+
+    conexion_global = engine.connect()
+    candado = threading.Lock()
+    try:
+        for hilos in HILOS:
+            global_rps = medir(lambda: peticion_global(conexion_global, candado), hilos)
+            pool_rps = medir(peticion_pool, hilos)
+            print(f"{hilos:>6} | {global_rps:>15.1f} | {pool_rps:>13.1f}")
+    finally:
+        conexion_global.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# benchmarks/bench_serializacion.py
+#
+# Coste de consultar y codificar el listado de admin con N reservas:
+# - "antes":  fechas en texto con TO_CHAR en la consulta y el jsonify por
+#             defecto de Flask (json de la biblioteca estándar)
+# - "ahora":  fechas como date y config/serializacion.py (orjson si está
+#             instalado, si no el json estándar con las mismas reglas)
+# Mide por separado la consulta y la codificación de la respuesta.
+#
+#   DATABASE_URL=postgresql://... python benchmarks/bench_serializacion.py
+
+import os
+import time
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import text
+
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+from config.bd import engine
+from config.serializacion import ProveedorJSON, MOTOR_JSON
+from logica.admin.muelle_admin import SQL_LISTAR_RESERVAS_ADMIN
+from logica.reservas.paginacion import leer_filtros
+
+RESERVAS = int(os.getenv("BENCH_RESERVAS", "100000"))
+REPETICIONES = int(os.getenv("BENCH_REPETICIONES", "5"))
+
+# El listado tal como estaba antes (fechas formateadas por Postgres)
+SQL_LISTAR_CON_TO_CHAR = text(
+    SQL_LISTAR_RESERVAS_ADMIN.text
+    .replace("rl.fecha_entrada,\n", "TO_CHAR(rl.fecha_entrada, 'YYYY-MM-DD') AS fecha_entrada,\n", 1)
+    .replace("rl.fecha_salida,\n", "TO_CHAR(rl.fecha_salida, 'YYYY-MM-DD') AS fecha_salida,\n", 1)
+)
+
+
+def app_con(proveedor):
+    app = Flask(__name__)
+    app.json = proveedor(app)
+    return app
+
+
+def medir(conexion, consulta, app):
+    parametros = {**leer_filtros({}, admin=True, stream=True), "tenant_id": TENANT_PRUEBA}
+    consulta_s = codificar_s = 0.0
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        filas = [dict(fila) for fila in conexion.execute(consulta, parametros).mappings()]
+        conexion.commit()
+        consulta_s += time.perf_counter() - inicio
+
+        with app.app_context():
+            inicio = time.perf_counter()
+            cuerpo = app.json.response(filas).get_data()
+            codificar_s += time.perf_counter() - inicio
+    return consulta_s * 1000 / REPETICIONES, codificar_s * 1000 / REPETICIONES, len(cuerpo)
+
+
+def main():
+    with engine.connect() as conexion:
+        try:
+            sembrar(conexion, RESERVAS, n_lugares=200)
+            print(f"{RESERVAS} reservas, media de {REPETICIONES} listados completos (motor: {MOTOR_JSON})")
+            print(f"{'modo':>6} | {'consulta ms':>11} | {'codificar ms':>12} | {'MB':>6}")
+            print("-" * 46)
+            for nombre, consulta, proveedor in (
+                ("antes", SQL_LISTAR_CON_TO_CHAR, DefaultJSONProvider),
+                ("ahora", SQL_LISTAR_RESERVAS_ADMIN, ProveedorJSON),
+            ):
+                consulta_ms, codificar_ms, bytes_cuerpo = medir(conexion, consulta, app_con(proveedor))
+                print(f"{nombre:>6} | {consulta_ms:>11.1f} | {codificar_ms:>12.1f} | {bytes_cuerpo / 2**20:>6.1f}")
+        finally:
+            borrar(conexion)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+# benchmarks/bench_singleflight.py
+#
+# Ráfaga de peticiones idénticas a consultar_disponibilidad_por_dias (la misma
+# ventana de un mes, todas a la vez) con y sin agrupar las llamadas en curso
+# (logica/singleflight.py). Cuenta cuántas veces llega a Postgres la consulta
+# de ocupación. La cache de resultados se desactiva para medir solo el
+# agrupamiento.
+#
+#   DATABASE_URL=postgresql://... python benchmarks/bench_singleflight.py
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, event
+
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+from config.bd import DATABASE_URL
+from logica.reservas.muelle import ReservaMuelle
+from logica.reservas.ocupacion import reconstruir_ocupacion
+from logica.reservas.disponibilidad import SQL_OCUPACION_DIARIA_RANGO
+from logica.singleflight import SingleFlight
+from logica.versiones import cache_disponibilidad
+from logica.reservas import base
+
+RAFAGA = int(os.getenv("BENCH_RAFAGA", "64"))
+RESERVAS = int(os.getenv("BENCH_RESERVAS", "100000"))
+
+# Engine propio con una conexión por petición simultánea (como el pool de la app)
+engine = create_engine(DATABASE_URL, pool_size=RAFAGA, max_overflow=0)
+consultas = 0
+_candado = threading.Lock()
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def contar(conn, cursor, statement, parameters, context, executemany):
+    global consultas
+    if statement == str(SQL_OCUPACION_DIARIA_RANGO.compile(dialect=engine.dialect)):
+        with _candado:
+            consultas += 1
+
+
+def rafaga(inicio, fin):
+    global consultas
+    consultas = 0
+    barrera = threading.Barrier(RAFAGA)
+
+    def peticion(_):
+        with engine.connect() as db:
+            handler = ReservaMuelle(db, TENANT_PRUEBA)
+            barrera.wait()
+            t0 = time.perf_counter()
+            resultado = handler.consultar_disponibilidad_por_dias(inicio, fin)
+            db.commit()
+            assert not isinstance(resultado, dict), resultado
+            return time.perf_counter() - t0
+
+    with ThreadPoolExecutor(RAFAGA) as pool:
+        t0 = time.perf_counter()
+        latencias = sorted(pool.map(peticion, range(RAFAGA)))
+        total = time.perf_counter() - t0
+    return consultas, total, latencias[len(latencias) // 2], latencias[-1]
+
+
+def main():
+    cache_disponibilidad.max_bytes = 0  # solo medimos el agrupamiento
+    hoy = date.today()
+    inicio, fin = str(hoy), str(hoy + timedelta(days=30))
+
+    with engine.connect() as conexion:
+        sembrar(conexion, RESERVAS)
+        reconstruir_ocupacion(conexion, TENANT_PRUEBA)
+    try:
+        print(f"Ráfaga de {RAFAGA} peticiones idénticas ({RESERVAS} reservas, ventana {inicio}..{fin})")
+        print(f"{'modo':>14} | {'consultas BD':>12} | {'total ms':>9} | {'p50 ms':>8} | {'máx ms':>8}")
+        print("-" * 64)
+        for nombre, vuelos in (("sin agrupar", None), ("single-flight", SingleFlight())):
+            if vuelos is None:
+                base.vuelos_disponibilidad = _SinAgrupar()
+            else:
+                base.vuelos_disponibilidad = vuelos
+            n, total, p50, maximo = rafaga(inicio, fin)
+            print(f"{nombre:>14} | {n:>12} | {total * 1000:>9.1f} | {p50 * 1000:>8.1f} | {maximo * 1000:>8.1f}")
+    finally:
+        with engine.connect() as conexion:
+            borrar(conexion)
+
+
+class _SinAgrupar:
+    def ejecutar(self, clave, funcion):
+        return funcion()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# benchmarks/bench_stream.py
+#
+# Memoria de un listado de admin completo (exportación) con N reservas:
+# - "lista":  todas las filas en una lista y jsonify (lo que hacía
+#             /api/admin/reservas antes de paginar)
+# - "json" / "ndjson": /api/admin/reservas?stream=..., leyendo la
+#             respuesta por trozos como lo haría el servidor WSGI
+# Mide el pico de memoria de Python (tracemalloc) y el tiempo. Con stream el
+# pico no debe crecer con N.
+#
+#   DATABASE_URL=postgresql://... python benchmarks/bench_stream.py
+
+import os
+import time
+import tracemalloc
+
+os.environ.setdefault("RUN_INIT_DB", "false")
+
+from flask import jsonify
+from flask_jwt_extended import create_access_token
+
+from datos_prueba import sembrar, borrar, TENANT_PRUEBA
+from config.bd import engine
+from logica.admin.muelle_admin import SQL_LISTAR_RESERVAS_ADMIN
+from logica.reservas.paginacion import leer_filtros
+import app as aplicacion
+
+TAMANOS = [int(n) for n in os.getenv("BENCH_RESERVAS", "10000,100000").split(",")]
+
+
+def lista(cliente, cabeceras):
+    with aplicacion.app.app_context(), engine.connect() as db:
+        filas = db.execute(SQL_LISTAR_RESERVAS_ADMIN, {
+            **leer_filtros({}, admin=True, stream=True), "tenant_id": TENANT_PRUEBA}).mappings()
+        return len(jsonify([dict(fila) for fila in filas]).get_data())
+
+
+def stream(formato):
+    def pedir(cliente, cabeceras):
+        respuesta = cliente.get(f"/api/admin/reservas?stream={formato}", headers=cabeceras, buffered=False)
+        total = sum(len(trozo) for trozo in respuesta.response)
+        respuesta.close()
+        return total
+    return pedir
+
+
+MODOS = [("lista", lista), ("json", stream("json")), ("ndjson", stream("ndjson"))]
+
+
+def main():
+    cliente = aplicacion.app.test_client()
+    print(f"{'reservas':>8} | {'modo':>6} | {'pico MB':>8} | {'segundos':>8} | {'MB enviados':>11}")
+    print("-" * 56)
+    with engine.connect() as conexion:
+        try:
+            for n in TAMANOS:
+                usuario_id = sembrar(conexion, n, n_lugares=200)
+                with aplicacion.app.app_context():
+                    token = create_access_token(identity=str(usuario_id), additional_claims={
+                        "rol_id": 2, "tenant_id": TENANT_PRUEBA, "tipo_negocio": "muelle"})
+                cabeceras = {"Authorization": f"Bearer {token}"}
+
+                for nombre, modo in MODOS:
+                    tracemalloc.start()
+                    inicio = time.perf_counter()
+                    enviados = modo(cliente, cabeceras)
+                    segundos = time.perf_counter() - inicio
+                    _, pico = tracemalloc.get_traced_memory()
+                    tracemalloc.stop()
+                    print(f"{n:>8} | {nombre:>6} | {pico / 2**20:>8.1f} | {segundos:>8.2f} | "
+                          f"{enviados / 2**20:>11.1f}")
+        finally:
+            borrar(conexion)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# benchmarks/bench_tramos.py
+#
+# Micro-benchmark de calcular_tramos_con_cupos: implementación anterior
+# (dict de strings + strptime por día) frente a los arreglos por
+# desplazamiento de logica/reservas/tramos.py, con y sin NumPy.
+# No necesita base de datos.
+#
+#   python benchmarks/bench_tramos.py
+
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from logica.reservas import tramos
+
+LUGARES = int(os.getenv("BENCH_LUGARES", "200"))
+DIAS = int(os.getenv("BENCH_DIAS", "365"))
+REPETICIONES = int(os.getenv("BENCH_REPETICIONES", "5"))
+
+
+def tramos_anterior(disponibles_por_dia):
+    # Copia de la función anidada que tenía ReservaMuelle.consultar_disponibilidad_por_dias
+    fechas = sorted(disponibles_por_dia.keys())
+    resultado = []
+    inicio = None
+    fin = None
+    min_cupos = None
+
+    for fecha_str in fechas:
+        disponibles = disponibles_por_dia[fecha_str]
+        fecha = datetime.strptime(fecha_str, "%Y-%m-%d").date()
+
+        if disponibles > 0:
+            if inicio is None:
+                inicio = fecha
+                fin = fecha
+                min_cupos = disponibles
+            elif fecha == fin + timedelta(days=1):
+                fin = fecha
+                min_cupos = min(min_cupos, disponibles)
+            else:
+                resultado.append({"inicio": inicio.strftime("%Y-%m-%d"), "fin": fin.strftime("%Y-%m-%d"), "cupos": min_cupos})
+                inicio = fecha
+                fin = fecha
+                min_cupos = disponibles
+        else:
+            if inicio is not None:
+                resultado.append({"inicio": inicio.strftime("%Y-%m-%d"), "fin": fin.strftime("%Y-%m-%d"), "cupos": min_cupos})
+                inicio = None
+                fin = None
+                min_cupos = None
+
+    if inicio is not None:
+        resultado.append({"inicio": inicio.strftime("%Y-%m-%d"), "fin": fin.strftime("%Y-%m-%d"), "cupos": min_cupos})
+
+    if fechas:
+        ultima_fecha = datetime.strptime(fechas[-1], "%Y-%m-%d").date()
+        resultado.append({"inicio_abierta": (ultima_fecha + timedelta(days=1)).strftime("%Y-%m-%d")})
+
+    return resultado
+
+
+def generar(inicio):
+    random.seed(42)
+    lugares = []
+    for _ in range(LUGARES):
+        capacidad = random.randint(1, 6)
+        ocupadas = [min(capacidad, max(0, int(random.gauss(capacidad * 0.7, 2)))) for _ in range(DIAS)]
+        lugares.append((capacidad, ocupadas))
+    return lugares
+
+
+def correr_anterior(inicio, lugares):
+    # Incluye armar el dict por día, que también era parte del coste
+    salida = []
+    for capacidad, ocupadas in lugares:
+        por_dia = {}
+        for n, ocupada in enumerate(ocupadas):
+            por_dia[(inicio + timedelta(days=n)).strftime("%Y-%m-%d")] = capacidad - ocupada
+        salida.append(tramos_anterior(por_dia))
+    return salida
+
+
+def correr_nuevo(inicio, lugares):
+    salida = []
+    for capacidad, ocupadas in lugares:
+        arreglo = tramos.arreglo_dias(DIAS)
+        tramos.asignar_por_desplazamiento(arreglo, range(DIAS), ocupadas)
+        salida.append(tramos.calcular_tramos_con_cupos(inicio, tramos.restar_de(capacidad, arreglo)))
+    return salida
+
+
+def cronometrar(funcion, *args):
+    mejor = None
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultado = funcion(*args)
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor * 1000, resultado
+
+
+def main():
+    inicio = date.today()
+    lugares = generar(inicio)
+    print(f"{LUGARES} lugares x {DIAS} días (mejor de {REPETICIONES})\n")
+
+    t_anterior, esperado = cronometrar(correr_anterior, inicio, lugares)
+    print(f"anterior (dict + strptime): {t_anterior:8.1f} ms")
+
+    numpy = tramos.np
+    if numpy is not None:
+        t_numpy, resultado = cronometrar(correr_nuevo, inicio, lugares)
+        assert resultado == esperado, "NumPy no produce el mismo JSON"
+        print(f"arreglos + NumPy:           {t_numpy:8.1f} ms  ({t_anterior / t_numpy:.1f}x)")
+
+    tramos.np = None
+    try:
+        t_python, resultado = cronometrar(correr_nuevo, inicio, lugares)
+    finally:
+        tramos.np = numpy
+    assert resultado == esperado, "La versión sin NumPy no produce el mismo JSON"
+    print(f"arreglos sin NumPy:         {t_python:8.1f} ms  ({t_anterior / t_python:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
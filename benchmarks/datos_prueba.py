@@ -0,0 +1,87 @@
+# benchmarks/datos_prueba.py
+#
+# Siembra un tenant de prueba con lugares y reservas aleatorias para los
+# benchmarks, y lo borra al terminar. No toca los datos de otros tenants.
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+
+TENANT_PRUEBA = int(os.getenv("BENCH_TENANT", "9001"))
+
+SQL_NEGOCIO = text("""
+    INSERT INTO negocios (id, nombre, tipo) VALUES (:tenant_id, 'Benchmark', 'muelle')
+    ON CONFLICT (id) DO NOTHING
+""")
+
+SQL_USUARIO = text("""
+    INSERT INTO usuarios (nombre, correo, clave, rol_id, tenant_id)
+    VALUES ('Bench', :correo, 'x', 1, :tenant_id)
+    RETURNING id
+""")
+
+SQL_LUGARES = text("""
+    INSERT INTO lugares (nombre, capacidad, zona, tipo, tenant_id)
+    SELECT 'Lugar ' || n, :capacidad, 'Zona ' || (n % 4), 'muelle', :tenant_id
+    FROM generate_series(1, :n_lugares) AS n
+""")
+
+# Reservas de 0 a :max_dias días repartidas en :horizonte días desde :desde
+SQL_RESERVAS = text("""
+    WITH ids AS (
+        SELECT array_agg(id) AS lugares FROM lugares WHERE tenant_id = :tenant_id
+    ),
+    nuevas AS (
+        INSERT INTO reservas_generales (usuario_id, lugar_id, tenant_id, fecha)
+        SELECT :usuario_id,
+               ids.lugares[1 + floor(random() * array_length(ids.lugares, 1))::int],
+               :tenant_id, CURRENT_DATE
+        FROM ids, generate_series(1, :n_reservas)
+        RETURNING id
+    )
+    INSERT INTO reservas_muelle (reserva_id, fecha_entrada, fecha_salida, tipo_embarcacion,
+                                 requiere_pintura, requiere_mecanica, requiere_motor)
+    SELECT id, entrada, entrada + floor(random() * (:max_dias + 1))::int, 'Yate', FALSE, FALSE, FALSE
+    FROM (
+        SELECT id, CAST(:desde AS DATE) + floor(random() * :horizonte)::int AS entrada FROM nuevas
+    ) x
+""")
+
+
+def sembrar(conexion, n_reservas, n_lugares=200, capacidad=50, desde=None,
+            horizonte=730, max_dias=14, tenant_id=TENANT_PRUEBA):
+    from datetime import date
+    borrar(conexion, tenant_id)
+    conexion.execute(SQL_NEGOCIO, {"tenant_id": tenant_id})
+    usuario_id = conexion.execute(SQL_USUARIO, {
+        "correo": f"bench-{tenant_id}@example.com", "tenant_id": tenant_id
+    }).scalar()
+    conexion.execute(SQL_LUGARES, {"tenant_id": tenant_id, "n_lugares": n_lugares, "capacidad": capacidad})
+    conexion.execute(SQL_RESERVAS, {
+        "tenant_id": tenant_id,
+        "usuario_id": usuario_id,
+        "n_reservas": n_reservas,
+        "desde": desde or date.today(),
+        "horizonte": horizonte,
+        "max_dias": max_dias,
+    })
+    conexion.commit()
+    conexion.execute(text("ANALYZE"))
+    conexion.commit()
+    return usuario_id
+
+
+def borrar(conexion, tenant_id=TENANT_PRUEBA):
+    for sql in (
+        "DELETE FROM ocupacion_diaria WHERE tenant_id = :t",
+        "DELETE FROM reservas_muelle WHERE reserva_id IN (SELECT id FROM reservas_generales WHERE tenant_id = :t)",
+        "DELETE FROM reservas_generales WHERE tenant_id = :t",
+        "DELETE FROM lugares WHERE tenant_id = :t",
+        "DELETE FROM usuarios WHERE tenant_id = :t",
+        "DELETE FROM negocios WHERE id = :t",
+    ):
+        conexion.execute(text(sql), {"t": tenant_id})
+    conexion.commit()
@@ -0,0 +1,33 @@
+# En config/bd_async.py
+#
+# Engine asíncrono para el modo ASGI (asgi.py). Usa el mismo DATABASE_URL y
+# el mismo tamaño de pool que config/bd.py, pero con el driver asyncpg.
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from config.bd import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT
+
+
+def _url_async(url):
+    # postgresql://... o postgresql+psycopg2://...  ->  postgresql+asyncpg://...
+    esquema, resto = url.split("://", 1)
+    return f"postgresql+asyncpg://{resto}"
+
+
+async_engine = create_async_engine(
+    _url_async(DATABASE_URL),
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=True,
+)
+
+
+async def ejecutar_en_conexion(funcion):
+    """
+    Ejecuta funcion(db) con una conexión del pool asíncrono.
+    'db' se comporta como una Connection síncrona, así que los mismos
+    handlers de logica/ (ReservaMuelle, AdminReservaMuelle...) funcionan
+    sin cambios; por debajo cada consulta libera el event loop.
+    """
+    async with async_engine.connect() as conexion:
+        return await conexion.run_sync(funcion)
@@ -0,0 +1,16 @@
+# En config/seguridad.py
+import os
+
+# Clave con la que se firman los JWT. La comparten el modo Flask (app.py)
+# y el modo asíncrono (asgi.py), así un token sirve en los dos.
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "supersecreto")
+
+# Orígenes del front que pueden llamar a la API (CORS)
+ORIGENES_CORS = [
+    "http://localhost:3000",
+    "https://reservas.systempiura.com",
+    "http://reservas.systempiura.com"
+]
+
+# Cabeceras de respuesta que el front puede leer (fetch solo ve las básicas)
+CABECERAS_EXPUESTAS = ["X-Siguiente-Cursor", "ETag"]
@@ -0,0 +1,71 @@
+# config/serializacion.py
+#
+# Codificación JSON de todas las respuestas (jsonify en app.py, el modo
+# ASGI y los listados en streaming). Con orjson (opcional, ver
+# requirements.txt) se codifica en C; sin él se usa el json de la
+# biblioteca estándar con las mismas reglas:
+# - date / datetime -> ISO 8601 ('YYYY-MM-DD', 'YYYY-MM-DDTHH:MM:SS')
+# - Decimal -> texto, como hacía Flask (sin perder precisión)
+# - claves ordenadas y sin espacios; UTF-8 sin escapar
+#
+# Las consultas devuelven las fechas como date (sin TO_CHAR) y el formato
+# se aplica aquí, una sola vez, al codificar.
+
+import json
+from datetime import date, datetime
+from decimal import Decimal
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+MOTOR_JSON = "orjson" if orjson is not None else "json"
+
+if orjson is not None:
+    _OPCIONES = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS
+
+
+def _por_defecto(valor):
+    # Lo que ninguno de los dos codifica por su cuenta (y las fechas, en json)
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, (date, datetime)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo no serializable: {type(valor).__name__}")
+
+
+def a_json(valor, indentar=False):
+    """JSON de 'valor' como bytes UTF-8."""
+    if orjson is not None:
+        opciones = (_OPCIONES | orjson.OPT_INDENT_2) if indentar else _OPCIONES
+        return orjson.dumps(valor, default=_por_defecto, option=opciones)
+    return json.dumps(
+        valor, default=_por_defecto, sort_keys=True, ensure_ascii=False,
+        indent=2 if indentar else None, separators=None if indentar else (",", ":"),
+    ).encode("utf-8")
+
+
+def de_json(texto):
+    return orjson.loads(texto) if orjson is not None else json.loads(texto)
+
+
+class ProveedorJSON(DefaultJSONProvider):
+    """
+    Proveedor de JSON de Flask (app.json) sobre a_json. Como el de Flask,
+    indenta en modo debug y es compacto en producción.
+    """
+
+    def dumps(self, obj, **kwargs):
+        return a_json(obj).decode("utf-8")
+
+    def loads(self, s, **kwargs):
+        return de_json(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indentar = self.compact is False or (self.compact is None and self._app.debug)
+        # Con el salto de línea final, como jsonify
+        return self._app.response_class(a_json(obj, indentar=indentar) + b"\n", mimetype=self.mimetype)
@@ -11,6 +11,10 @@ from modelos.usuario_model import Usuario, Rol
 from modelos.lugar_model import Lugar
 from modelos.reserva_general_model import ReservaGeneral
 from modelos.reserva_muelle import ReservaMuelle
+from modelos.ocupacion_diaria_model import OcupacionDiaria
+from modelos.reserva_listado_model import ReservaListado
+from logica.reservas.listado import rellenar_si_vacio
+from logica.reservas.ocupacion import rellenar_si_vacia
 
 # --- DEFINE TUS DATOS INICIALES AQUÍ ---
 ADMIN_EMAIL = "admin@systempiura.com"
@@ -18,6 +22,306 @@ ADMIN_CLAVE = "admin123"
 NEGOCIO_NOMBRE = "Muelle Principal"
 NEGOCIO_TIPO = "muelle"
 
+# --- COLUMNAS NUEVAS, ÍNDICES Y RESTRICCIONES DE LAS CONSULTAS MÁS USADAS ---
+# create_all solo crea índices al crear la tabla, así que se aplican aquí
+# (IF NOT EXISTS: es seguro correrlo en cada arranque y sobre BDs existentes).
+INDICES = [
+    # Columnas añadidas a tablas que ya existían
+    "ALTER TABLE lugares ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0",
+    # Reservas de un lugar / de un usuario dentro del tenant
+    "CREATE INDEX IF NOT EXISTS ix_reservas_generales_tenant_lugar "
+    "ON reservas_generales (tenant_id, lugar_id)",
+    "CREATE INDEX IF NOT EXISTS ix_reservas_generales_tenant_usuario "
+    "ON reservas_generales (tenant_id, usuario_id)",
+    # Solapamientos: daterange(fecha_entrada, fecha_salida, '[]') && ...
+    "CREATE INDEX IF NOT EXISTS ix_reservas_muelle_rango "
+    "ON reservas_muelle USING gist (daterange(fecha_entrada, fecha_salida, '[]'))",
+    # Listados: ORDER BY fecha_entrada DESC
+    "CREATE INDEX IF NOT EXISTS ix_reservas_muelle_entrada "
+    "ON reservas_muelle (fecha_entrada DESC, reserva_id DESC)",
+    # Listados (modelo de lectura reservas_listado): cada filtro tiene su
+    # índice con el orden de la página detrás, así la consulta es un solo
+    # recorrido de índice que para al llenar la página
+    "CREATE INDEX IF NOT EXISTS ix_reservas_listado_tenant_entrada "
+    "ON reservas_listado (tenant_id, fecha_entrada DESC, reserva_id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_reservas_listado_tenant_usuario "
+    "ON reservas_listado (tenant_id, usuario_id, fecha_entrada DESC, reserva_id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_reservas_listado_tenant_lugar "
+    "ON reservas_listado (tenant_id, lugar_id, fecha_entrada DESC, reserva_id DESC)",
+    "CREATE INDEX IF NOT EXISTS ix_reservas_listado_tenant_tipo "
+    "ON reservas_listado (tenant_id, tipo_embarcacion, fecha_entrada DESC, reserva_id DESC)",
+    # ?desde= filtra por la salida: con pocas filas que cumplan, el
+    # recorrido en orden de fecha_entrada tendría que leer casi todo el tenant
+    "CREATE INDEX IF NOT EXISTS ix_reservas_listado_tenant_salida "
+    "ON reservas_listado (tenant_id, fecha_salida)",
+    # Lo sustituye ix_reservas_listado_tenant_tipo
+    "DROP INDEX IF EXISTS ix_reservas_muelle_tipo_entrada",
+    "CREATE INDEX IF NOT EXISTS ix_lugares_tenant ON lugares (tenant_id)",
+    "CREATE INDEX IF NOT EXISTS ix_usuarios_tenant_rol ON usuarios (tenant_id, rol_id)",
+    "CREATE INDEX IF NOT EXISTS ix_ocupacion_diaria_tenant_dia ON ocupacion_diaria (tenant_id, dia)",
+    # La salida no puede ser anterior a la entrada. NOT VALID: se exige a
+    # las filas nuevas sin revisar (ni bloquear) las que ya existían.
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'ck_reservas_muelle_fechas') THEN
+            ALTER TABLE reservas_muelle ADD CONSTRAINT ck_reservas_muelle_fechas
+                CHECK (fecha_salida >= fecha_entrada) NOT VALID;
+        END IF;
+    END $$
+    """,
+]
+
+
+# --- FUNCIONES DEL SERVIDOR ---
+# CREATE OR REPLACE: se actualizan en cada arranque.
+FUNCIONES = [
+    # Alta de una reserva de muelle en una sola llamada (ReservaMuelle.crear_reserva):
+    # bloquea el lugar, calcula el máximo de reservas en un mismo día del
+    # rango (igual que SQL_OCUPACION_MAXIMA en logica/reservas/muelle.py), inserta en
+    # reservas_generales y reservas_muelle, suma la ocupación diaria y sube la
+    # versión del lugar. Devuelve (estado, id_reserva) con estado 201, 404 o 409.
+    # Es plpgsql y no un CTE a propósito: cada sentencia de la función ve la BD
+    # de ese momento, así que el cálculo, hecho después de esperar el bloqueo,
+    # ya cuenta la reserva de quien lo tenía.
+    """
+    CREATE OR REPLACE FUNCTION crear_reserva_muelle(
+        p_tenant_id INTEGER, p_usuario_id INTEGER, p_lugar_id INTEGER, p_fecha DATE,
+        p_fecha_entrada DATE, p_fecha_salida DATE, p_tipo_embarcacion VARCHAR,
+        p_requiere_pintura BOOLEAN, p_requiere_mecanica BOOLEAN, p_requiere_motor BOOLEAN
+    ) RETURNS TABLE (estado INTEGER, id_reserva INTEGER)
+    LANGUAGE plpgsql AS $$
+    DECLARE
+        v_capacidad INTEGER;
+        v_ocupadas BIGINT;
+        v_id INTEGER;
+    BEGIN
+        SELECT l.capacidad INTO v_capacidad FROM lugares l
+        WHERE l.id = p_lugar_id AND l.tenant_id = p_tenant_id
+        FOR UPDATE;
+        IF NOT FOUND OR COALESCE(v_capacidad, 0) = 0 THEN
+            RETURN QUERY SELECT 404, NULL::INTEGER;
+            RETURN;
+        END IF;
+
+        SELECT COALESCE(MAX(x.ocupadas), 0) INTO v_ocupadas FROM (
+            SELECT SUM(SUM(e.delta)) OVER (ORDER BY e.dia) AS ocupadas
+            FROM reservas_generales rg
+            CROSS JOIN LATERAL (
+                SELECT rm.fecha_entrada, rm.fecha_salida FROM reservas_muelle rm
+                WHERE rm.reserva_id = rg.id
+                  AND daterange(rm.fecha_entrada, rm.fecha_salida, '[]') &&
+                      daterange(p_fecha_entrada, p_fecha_salida, '[]')
+                LIMIT 1
+            ) rm
+            CROSS JOIN LATERAL (VALUES
+                (GREATEST(rm.fecha_entrada, p_fecha_entrada), 1),
+                (LEAST(rm.fecha_salida, p_fecha_salida) + 1, -1)
+            ) AS e(dia, delta)
+            WHERE rg.lugar_id = p_lugar_id
+              AND rg.tenant_id = p_tenant_id
+            GROUP BY e.dia
+        ) x;
+        IF v_ocupadas >= v_capacidad THEN
+            RETURN QUERY SELECT 409, NULL::INTEGER;
+            RETURN;
+        END IF;
+
+        INSERT INTO reservas_generales (usuario_id, lugar_id, fecha, tenant_id)
+        VALUES (p_usuario_id, p_lugar_id, p_fecha, p_tenant_id)
+        RETURNING id INTO v_id;
+
+        INSERT INTO reservas_muelle (
+            reserva_id, fecha_entrada, fecha_salida, tipo_embarcacion,
+            requiere_pintura, requiere_mecanica, requiere_motor
+        ) VALUES (
+            v_id, p_fecha_entrada, p_fecha_salida, p_tipo_embarcacion,
+            p_requiere_pintura, p_requiere_mecanica, p_requiere_motor
+        );
+
+        -- Igual que aplicar_ocupacion() con un solo cambio de +1
+        INSERT INTO ocupacion_diaria (lugar_id, dia, tenant_id, ocupadas)
+        SELECT p_lugar_id, d.dia::date, p_tenant_id, 1
+        FROM generate_series(p_fecha_entrada, p_fecha_salida, interval '1 day') AS d(dia)
+        ORDER BY d.dia
+        ON CONFLICT (lugar_id, dia)
+        DO UPDATE SET ocupadas = ocupacion_diaria.ocupadas + EXCLUDED.ocupadas;
+
+        UPDATE lugares SET version = version + 1 WHERE id = p_lugar_id;
+
+        RETURN QUERY SELECT 201, v_id;
+    END $$
+    """,
+    # --- Conversión de texto para las importaciones CSV (logica/importacion.py) ---
+    # Devuelven NULL si el texto no es válido en vez de fallar, así una fila
+    # mala se marca con su error y no tumba toda la importación. Sin bloques
+    # EXCEPTION, que abrirían una subtransacción por fila.
+    r"""
+    CREATE OR REPLACE FUNCTION texto_a_entero(p_texto TEXT) RETURNS INTEGER
+    LANGUAGE sql IMMUTABLE AS $$
+        SELECT CASE WHEN p_texto ~ '^\s*\d{1,9}\s*$' THEN CAST(trim(p_texto) AS INTEGER) END
+    $$
+    """,
+    # plpgsql y no SQL: una función SQL con FROM no se puede inlinar y se
+    # planificaría otra vez en cada fila
+    r"""
+    CREATE OR REPLACE FUNCTION texto_a_fecha(p_texto TEXT) RETURNS DATE
+    LANGUAGE plpgsql IMMUTABLE AS $$
+    DECLARE
+        m TEXT[] := regexp_match(p_texto, '^\s*(\d{4})-(\d{2})-(\d{2})\s*$');
+    BEGIN
+        IF m IS NULL OR CAST(m[1] AS INTEGER) < 1 OR CAST(m[2] AS INTEGER) NOT BETWEEN 1 AND 12
+           OR CAST(m[3] AS INTEGER) < 1 THEN
+            RETURN NULL;
+        END IF;
+        IF CAST(m[3] AS INTEGER) > EXTRACT(DAY FROM make_date(CAST(m[1] AS INTEGER), CAST(m[2] AS INTEGER), 1)
+                                           + interval '1 month' - interval '1 day') THEN
+            RETURN NULL;
+        END IF;
+        RETURN make_date(CAST(m[1] AS INTEGER), CAST(m[2] AS INTEGER), CAST(m[3] AS INTEGER));
+    END $$
+    """,
+    # Vacío = FALSE (el valor por defecto de los requiere_*)
+    """
+    CREATE OR REPLACE FUNCTION texto_a_booleano(p_texto TEXT) RETURNS BOOLEAN
+    LANGUAGE sql IMMUTABLE AS $$
+        SELECT CASE
+            WHEN lower(trim(COALESCE(p_texto, ''))) IN ('', 'false', 'f', '0', 'no', 'n') THEN FALSE
+            WHEN lower(trim(p_texto)) IN ('true', 't', '1', 'si', 'sí', 'yes', 'y') THEN TRUE
+        END
+    $$
+    """,
+    # --- Modelo de lectura reservas_listado ---
+    # Una fila por reserva de muelle con los nombres de usuario y lugar, en la
+    # misma transacción que la escritura que la cambia:
+    # - altas y ediciones de reservas_muelle (por sentencia: un lote de mil
+    #   reservas es un solo INSERT ... SELECT con sus joins)
+    # - bajas de reservas_muelle
+    # - cambios de usuario, lugar o fecha en reservas_generales
+    # - cambios de nombre de lugares y usuarios (actualizar_lugar_admin)
+    # Para rehacerla entera: python -m logica.reservas.listado
+    """
+    CREATE OR REPLACE FUNCTION listado_guardar_muelle() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        INSERT INTO reservas_listado (
+            reserva_id, tenant_id, usuario_id, lugar_id, fecha,
+            fecha_entrada, fecha_salida, tipo_embarcacion,
+            requiere_pintura, requiere_mecanica, requiere_motor, usuario, lugar
+        )
+        SELECT rg.id, rg.tenant_id, rg.usuario_id, rg.lugar_id, rg.fecha,
+               n.fecha_entrada, n.fecha_salida, n.tipo_embarcacion,
+               n.requiere_pintura, n.requiere_mecanica, n.requiere_motor, u.nombre, l.nombre
+        FROM nuevas n
+        JOIN reservas_generales rg ON rg.id = n.reserva_id
+        JOIN usuarios u ON u.id = rg.usuario_id
+        LEFT JOIN lugares l ON l.id = rg.lugar_id
+        ON CONFLICT (reserva_id) DO UPDATE SET
+            fecha_entrada = EXCLUDED.fecha_entrada,
+            fecha_salida = EXCLUDED.fecha_salida,
+            tipo_embarcacion = EXCLUDED.tipo_embarcacion,
+            requiere_pintura = EXCLUDED.requiere_pintura,
+            requiere_mecanica = EXCLUDED.requiere_mecanica,
+            requiere_motor = EXCLUDED.requiere_motor;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION listado_borrar_muelle() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        DELETE FROM reservas_listado rl USING viejas v WHERE rl.reserva_id = v.reserva_id;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION listado_cambiar_general() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE reservas_listado SET
+            tenant_id = NEW.tenant_id,
+            usuario_id = NEW.usuario_id,
+            lugar_id = NEW.lugar_id,
+            fecha = NEW.fecha,
+            usuario = (SELECT nombre FROM usuarios WHERE id = NEW.usuario_id),
+            lugar = (SELECT nombre FROM lugares WHERE id = NEW.lugar_id)
+        WHERE reserva_id = NEW.id;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION listado_renombrar_lugar() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE reservas_listado SET lugar = NEW.nombre
+        WHERE tenant_id = NEW.tenant_id AND lugar_id = NEW.id;
+        RETURN NULL;
+    END $$
+    """,
+    """
+    CREATE OR REPLACE FUNCTION listado_renombrar_usuario() RETURNS trigger
+    LANGUAGE plpgsql AS $$
+    BEGIN
+        UPDATE reservas_listado SET usuario = NEW.nombre
+        WHERE tenant_id = NEW.tenant_id AND usuario_id = NEW.id;
+        RETURN NULL;
+    END $$
+    """,
+    # Los disparadores solo se crean si faltan: volver a crearlos en cada
+    # arranque bloquearía unas tablas que están en uso
+    """
+    DO $$
+    BEGIN
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'tg_listado_alta_muelle') THEN
+            CREATE TRIGGER tg_listado_alta_muelle AFTER INSERT ON reservas_muelle
+                REFERENCING NEW TABLE AS nuevas
+                FOR EACH STATEMENT EXECUTE FUNCTION listado_guardar_muelle();
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'tg_listado_edicion_muelle') THEN
+            CREATE TRIGGER tg_listado_edicion_muelle AFTER UPDATE ON reservas_muelle
+                REFERENCING NEW TABLE AS nuevas
+                FOR EACH STATEMENT EXECUTE FUNCTION listado_guardar_muelle();
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'tg_listado_baja_muelle') THEN
+            CREATE TRIGGER tg_listado_baja_muelle AFTER DELETE ON reservas_muelle
+                REFERENCING OLD TABLE AS viejas
+                FOR EACH STATEMENT EXECUTE FUNCTION listado_borrar_muelle();
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'tg_listado_cambio_general') THEN
+            CREATE TRIGGER tg_listado_cambio_general AFTER UPDATE ON reservas_generales
+                FOR EACH ROW
+                WHEN (OLD.usuario_id IS DISTINCT FROM NEW.usuario_id
+                      OR OLD.lugar_id IS DISTINCT FROM NEW.lugar_id
+                      OR OLD.fecha IS DISTINCT FROM NEW.fecha
+                      OR OLD.tenant_id IS DISTINCT FROM NEW.tenant_id)
+                EXECUTE FUNCTION listado_cambiar_general();
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'tg_listado_nombre_lugar') THEN
+            CREATE TRIGGER tg_listado_nombre_lugar AFTER UPDATE OF nombre ON lugares
+                FOR EACH ROW WHEN (OLD.nombre IS DISTINCT FROM NEW.nombre)
+                EXECUTE FUNCTION listado_renombrar_lugar();
+        END IF;
+        IF NOT EXISTS (SELECT 1 FROM pg_trigger WHERE tgname = 'tg_listado_nombre_usuario') THEN
+            CREATE TRIGGER tg_listado_nombre_usuario AFTER UPDATE OF nombre ON usuarios
+                FOR EACH ROW WHEN (OLD.nombre IS DISTINCT FROM NEW.nombre)
+                EXECUTE FUNCTION listado_renombrar_usuario();
+        END IF;
+    END $$
+    """,
+]
+
+
+def crear_indices(conexion):
+    for ddl in INDICES:
+        conexion.execute(text(ddl))
+    conexion.commit()
+
+
+def crear_funciones(conexion):
+    for ddl in FUNCIONES:
+        conexion.execute(text(ddl))
+    conexion.commit()
+
 def inicializar_base_de_datos():
     print("--- Iniciando script de inicialización de BD ---")
     
@@ -50,6 +354,15 @@ def inicializar_base_de_datos():
         # Esto crea todas las tablas de los modelos que importaste
         Base.metadata.create_all(bind=engine)
         print("✅ Tablas creadas (o ya existían).")
+        with engine.connect() as conexion:
+            crear_indices(conexion)
+            crear_funciones(conexion)
+            if rellenar_si_vacio(conexion):
+                print("✅ Tabla reservas_listado rellenada con las reservas existentes.")
+            rellenados = rellenar_si_vacia(conexion)
+            if rellenados:
+                print(f"✅ Tabla ocupacion_diaria rellenada para los tenants {rellenados}.")
+        print("✅ Índices y funciones creados (o ya existían).")
     except Exception as e:
         print(f"❌ Error al crear tablas: {e}")
         return
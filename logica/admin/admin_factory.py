@@ -1,6 +1,10 @@
-from .muelle_admin import AdminReservaMuelle
-# from .hotel_admin import AdminReservaHotel
-# from .restaurante_admin import AdminReservaRestaurante
+from logica.registro import RegistroHandlers
+
+# tipo de negocio -> clase (se carga logica/admin/<tipo>_admin.py la primera vez)
+registro_admin = RegistroHandlers(__package__, sufijo="_admin")
+
+def registrar_admin_handler(tipo):
+    return registro_admin.registrar(tipo)
 
 def obtener_admin_handler(tipo_negocio, db, tenant_id):
     if tipo_negocio is None:
@@ -8,7 +12,7 @@ def obtener_admin_handler(tipo_negocio, db, tenant_id):
     
     tipo = tipo_negocio.strip().lower()
 
-    if tipo == "muelle":
-        return AdminReservaMuelle(db, tenant_id)
-
-    raise ValueError(f"Tipo de negocio no soportado para administración: {tipo}")
\ No newline at end of file
+    clase = registro_admin.clase(tipo)
+    if clase is None:
+        raise ValueError(f"Tipo de negocio no soportado para administración: {tipo}")
+    return clase(db, tenant_id)
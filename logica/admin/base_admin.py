@@ -1,14 +1,24 @@
 from abc import ABC, abstractmethod
+from logica.registro import estado_tenant
 
 class AdminReservaBase(ABC):
     def __init__(self, db, tenant_id):
         self.db = db
         self.tenant_id = tenant_id
+        # Estado compartido entre peticiones del mismo tenant (capacidades, etc.)
+        self.estado = estado_tenant(tenant_id)
 
     @abstractmethod
     def crear_reserva(self, datos):
         pass
 
+    def crear_reservas_lote(self, reservas, modo="todo_o_nada"):
+        """
+        Crea varias reservas en una sola transacción.
+        Debe devolver (diccionario_respuesta, status_code)
+        """
+        raise NotImplementedError("Este tipo de negocio no admite reservas en lote")
+
     @abstractmethod
     def editar_reserva(self, reserva_id, datos):
         pass
@@ -18,6 +28,20 @@ class AdminReservaBase(ABC):
         pass
     
     @abstractmethod
-    def listar_reserva(self):
+    def listar_reserva(self, filtros=None, stream=False):
         pass
+
+    def importar_reservas(self, archivo, modo="todo_o_nada"):
+        """
+        Crea las reservas de un CSV (archivo binario con cabecera) en una sola
+        transacción. Debe devolver (diccionario_respuesta, status_code)
+        """
+        raise NotImplementedError("Este tipo de negocio no admite importaciones")
+
+    def exportar_reservas(self, filtros, formato):
+        """
+        Todas las reservas que cumplen 'filtros', con las columnas de
+        listar_reserva, como iterador de trozos en 'formato' (csv o ndjson).
+        """
+        raise NotImplementedError("Este tipo de negocio no admite exportaciones")
     
\ No newline at end of file
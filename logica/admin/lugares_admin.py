@@ -1,7 +1,40 @@
 from sqlalchemy import text
-from flask import current_app
+from logica.registro import invalidar_estado_tenant
+from logica.reservas.indice_ocupacion import registrar_lugar_nuevo
+from logica.importacion import importar_csv
 
-def actualizar_lugar_admin(tenant_id, lugar_id, datos):
+# --- Importación de lugares desde CSV (ver logica/importacion.py) ---
+COLUMNAS_IMPORTACION_LUGARES = ("nombre", "capacidad", "zona")
+
+# Mismas reglas que POST /api/admin/lugares, más nombre único en el tenant
+# (así se puede volver a lanzar el mismo archivo sin duplicar lugares)
+SQL_VALIDAR_IMPORTACION_LUGARES = text("""
+    UPDATE importacion_lugares i SET error = CASE
+        WHEN COALESCE(trim(i.nombre), '') = '' THEN 'El campo nombre es requerido'
+        WHEN COALESCE(trim(i.zona), '') = '' THEN 'El campo zona es requerido'
+        WHEN length(trim(i.nombre)) > 100 OR length(trim(i.zona)) > 100 THEN 'nombre y zona: como máximo 100 caracteres'
+        WHEN COALESCE(texto_a_entero(i.capacidad), 0) = 0 THEN 'La capacidad debe ser un entero mayor que 0'
+        WHEN d.repeticion > 1 THEN 'Nombre repetido en el archivo'
+        WHEN trim(i.nombre) IN (SELECT nombre FROM lugares WHERE tenant_id = :tenant_id)
+            THEN 'Ya existe un lugar con ese nombre'
+    END
+    FROM (
+        SELECT fila, ROW_NUMBER() OVER (PARTITION BY trim(nombre) ORDER BY fila) AS repeticion
+        FROM importacion_lugares
+    ) d
+    WHERE d.fila = i.fila
+""")
+
+SQL_GUARDAR_IMPORTACION_LUGARES = text("""
+    INSERT INTO lugares (nombre, capacidad, zona, tipo, tenant_id)
+    SELECT trim(nombre), texto_a_entero(capacidad), trim(zona), :tipo, :tenant_id
+    FROM importacion_lugares
+    WHERE error IS NULL
+    ORDER BY fila
+    RETURNING id
+""")
+
+def actualizar_lugar_admin(db, tenant_id, lugar_id, datos):
     # Solo campos permitidos
     campos_editables = ["nombre", "descripcion", "capacidad", "tipo", "zona", "activo"]
 
@@ -16,6 +49,9 @@ def actualizar_lugar_admin(tenant_id, lugar_id, datos):
     if not set_clauses:
         return {"error": "No se proporcionaron campos válidos para actualizar"}, 400
 
+    # La versión sube con cualquier cambio del lugar (ver logica/versiones.py)
+    set_clauses.append("version = version + 1")
+
     sql = f"""
         UPDATE lugares
         SET {', '.join(set_clauses)}
@@ -24,38 +60,40 @@ def actualizar_lugar_admin(tenant_id, lugar_id, datos):
     """
 
     try:
-        result = current_app.db.execute(text(sql), valores)
+        result = db.execute(text(sql), valores)
         if result.rowcount == 0:
             return {"error": "Lugar no encontrado o no pertenece al negocio"}, 404
-        current_app.db.commit()
+        db.commit()
+        invalidar_estado_tenant(tenant_id)
         return {"mensaje": "Lugar actualizado correctamente"}
     except Exception as e:
-        current_app.db.rollback()
+        db.rollback()
         return {"error": str(e)}, 500
 
-def eliminar_lugar_admin(tenant_id, lugar_id):
+def eliminar_lugar_admin(db, tenant_id, lugar_id):
     try:
         query = text("""
             UPDATE lugares
-            SET activo = FALSE
+            SET activo = FALSE, version = version + 1
             WHERE id = :lugar_id AND tenant_id = :tenant_id
             RETURNING id
         """)
-        result = current_app.db.execute(query, {
+        result = db.execute(query, {
             "lugar_id": lugar_id,
             "tenant_id": tenant_id
         })
         if result.rowcount == 0:
             return {"error": "Lugar no encontrado o no pertenece al negocio"}, 404
 
-        current_app.db.commit()
+        db.commit()
+        invalidar_estado_tenant(tenant_id)
         return {"mensaje": "Lugar desactivado correctamente"}
 
     except Exception as e:
-        current_app.db.rollback()
+        db.rollback()
         return {"error": str(e)}, 500
 
-def listar_lugares_admin(tenant_id):
+def listar_lugares_admin(db, tenant_id):
     try:
         query = text("""
             SELECT id, nombre, descripcion, capacidad, tipo, zona, activo
@@ -63,7 +101,28 @@ def listar_lugares_admin(tenant_id):
             WHERE tenant_id = :tenant_id
             ORDER BY nombre
         """)
-        result = current_app.db.execute(query, {"tenant_id": tenant_id})
+        result = db.execute(query, {"tenant_id": tenant_id})
         return [dict(row._mapping) for row in result]
     except Exception as e:
-        return {"error": str(e)}, 500
\ No newline at end of file
+        return {"error": str(e)}, 500
+
+
+def importar_lugares_admin(db, tenant_id, tipo, archivo, modo="todo_o_nada"):
+    """
+    Crea los lugares de un CSV (columnas nombre, capacidad, zona) en una
+    transacción. Devuelve (respuesta, status) como importar_csv.
+    """
+    def validar(db):
+        db.execute(SQL_VALIDAR_IMPORTACION_LUGARES, {"tenant_id": tenant_id})
+        return "importacion_lugares"
+
+    def guardar(db, tabla):
+        ids = [row.id for row in db.execute(SQL_GUARDAR_IMPORTACION_LUGARES, {"tenant_id": tenant_id, "tipo": tipo})]
+        db.commit()
+        for lugar_id in ids:
+            registrar_lugar_nuevo(tenant_id, lugar_id)
+        invalidar_estado_tenant(tenant_id)
+        return len(ids)
+
+    return importar_csv(db, archivo, modo, "importacion_lugares", COLUMNAS_IMPORTACION_LUGARES,
+                        [(c,) for c in COLUMNAS_IMPORTACION_LUGARES], validar, guardar)
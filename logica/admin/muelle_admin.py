@@ -1,20 +1,295 @@
 # logica/admin/muelle_admin.py
 
 from .base_admin import AdminReservaBase
+from .admin_factory import registrar_admin_handler
+from logica.reservas.ocupacion import aplicar_ocupacion
+from logica.reservas.indice_ocupacion import INDICE_OCUPACION, confirmar_ocupacion
+from logica.reservas.disponibilidad import obtener_motor, dias_del_rango, DISPONIBILIDAD_MAX_DIAS
+from logica.reservas.muelle import SQL_ESTANCIAS_EN_RANGO, FILTROS_LISTADO, ocupacion_maxima
+from logica.reservas.paginacion import leer_filtros
+from logica.streaming import filas_por_lotes
+from logica.exportacion import exportar
+from logica.importacion import importar_csv, analizar_si_crece, IMPORTACION_MAX_DIAS
+from logica.versiones import bloquear_lugares, incrementar_version
 from sqlalchemy import text
-from flask import current_app
 from datetime import datetime
 
+# --- Alta en lote (crear_reservas_lote) ---
+SQL_USUARIOS_DEL_TENANT = text("""
+    SELECT id FROM usuarios
+    WHERE id = ANY(CAST(:usuarios AS INTEGER[])) AND tenant_id = :tenant_id
+""")
+
+# Ids de reservas_generales reservados de antemano: así cada fila del lote
+# sabe su id sin depender del orden de RETURNING
+SQL_RESERVAR_IDS = text("""
+    SELECT nextval(pg_get_serial_sequence('reservas_generales', 'id'))
+    FROM generate_series(1, :n)
+""")
+
+SQL_INSERTAR_GENERALES_LOTE = text("""
+    INSERT INTO reservas_generales (id, usuario_id, lugar_id, fecha, tenant_id)
+    SELECT id, usuario_id, lugar_id, CAST(:fecha AS DATE), :tenant_id
+    FROM unnest(
+        CAST(:ids AS INTEGER[]),
+        CAST(:usuarios AS INTEGER[]),
+        CAST(:lugares AS INTEGER[])
+    ) AS r(id, usuario_id, lugar_id)
+""")
+
+SQL_INSERTAR_MUELLE_LOTE = text("""
+    INSERT INTO reservas_muelle (
+        reserva_id, fecha_entrada, fecha_salida, tipo_embarcacion,
+        requiere_pintura, requiere_mecanica, requiere_motor
+    )
+    SELECT * FROM unnest(
+        CAST(:ids AS INTEGER[]),
+        CAST(:entradas AS DATE[]),
+        CAST(:salidas AS DATE[]),
+        CAST(:tipos AS VARCHAR[]),
+        CAST(:pinturas AS BOOLEAN[]),
+        CAST(:mecanicas AS BOOLEAN[]),
+        CAST(:motores AS BOOLEAN[])
+    )
+""")
+
+MODOS_LOTE = ("todo_o_nada", "parcial")
+
+# Los mismos textos que acepta texto_a_booleano (init_db.py) para el CSV,
+# además de true/false de JSON. Lo demás es un error de la reserva: bool()
+# convertiría "false" en TRUE.
+CAMPOS_BOOLEANOS_LOTE = ("requiere_pintura", "requiere_mecanica", "requiere_motor")
+TEXTOS_FALSO = ("", "false", "f", "0", "no", "n")
+TEXTOS_VERDADERO = ("true", "t", "1", "si", "sí", "yes", "y")
+
+
+def _booleano(valor):
+    """bool de un campo del lote (ausente o null = false); ValueError si no es un booleano."""
+    if valor is None or isinstance(valor, bool):
+        return bool(valor)
+    if isinstance(valor, int) and valor in (0, 1):
+        return bool(valor)
+    if isinstance(valor, str):
+        texto = valor.strip().lower()
+        if texto in TEXTOS_FALSO:
+            return False
+        if texto in TEXTOS_VERDADERO:
+            return True
+    raise ValueError(valor)
+
+
+def _ventanas_lote(validas):
+    """
+    Reparte las reservas en rangos de fechas de como mucho
+    DISPONIBILIDAD_MAX_DIAS para leer la ocupación (cada reserva ya cabe
+    en uno). Devuelve [(desde, hasta)] y el índice de rango de cada reserva.
+    Casi siempre es un solo rango; los rangos pueden solaparse.
+    """
+    ventanas = []
+    ventana_de = [None] * len(validas)
+    for i in sorted(range(len(validas)), key=lambda i: validas[i][1]["fecha_entrada"]):
+        datos = validas[i][1]
+        if ventanas:
+            desde, hasta = ventanas[-1]
+            hasta = max(hasta, datos["fecha_salida"])
+            if (hasta - desde).days < DISPONIBILIDAD_MAX_DIAS:
+                ventanas[-1] = (desde, hasta)
+                ventana_de[i] = len(ventanas) - 1
+                continue
+        ventanas.append((datos["fecha_entrada"], datos["fecha_salida"]))
+        ventana_de[i] = len(ventanas) - 1
+    return ventanas, ventana_de
+
+# --- Importación de reservas desde CSV (importar_reservas, ver logica/importacion.py) ---
+# Usuario por usuario_id o correo y lugar por lugar_id o nombre ('lugar'),
+# para poder importar las reservas justo después de los lugares. Se admiten
+# fechas pasadas (son reservas históricas); 'fecha' es la del alta (hoy si
+# no viene).
+COLUMNAS_IMPORTACION_RESERVAS = (
+    "usuario_id", "correo", "lugar_id", "lugar", "fecha", "fecha_entrada", "fecha_salida",
+    "tipo_embarcacion", "requiere_pintura", "requiere_mecanica", "requiere_motor",
+)
+OBLIGATORIAS_IMPORTACION_RESERVAS = [
+    ("usuario_id", "correo"), ("lugar_id", "lugar"), ("fecha_entrada",), ("fecha_salida",), ("tipo_embarcacion",),
+]
+
+# Una pasada: convierte los textos, resuelve usuario y lugar dentro del
+# tenant y deja el primer error de cada fila. Los lugares con el nombre
+# repetido en el tenant solo se pueden importar por lugar_id.
+SQL_VALIDAR_IMPORTACION_RESERVAS = text("""
+    CREATE TEMP TABLE importacion_reservas_validas ON COMMIT DROP AS
+    SELECT x.*,
+           CAST(NULL AS INTEGER) AS reserva_id,
+           CASE
+               WHEN x.falta IS NOT NULL THEN 'Falta el campo obligatorio: ' || x.falta
+               WHEN x.usuario_id IS NULL THEN 'Usuario no válido o no pertenece al negocio'
+               WHEN x.lugar_id IS NULL THEN 'Lugar no válido o no pertenece al negocio'
+               WHEN x.fecha IS NULL OR x.fecha_entrada IS NULL OR x.fecha_salida IS NULL
+                   THEN 'Las fechas deben ser YYYY-MM-DD'
+               WHEN x.fecha_salida < x.fecha_entrada
+                   THEN 'La fecha de salida no puede ser anterior a la fecha de entrada'
+               WHEN x.fecha_salida - x.fecha_entrada >= :max_dias
+                   THEN 'La estancia no puede pasar de ' || :max_dias || ' días'
+               WHEN length(x.tipo_embarcacion) > 100 THEN 'tipo_embarcacion: como máximo 100 caracteres'
+               WHEN x.requiere_pintura IS NULL OR x.requiere_mecanica IS NULL OR x.requiere_motor IS NULL
+                   THEN 'requiere_pintura, requiere_mecanica y requiere_motor deben ser true o false'
+           END AS error
+    FROM (
+        SELECT s.fila,
+               CASE
+                   WHEN COALESCE(trim(s.usuario_id), trim(s.correo), '') = '' THEN 'usuario_id'
+                   WHEN COALESCE(trim(s.lugar_id), trim(s.lugar), '') = '' THEN 'lugar_id'
+                   WHEN COALESCE(trim(s.fecha_entrada), '') = '' THEN 'fecha_entrada'
+                   WHEN COALESCE(trim(s.fecha_salida), '') = '' THEN 'fecha_salida'
+                   WHEN COALESCE(trim(s.tipo_embarcacion), '') = '' THEN 'tipo_embarcacion'
+               END AS falta,
+               COALESCE(ui.id, uc.id) AS usuario_id,
+               COALESCE(li.id, ln.id) AS lugar_id,
+               CASE WHEN COALESCE(trim(s.fecha), '') = '' THEN CURRENT_DATE ELSE texto_a_fecha(s.fecha) END AS fecha,
+               texto_a_fecha(s.fecha_entrada) AS fecha_entrada,
+               texto_a_fecha(s.fecha_salida) AS fecha_salida,
+               trim(s.tipo_embarcacion) AS tipo_embarcacion,
+               texto_a_booleano(s.requiere_pintura) AS requiere_pintura,
+               texto_a_booleano(s.requiere_mecanica) AS requiere_mecanica,
+               texto_a_booleano(s.requiere_motor) AS requiere_motor
+        FROM importacion_reservas s
+        LEFT JOIN usuarios ui
+               ON ui.id = texto_a_entero(s.usuario_id) AND ui.tenant_id = :tenant_id
+        LEFT JOIN usuarios uc
+               ON COALESCE(trim(s.usuario_id), '') = '' AND uc.correo = trim(s.correo) AND uc.tenant_id = :tenant_id
+        LEFT JOIN lugares li
+               ON li.id = texto_a_entero(s.lugar_id) AND li.tenant_id = :tenant_id
+        LEFT JOIN (
+            SELECT nombre, MIN(id) AS id FROM lugares
+            WHERE tenant_id = :tenant_id
+            GROUP BY nombre HAVING COUNT(*) = 1
+        ) ln ON COALESCE(trim(s.lugar_id), '') = '' AND ln.nombre = trim(s.lugar)
+    ) x
+""")
+
+SQL_LUGARES_IMPORTACION = text("""
+    SELECT DISTINCT lugar_id FROM importacion_reservas_validas WHERE error IS NULL
+""")
+
+# Cupo de todo el archivo a la vez (con los lugares ya bloqueados): cada fila
+# se expande a sus días y en cada día cuentan las reservas que ya había más
+# las filas anteriores del archivo en ese lugar. Las que ya había se cuentan
+# desde reservas_generales/reservas_muelle (como SQL_OCUPACION_MAXIMA), no
+# desde ocupacion_diaria, que es derivada. En modo parcial una fila
+# rechazada por cupo sigue contando para las de después en esos días: puede
+# rechazar de más, nunca de menos.
+SQL_CUPO_IMPORTACION = text("""
+    WITH rangos AS (
+        SELECT lugar_id, MIN(fecha_entrada) AS desde, MAX(fecha_salida) AS hasta
+        FROM importacion_reservas_validas
+        WHERE error IS NULL
+        GROUP BY lugar_id
+    ), existentes AS (
+        SELECT rg.lugar_id, g.dia::date AS dia, COUNT(*) AS ocupadas
+        FROM rangos r
+        JOIN reservas_generales rg ON rg.tenant_id = :tenant_id AND rg.lugar_id = r.lugar_id
+        JOIN reservas_muelle rm ON rm.reserva_id = rg.id
+            AND rm.fecha_entrada <= r.hasta AND rm.fecha_salida >= r.desde
+        CROSS JOIN LATERAL generate_series(GREATEST(rm.fecha_entrada, r.desde),
+                                           LEAST(rm.fecha_salida, r.hasta), interval '1 day') AS g(dia)
+        GROUP BY rg.lugar_id, g.dia::date
+    )
+    UPDATE importacion_reservas_validas v
+    SET error = 'No hay espacios disponibles en alguno de los días'
+    FROM (
+        SELECT d.fila
+        FROM (
+            SELECT r.fila, r.lugar_id, g.dia::date AS dia,
+                   COUNT(*) OVER (PARTITION BY r.lugar_id, g.dia ORDER BY r.fila) AS del_archivo
+            FROM importacion_reservas_validas r
+            CROSS JOIN LATERAL generate_series(r.fecha_entrada, r.fecha_salida, interval '1 day') AS g(dia)
+            WHERE r.error IS NULL
+        ) d
+        JOIN lugares l ON l.id = d.lugar_id
+        LEFT JOIN existentes e ON e.lugar_id = d.lugar_id AND e.dia = d.dia
+        WHERE COALESCE(e.ocupadas, 0) + d.del_archivo > l.capacidad
+        GROUP BY d.fila
+    ) llenas
+    WHERE v.fila = llenas.fila
+""")
+
+# Ids de reservas_generales reservados de antemano (como en el lote), en el
+# orden del archivo
+SQL_IDS_IMPORTACION = text("""
+    UPDATE importacion_reservas_validas v SET reserva_id = n.id
+    FROM (
+        SELECT fila, nextval(pg_get_serial_sequence('reservas_generales', 'id')) AS id
+        FROM (SELECT fila FROM importacion_reservas_validas WHERE error IS NULL ORDER BY fila) o
+    ) n
+    WHERE v.fila = n.fila
+""")
+
+SQL_GUARDAR_GENERALES_IMPORTACION = text("""
+    INSERT INTO reservas_generales (id, usuario_id, lugar_id, fecha, tenant_id)
+    SELECT reserva_id, usuario_id, lugar_id, fecha, :tenant_id
+    FROM importacion_reservas_validas WHERE error IS NULL
+    ORDER BY reserva_id
+""")
+
+SQL_GUARDAR_MUELLE_IMPORTACION = text("""
+    INSERT INTO reservas_muelle (
+        reserva_id, fecha_entrada, fecha_salida, tipo_embarcacion,
+        requiere_pintura, requiere_mecanica, requiere_motor
+    )
+    SELECT reserva_id, fecha_entrada, fecha_salida, tipo_embarcacion,
+           requiere_pintura, requiere_mecanica, requiere_motor
+    FROM importacion_reservas_validas WHERE error IS NULL
+    ORDER BY reserva_id
+""")
+
+# Igual que aplicar_ocupacion(), sacando las filas de la tabla temporal
+SQL_OCUPACION_IMPORTACION = text("""
+    INSERT INTO ocupacion_diaria (lugar_id, dia, tenant_id, ocupadas)
+    SELECT v.lugar_id, g.dia::date, :tenant_id, COUNT(*)
+    FROM importacion_reservas_validas v
+    CROSS JOIN LATERAL generate_series(v.fecha_entrada, v.fecha_salida, interval '1 day') AS g(dia)
+    WHERE v.error IS NULL
+    GROUP BY v.lugar_id, g.dia::date
+    ORDER BY v.lugar_id, g.dia::date
+    ON CONFLICT (lugar_id, dia)
+    DO UPDATE SET ocupadas = ocupacion_diaria.ocupadas + EXCLUDED.ocupadas
+""")
+
+SQL_CAMBIOS_IMPORTACION = text("""
+    SELECT lugar_id, fecha_entrada, fecha_salida FROM importacion_reservas_validas WHERE error IS NULL
+""")
+
+# Listado de admin: mismos filtros y página que el de usuario
+SQL_LISTAR_RESERVAS_ADMIN = text("""
+    SELECT rl.reserva_id,
+           rl.fecha,
+           rl.usuario_id,
+           rl.lugar_id,
+           rl.fecha_entrada,
+           rl.fecha_salida,
+           rl.tipo_embarcacion,
+           rl.requiere_pintura,
+           rl.requiere_mecanica,
+           rl.requiere_motor,
+           rl.usuario,
+           rl.lugar
+    FROM reservas_listado rl
+""" + FILTROS_LISTADO)
+
+
+@registrar_admin_handler("muelle")
 class AdminReservaMuelle(AdminReservaBase):
     
     def editar_reserva(self, reserva_id, datos):
         try:
             # Validar que la reserva pertenezca al negocio
             query_validar = text("""
-                SELECT rg.lugar_id FROM reservas_generales rg
+                SELECT rg.lugar_id, rm.fecha_entrada, rm.fecha_salida
+                FROM reservas_generales rg
+                JOIN reservas_muelle rm ON rg.id = rm.reserva_id
                 WHERE rg.id = :reserva_id AND rg.tenant_id = :tenant_id
             """)
-            lugar_row = current_app.db.execute(query_validar, {
+            lugar_row = self.db.execute(query_validar, {
                 "reserva_id": reserva_id,
                 "tenant_id": self.tenant_id
             }).fetchone()
@@ -23,35 +298,32 @@ class AdminReservaMuelle(AdminReservaBase):
                 return {"error": "Reserva no encontrada o no pertenece al negocio"}, 404
     
             lugar_id = datos.get("lugar_id", lugar_row[0])
+
+            # Bloquea el lugar viejo y el nuevo hasta el commit, antes de
+            # escribir nada: el mismo orden que las altas (lugares y luego
+            # ocupacion_diaria), aunque no se compruebe el cupo
+            capacidad = bloquear_lugares(self.db, self.tenant_id,
+                                         [lugar_row[0], lugar_id]).get(int(lugar_id))
+            if capacidad is None:
+                self.db.rollback()
+                return {"error": "Lugar no válido o no pertenece al negocio"}, 403
     
-            # Validar que el lugar siga teniendo disponibilidad en las nuevas fechas
-            if "fecha_entrada" in datos and "fecha_salida" in datos:
-                query_lugar = text("""
-                    SELECT capacidad FROM lugares WHERE id = :lugar_id AND tenant_id = :tenant_id
-                """)
-                capacidad = current_app.db.execute(query_lugar, {
-                    "lugar_id": lugar_id,
-                    "tenant_id": self.tenant_id
-                }).scalar()
-    
-                query_conflicto = text("""
-                    SELECT COUNT(*) FROM reservas_generales rg
-                    JOIN reservas_muelle rm ON rg.id = rm.reserva_id
-                    WHERE rg.lugar_id = :lugar_id
-                      AND rg.tenant_id = :tenant_id
-                      AND rg.id != :reserva_id
-                      AND daterange(rm.fecha_entrada, rm.fecha_salida, '[]') &&
-                          daterange(:fecha_entrada, :fecha_salida, '[]')
-                """)
-                ocupadas = current_app.db.execute(query_conflicto, {
-                    "lugar_id": lugar_id,
-                    "tenant_id": self.tenant_id,
-                    "reserva_id": reserva_id,
-                    "fecha_entrada": datos["fecha_entrada"],
-                    "fecha_salida": datos["fecha_salida"]
-                }).scalar()
+            # Validar que el lugar siga teniendo disponibilidad en las nuevas
+            # fechas (las que no vengan se quedan como estaban)
+            entrada = datos.get("fecha_entrada", lugar_row[1])
+            salida = datos.get("fecha_salida", lugar_row[2])
+            if "fecha_entrada" in datos or "fecha_salida" in datos or int(lugar_id) != lugar_row[0]:
+                # El índice no puede descontar la propia reserva: solo sirve si
+                # cambia de lugar o si las fechas nuevas no pisan las viejas
+                ocupadas = ocupacion_maxima(
+                    self.db, self.tenant_id, lugar_id, entrada, salida,
+                    excluir=reserva_id,
+                    usar_indice=(int(lugar_id) != lugar_row[0]
+                                 or str(entrada) > str(lugar_row[2])
+                                 or str(salida) < str(lugar_row[1])))
     
                 if ocupadas >= capacidad:
+                    self.db.rollback()
                     return {"error": "No hay disponibilidad en ese rango de fechas"}, 409
                         # 🛠️ Actualizar reservas_generales si hay cambios
             update_generales = []
@@ -78,7 +350,7 @@ class AdminReservaMuelle(AdminReservaBase):
                     SET {', '.join(update_generales)}
                     WHERE id = :reserva_id AND tenant_id = :tenant_id
                 """
-                current_app.db.execute(text(sql_general), valores_generales)    
+                self.db.execute(text(sql_general), valores_generales)    
 
 
             # Actualizar campos en reservas_muelle
@@ -100,13 +372,23 @@ class AdminReservaMuelle(AdminReservaBase):
                 SET {', '.join(set_clauses)}
                 WHERE reserva_id = :reserva_id
             """
-            current_app.db.execute(text(sql), valores)
-            current_app.db.commit()
+            self.db.execute(text(sql), valores)
+
+            # Mover la reserva en la ocupación diaria (quitar la vieja, sumar la nueva)
+            cambios = [
+                (lugar_row[0], lugar_row[1], lugar_row[2], -1),
+                (datos.get("lugar_id", lugar_row[0]),
+                 datos.get("fecha_entrada", lugar_row[1]),
+                 datos.get("fecha_salida", lugar_row[2]), +1),
+            ]
+            aplicar_ocupacion(self.db, self.tenant_id, cambios)
+            incrementar_version(self.db, self.tenant_id, [c[0] for c in cambios])
+            confirmar_ocupacion(self.db, self.tenant_id, cambios)
     
             return {"mensaje": "Reserva actualizada correctamente"}
     
         except Exception as e:
-            current_app.db.rollback()
+            self.db.rollback()
             return {"error": str(e)}, 500
     
     def crear_reserva(self, datos):
@@ -136,7 +418,7 @@ class AdminReservaMuelle(AdminReservaBase):
                 return {"error": "La fecha de salida no puede ser anterior a la fecha de entrada"}, 400
     
             # 👤 Validar que el usuario exista y pertenezca al negocio
-            usuario = current_app.db.execute(text("""
+            usuario = self.db.execute(text("""
                 SELECT id FROM usuarios
                 WHERE id = :usuario_id AND tenant_id = :tenant_id
             """), {
@@ -147,22 +429,17 @@ class AdminReservaMuelle(AdminReservaBase):
             if not usuario:
                 return {"error": "Usuario no válido o no pertenece al negocio"}, 403
     
-            # 📍 Validar que el lugar existe y pertenece al negocio
-            lugar = current_app.db.execute(text("""
-                SELECT capacidad FROM lugares
-                WHERE id = :lugar_id AND tenant_id = :tenant_id
-            """), {
-                "lugar_id": datos["lugar_id"],
-                "tenant_id": self.tenant_id
-            }).fetchone()
+            # 📍 Validar que el lugar existe y pertenece al negocio (queda
+            # bloqueado hasta el commit para que nadie más ocupe el último cupo)
+            capacidad = bloquear_lugares(self.db, self.tenant_id,
+                                         [datos["lugar_id"]]).get(int(datos["lugar_id"]))
     
-            if not lugar:
+            if capacidad is None:
+                self.db.rollback()
                 return {"error": "Lugar no válido o no pertenece al negocio"}, 403
-    
-            capacidad = lugar[0]
             '''
             # 🚫 Validar solapamiento de reservas del usuario
-            conflicto_usuario = current_app.db.execute(text("""
+            conflicto_usuario = self.db.execute(text("""
                 SELECT 1 FROM reservas_generales rg
                 JOIN reservas_muelle rm ON rg.id = rm.reserva_id
                 WHERE rg.usuario_id = :usuario_id
@@ -182,40 +459,16 @@ class AdminReservaMuelle(AdminReservaBase):
             if conflicto_usuario:
                 return {"error": "Este usuario ya tiene una reserva en ese horario"}, 409
             '''
-            # 🧮 Validar si hay cupos disponibles en el lugar para ese rango de fechas
-            # 🧮 Validar si hay al menos un día con la capacidad ocupada
-            query_cupo_dia = text("""
-            WITH dias_nuevos AS (
-              SELECT generate_series(:fecha_entrada, :fecha_salida, interval '1 day') AS dia
-            ),
-            ocupacion_por_dia AS (
-              SELECT d.dia, COUNT(*) AS ocupadas
-              FROM dias_nuevos d
-              JOIN reservas_muelle rm ON d.dia BETWEEN rm.fecha_entrada::date AND rm.fecha_salida::date
-              JOIN reservas_generales rg ON rm.reserva_id = rg.id
-              WHERE rg.lugar_id = :lugar_id AND rg.tenant_id = :tenant_id
-              GROUP BY d.dia
-            )
-            SELECT d.dia, ocupadas FROM ocupacion_por_dia d ORDER BY d.dia
-            """)
-            dias = current_app.db.execute(query_cupo_dia, {
-                "fecha_entrada": datos["fecha_entrada"],
-                "fecha_salida": datos["fecha_salida"],
-                "lugar_id": datos["lugar_id"],
-                "tenant_id": self.tenant_id
-            }).fetchall()
-
-            print("📊 Ocupación diaria del lugar:")
-            for dia in dias:
-                print(f"🗓️ {dia.dia} → {dia.ocupadas} reservas")
-
-            ocupacion_maxima = max([d.ocupadas for d in dias], default=0)
-            if ocupacion_maxima >= capacidad:
+            # 🧮 Validar que ningún día del rango tenga la capacidad ocupada
+            ocupadas = ocupacion_maxima(self.db, self.tenant_id, datos["lugar_id"],
+                                        datos["fecha_entrada"], datos["fecha_salida"])
+            if ocupadas >= capacidad:
+                self.db.rollback()
                 return {"error": "No hay espacios disponibles en alguno de los días"}, 409
 
     
             # ✅ Insertar en reservas_generales
-            result = current_app.db.execute(text("""
+            result = self.db.execute(text("""
                 INSERT INTO reservas_generales (usuario_id, tenant_id, lugar_id, fecha)
                 VALUES (:usuario_id, :tenant_id, :lugar_id, :fecha)
                 RETURNING id
@@ -223,7 +476,7 @@ class AdminReservaMuelle(AdminReservaBase):
             reserva_id = result.fetchone()[0]
     
             # ✅ Insertar en reservas_muelle
-            current_app.db.execute(text("""
+            self.db.execute(text("""
                 INSERT INTO reservas_muelle (
                     reserva_id, fecha_entrada, fecha_salida, tipo_embarcacion,
                     requiere_pintura, requiere_mecanica, requiere_motor
@@ -240,48 +493,254 @@ class AdminReservaMuelle(AdminReservaBase):
                 "requiere_mecanica": datos.get("requiere_mecanica", False),
                 "requiere_motor": datos.get("requiere_motor", False)
             })
+
+            cambios = [(datos["lugar_id"], datos["fecha_entrada"], datos["fecha_salida"], +1)]
+            aplicar_ocupacion(self.db, self.tenant_id, cambios)
+            incrementar_version(self.db, self.tenant_id, [datos["lugar_id"]])
     
-            current_app.db.commit()
+            confirmar_ocupacion(self.db, self.tenant_id, cambios)
             return {"mensaje": "Reserva creada exitosamente", "reserva_id": reserva_id}, 201
     
         except Exception as e:
-            current_app.db.rollback()
+            self.db.rollback()
             return {"error": str(e)}, 500
-    
-        
 
-    
-    def listar_reserva(self):
+    def crear_reservas_lote(self, reservas, modo="todo_o_nada"):
+        """
+        Crea varias reservas en una sola transacción. Usuarios y lugares se
+        validan con una consulta para todo el lote, el cupo se comprueba con
+        una lectura de la ocupación por día de los lugares implicados
+        (bloqueados hasta el commit; una por rango si las fechas están muy
+        separadas, ver _ventanas_lote) y las filas se insertan de una vez.
+        Las reservas del mismo lote cuentan para el cupo de las siguientes.
+
+        modo "todo_o_nada": si alguna falla no se crea ninguna.
+        modo "parcial": se crean las que se puedan.
+        Devuelve un resultado por reserva, en el mismo orden.
+        """
+        if modo not in MODOS_LOTE:
+            return {"error": f"Modo no válido: {modo} (usa {' o '.join(MODOS_LOTE)})"}, 400
+
+        requeridos = ["usuario_id", "lugar_id", "fecha_entrada", "fecha_salida", "tipo_embarcacion"]
+        hoy = datetime.now().date()
+        resultados = []
+        validas = []  # (resultado, datos)
+
+        # 1. Validaciones de cada reserva por separado
+        for indice, datos in enumerate(reservas):
+            resultado = {"indice": indice}
+            resultados.append(resultado)
+            faltan = [campo for campo in requeridos if campo not in datos]
+            if faltan:
+                resultado.update(estado=400, error=f"Falta el campo obligatorio: {faltan[0]}")
+                continue
+            try:
+                datos = dict(datos,
+                             usuario_id=int(datos["usuario_id"]),
+                             lugar_id=int(datos["lugar_id"]),
+                             fecha_entrada=datetime.strptime(datos["fecha_entrada"], "%Y-%m-%d").date(),
+                             fecha_salida=datetime.strptime(datos["fecha_salida"], "%Y-%m-%d").date())
+            except (TypeError, ValueError):
+                resultado.update(estado=400, error="usuario_id y lugar_id deben ser enteros y las fechas YYYY-MM-DD")
+                continue
+            if datos["fecha_entrada"] < hoy:
+                resultado.update(estado=400, error="No se puede reservar en fechas anteriores a hoy")
+                continue
+            if datos["fecha_salida"] < datos["fecha_entrada"]:
+                resultado.update(estado=400, error="La fecha de salida no puede ser anterior a la fecha de entrada")
+                continue
+            try:
+                dias_del_rango(datos["fecha_entrada"], datos["fecha_salida"])
+            except ValueError as e:
+                resultado.update(estado=400, error=str(e))
+                continue
+            try:
+                datos.update({campo: _booleano(datos.get(campo)) for campo in CAMPOS_BOOLEANOS_LOTE})
+            except ValueError:
+                resultado.update(estado=400, error="requiere_pintura, requiere_mecanica y requiere_motor deben ser true o false")
+                continue
+            validas.append((resultado, datos))
+
         try:
-            query = text("""
-                SELECT rg.id AS reserva_id,
-                       rg.fecha,
-                       rg.usuario_id,
-                       rg.lugar_id,
-                       TO_CHAR(rm.fecha_entrada, 'YYYY-MM-DD') AS fecha_entrada,
-                       TO_CHAR(rm.fecha_salida, 'YYYY-MM-DD') AS fecha_salida,
-                       rm.tipo_embarcacion,
-                       rm.requiere_pintura,
-                       rm.requiere_mecanica,
-                       rm.requiere_motor,
-                       u.nombre AS usuario,
-                       l.nombre AS lugar
-                FROM reservas_generales rg
-                JOIN reservas_muelle rm ON rg.id = rm.reserva_id
-                JOIN usuarios u ON rg.usuario_id = u.id
-                JOIN lugares l ON rg.lugar_id = l.id
-                WHERE rg.tenant_id = :tenant_id
-                ORDER BY rm.fecha_entrada DESC
-            """)
-            result = current_app.db.execute(query, {"tenant_id": self.tenant_id}).mappings()
+            if validas:
+                # 2. Usuarios y lugares del negocio, una consulta para cada cosa
+                usuarios = {row.id for row in self.db.execute(SQL_USUARIOS_DEL_TENANT, {
+                    "usuarios": sorted({d["usuario_id"] for _, d in validas}),
+                    "tenant_id": self.tenant_id
+                })}
+                capacidades = bloquear_lugares(self.db, self.tenant_id, [d["lugar_id"] for _, d in validas])
+
+                # 3. Ocupación por día de esos lugares en el rango que cubre el
+                # lote, contada desde las reservas (como SQL_OCUPACION_MAXIMA):
+                # admitir no puede depender de ocupacion_diaria, que es derivada.
+                # Con fechas muy separadas se lee por rangos (_ventanas_lote)
+                ventanas, ventana_de = _ventanas_lote(validas)
+                ocupacion = [
+                    {
+                        lugar.lugar_id: ocupadas
+                        for lugar, ocupadas in obtener_motor("barrido").ocupacion(
+                            self.db, self.tenant_id, desde, hasta, SQL_ESTANCIAS_EN_RANGO,
+                            lugar_ids=sorted(capacidades))
+                    }
+                    for desde, hasta in ventanas
+                ]
+
+                aceptadas = []
+                for (resultado, datos), v in zip(validas, ventana_de):
+                    if datos["usuario_id"] not in usuarios:
+                        resultado.update(estado=403, error="Usuario no válido o no pertenece al negocio")
+                        continue
+                    capacidad = capacidades.get(datos["lugar_id"])
+                    if capacidad is None:
+                        resultado.update(estado=403, error="Lugar no válido o no pertenece al negocio")
+                        continue
+                    desde = ventanas[v][0]
+                    a = (datos["fecha_entrada"] - desde).days
+                    b = (datos["fecha_salida"] - desde).days
+                    if max(ocupacion[v][datos["lugar_id"]][a:b + 1]) >= capacidad:
+                        resultado.update(estado=409, error="No hay espacios disponibles en alguno de los días")
+                        continue
+                    # Cuenta en todos los rangos que pisan sus días
+                    for (desde, hasta), por_lugar in zip(ventanas, ocupacion):
+                        ocupadas = por_lugar[datos["lugar_id"]]
+                        a = max((datos["fecha_entrada"] - desde).days, 0)
+                        b = min((datos["fecha_salida"] - desde).days, len(ocupadas) - 1)
+                        for dia in range(a, b + 1):
+                            ocupadas[dia] += 1
+                    aceptadas.append((resultado, datos))
+            else:
+                aceptadas = []
+
+            hay_errores = len(aceptadas) < len(resultados)
+            if not aceptadas or (hay_errores and modo == "todo_o_nada"):
+                self.db.rollback()
+                # 409 solo si falló por cupo; si no, son errores de los datos
+                sin_cupo = any(resultado.get("estado") == 409 for resultado in resultados)
+                for resultado, _ in aceptadas:
+                    resultado.update(estado=409, error="No se creó: otras reservas del lote tienen errores")
+                return {"creadas": 0, "resultados": resultados}, 409 if sin_cupo else 400
+
+            # 4. Inserciones de todo el lote
+            ids = [row[0] for row in self.db.execute(SQL_RESERVAR_IDS, {"n": len(aceptadas)})]
+            filas = [datos for _, datos in aceptadas]
+            self.db.execute(SQL_INSERTAR_GENERALES_LOTE, {
+                "ids": ids,
+                "usuarios": [d["usuario_id"] for d in filas],
+                "lugares": [d["lugar_id"] for d in filas],
+                "fecha": hoy,
+                "tenant_id": self.tenant_id
+            })
+            self.db.execute(SQL_INSERTAR_MUELLE_LOTE, {
+                "ids": ids,
+                "entradas": [d["fecha_entrada"] for d in filas],
+                "salidas": [d["fecha_salida"] for d in filas],
+                "tipos": [d["tipo_embarcacion"] for d in filas],
+                "pinturas": [d["requiere_pintura"] for d in filas],
+                "mecanicas": [d["requiere_mecanica"] for d in filas],
+                "motores": [d["requiere_motor"] for d in filas]
+            })
+
+            cambios = [(d["lugar_id"], d["fecha_entrada"], d["fecha_salida"], +1) for d in filas]
+            aplicar_ocupacion(self.db, self.tenant_id, cambios)
+            incrementar_version(self.db, self.tenant_id, [d["lugar_id"] for d in filas])
+            confirmar_ocupacion(self.db, self.tenant_id, cambios)
+
+            for (resultado, _), reserva_id in zip(aceptadas, ids):
+                resultado.update(estado=201, reserva_id=reserva_id)
+            print(f"✅ Lote: {len(aceptadas)} de {len(resultados)} reservas creadas")
+            return {"creadas": len(aceptadas), "resultados": resultados}, 201 if not hay_errores else 200
+
+        except Exception as e:
+            self.db.rollback()
+            return {"error": str(e)}, 500
+
+    def listar_reserva(self, filtros=None, stream=False):
+        parametros = {
+            **(filtros or leer_filtros({}, admin=True, stream=stream)),
+            "tenant_id": self.tenant_id
+        }
+        if stream:
+            return filas_por_lotes(self.db, SQL_LISTAR_RESERVAS_ADMIN, parametros)
+        try:
+            result = self.db.execute(SQL_LISTAR_RESERVAS_ADMIN, parametros).mappings()
             return [dict(row) for row in result]
 
         except Exception as e:
             return {"error": str(e)}, 500
+
+    def importar_reservas(self, archivo, modo="todo_o_nada"):
+        """
+        Crea las reservas de un CSV (ver COLUMNAS_IMPORTACION_RESERVAS) en una
+        transacción: validación y cupo con SQL sobre todo el archivo, y los
+        INSERT de una vez. Devuelve (respuesta, status) como importar_csv.
+        """
+        parametros = {"tenant_id": self.tenant_id, "max_dias": IMPORTACION_MAX_DIAS}
+
+        def validar(db):
+            db.execute(SQL_VALIDAR_IMPORTACION_RESERVAS, parametros)
+            # Tabla temporal recién creada: sin estadísticas el planificador
+            # supone unas pocas filas y elige bucles anidados para el cupo
+            db.execute(text("ANALYZE importacion_reservas_validas"))
+            # Bloqueados hasta el commit, antes de leer la ocupación
+            lugares = [row.lugar_id for row in db.execute(SQL_LUGARES_IMPORTACION)]
+            bloquear_lugares(db, self.tenant_id, lugares)
+            db.execute(SQL_CUPO_IMPORTACION, {"tenant_id": self.tenant_id})
+            return "importacion_reservas_validas"
+
+        def guardar(db, tabla):
+            db.execute(SQL_IDS_IMPORTACION)
+            creadas = db.execute(SQL_GUARDAR_GENERALES_IMPORTACION, parametros).rowcount
+            analizar_si_crece(db, "reservas_generales", creadas)
+            db.execute(SQL_GUARDAR_MUELLE_IMPORTACION)
+            db.execute(SQL_OCUPACION_IMPORTACION, parametros)
+            lugares = [row.lugar_id for row in db.execute(SQL_LUGARES_IMPORTACION)]
+            incrementar_version(db, self.tenant_id, lugares)
+            # El índice en memoria (si está activo) recibe las reservas una a una
+            cambios = [(row.lugar_id, row.fecha_entrada, row.fecha_salida, +1)
+                       for row in db.execute(SQL_CAMBIOS_IMPORTACION)] if INDICE_OCUPACION else []
+            confirmar_ocupacion(db, self.tenant_id, cambios)
+            return creadas
+
+        return importar_csv(self.db, archivo, modo, "importacion_reservas", COLUMNAS_IMPORTACION_RESERVAS,
+                            OBLIGATORIAS_IMPORTACION_RESERVAS, validar, guardar)
+
+    def exportar_reservas(self, filtros, formato):
+        # El mismo SELECT que listar_reserva, pero lo escribe Postgres (COPY)
+        return exportar(self.db, SQL_LISTAR_RESERVAS_ADMIN, {**filtros, "tenant_id": self.tenant_id}, formato)
     
     def eliminar_reserva(self, reserva_id):
         try:
+            # El lugar se bloquea antes de borrar, como en las altas (lugares
+            # y luego ocupacion_diaria); al revés se bloquearían entre sí
+            query_lugar = text("""
+                SELECT lugar_id FROM reservas_generales
+                WHERE id = :reserva_id AND tenant_id = :tenant_id
+            """)
+            lugar_row = self.db.execute(query_lugar, {
+                "reserva_id": reserva_id,
+                "tenant_id": self.tenant_id
+            }).fetchone()
+
+            if not lugar_row:
+                return {"error": "Reserva no encontrada o no pertenece al negocio"}, 404
+
+            bloquear_lugares(self.db, self.tenant_id, [lugar_row.lugar_id])
+
             # soft-delete o eliminación real
+            # Primero el detalle (referencia a reservas_generales); nos quedamos
+            # con sus fechas para descontarlas de la ocupación diaria
+            query_detalle = text("""
+                DELETE FROM reservas_muelle rm
+                USING reservas_generales rg
+                WHERE rm.reserva_id = rg.id
+                  AND rg.id = :reserva_id AND rg.tenant_id = :tenant_id
+                RETURNING rg.lugar_id, rm.fecha_entrada, rm.fecha_salida
+            """)
+            detalle = self.db.execute(query_detalle, {
+                "reserva_id": reserva_id,
+                "tenant_id": self.tenant_id
+            }).fetchone()
+
             query = text("""
                 DELETE FROM reservas_generales
                 WHERE id = :reserva_id AND tenant_id = :tenant_id
@@ -294,7 +753,13 @@ class AdminReservaMuelle(AdminReservaBase):
             if result.rowcount == 0:
                 return {"error": "Reserva no encontrada o no pertenece al negocio"}, 404
 
-            self.db.commit()
+            cambios = []
+            if detalle:
+                cambios = [(detalle.lugar_id, detalle.fecha_entrada, detalle.fecha_salida, -1)]
+                aplicar_ocupacion(self.db, self.tenant_id, cambios)
+                incrementar_version(self.db, self.tenant_id, [detalle.lugar_id])
+
+            confirmar_ocupacion(self.db, self.tenant_id, cambios)
             return {"mensaje": "Reserva eliminada correctamente"}
 
         except Exception as e:
@@ -1,9 +1,12 @@
 from sqlalchemy import text
-from flask import current_app
+from logica.reservas.ocupacion import aplicar_ocupacion
+from logica.reservas.indice_ocupacion import confirmar_ocupacion
+from logica.reservas.muelle import ocupacion_maxima
+from logica.versiones import bloquear_lugares, incrementar_version
 
 
 
-def crear_reserva_admin_muelle(tenant_id, datos):
+def crear_reserva_admin_muelle(db, tenant_id, datos):
     requeridos = ["usuario_id", "lugar_id", "fecha", "fecha_entrada", "fecha_salida", "tipo_embarcacion"]
     for campo in requeridos:
         if campo not in datos:
@@ -12,34 +15,18 @@ def crear_reserva_admin_muelle(tenant_id, datos):
     datos["tenant_id"] = tenant_id  # Se fuerza el tenant
 
     try:
-        # Verificar si el lugar pertenece al negocio
-        lugar = current_app.db.execute(text("""
-            SELECT capacidad FROM lugares
-            WHERE id = :lugar_id AND tenant_id = :tenant_id
-        """), {"lugar_id": datos["lugar_id"], "tenant_id": tenant_id}).fetchone()
+        # Verificar si el lugar pertenece al negocio (queda bloqueado hasta el commit)
+        capacidad = bloquear_lugares(db, tenant_id, [datos["lugar_id"]]).get(int(datos["lugar_id"]))
 
-        if not lugar:
+        if capacidad is None:
+            db.rollback()
             return {"error": "Lugar no válido o no pertenece al negocio"}, 403
 
-        capacidad = lugar[0]
-
-        # Validar disponibilidad (reservas solapadas)
-        query_ocupadas = text("""
-            SELECT COUNT(*) FROM reservas_generales rg
-            JOIN reservas_muelle rm ON rg.id = rm.reserva_id
-            WHERE rg.lugar_id = :lugar_id
-              AND rg.tenant_id = :tenant_id
-              AND daterange(rm.fecha_entrada, rm.fecha_salida, '[]') &&
-                  daterange(:fecha_entrada, :fecha_salida, '[]')
-        """)
-        ocupadas = current_app.db.execute(query_ocupadas, {
-            "lugar_id": datos["lugar_id"],
-            "tenant_id": tenant_id,
-            "fecha_entrada": datos["fecha_entrada"],
-            "fecha_salida": datos["fecha_salida"]
-        }).scalar()
+        # Validar disponibilidad (máximo de reservas en un mismo día)
+        ocupadas = ocupacion_maxima(db, tenant_id, datos["lugar_id"], datos["fecha_entrada"], datos["fecha_salida"])
 
         if ocupadas >= capacidad:
+            db.rollback()
             return {"error": "No hay espacios disponibles en ese rango de fechas"}, 409
 
         # Insertar en reservas_generales
@@ -48,7 +35,7 @@ def crear_reserva_admin_muelle(tenant_id, datos):
             VALUES (:usuario_id, :tenant_id, :lugar_id, :fecha)
             RETURNING id
         """)
-        result = current_app.db.execute(query_general, datos)
+        result = db.execute(query_general, datos)
         reserva_id = result.fetchone()[0]
 
         # Insertar en reservas_muelle
@@ -61,7 +48,7 @@ def crear_reserva_admin_muelle(tenant_id, datos):
                 :requiere_pintura, :requiere_mecanica, :requiere_motor
             )
         """)
-        current_app.db.execute(query_muelle, {
+        db.execute(query_muelle, {
             "reserva_id": reserva_id,
             "fecha_entrada": datos["fecha_entrada"],
             "fecha_salida": datos["fecha_salida"],
@@ -71,21 +58,27 @@ def crear_reserva_admin_muelle(tenant_id, datos):
             "requiere_motor": datos.get("requiere_motor", False)
         })
 
-        current_app.db.commit()
+        cambios = [(datos["lugar_id"], datos["fecha_entrada"], datos["fecha_salida"], +1)]
+        aplicar_ocupacion(db, tenant_id, cambios)
+        incrementar_version(db, tenant_id, [datos["lugar_id"]])
+
+        confirmar_ocupacion(db, tenant_id, cambios)
         return {"mensaje": "Reserva creada por el administrador", "reserva_id": reserva_id}, 201
 
     except Exception as e:
-        current_app.db.rollback()
+        db.rollback()
         return {"error": str(e)}, 500
     
-def editar_reserva_admin_muelle(tenant_id, reserva_id, datos):
+def editar_reserva_admin_muelle(db, tenant_id, reserva_id, datos):
     try:
         # Validar que la reserva pertenezca al negocio
         query_validar = text("""
-            SELECT rg.lugar_id FROM reservas_generales rg
+            SELECT rg.lugar_id, rm.fecha_entrada, rm.fecha_salida
+            FROM reservas_generales rg
+            JOIN reservas_muelle rm ON rg.id = rm.reserva_id
             WHERE rg.id = :reserva_id AND rg.tenant_id = :tenant_id
         """)
-        lugar_row = current_app.db.execute(query_validar, {
+        lugar_row = db.execute(query_validar, {
             "reserva_id": reserva_id,
             "tenant_id": tenant_id
         }).fetchone()
@@ -95,34 +88,24 @@ def editar_reserva_admin_muelle(tenant_id, reserva_id, datos):
 
         lugar_id = lugar_row[0]
 
-        # Validar que el lugar siga teniendo disponibilidad en las nuevas fechas
-        if "fecha_entrada" in datos and "fecha_salida" in datos:
-            query_lugar = text("""
-                SELECT capacidad FROM lugares WHERE id = :lugar_id AND tenant_id = :tenant_id
-            """)
-            capacidad = current_app.db.execute(query_lugar, {
-                "lugar_id": lugar_id,
-                "tenant_id": tenant_id
-            }).scalar()
-
-            query_conflicto = text("""
-                SELECT COUNT(*) FROM reservas_generales rg
-                JOIN reservas_muelle rm ON rg.id = rm.reserva_id
-                WHERE rg.lugar_id = :lugar_id
-                  AND rg.tenant_id = :tenant_id
-                  AND rg.id != :reserva_id
-                  AND daterange(rm.fecha_entrada, rm.fecha_salida, '[]') &&
-                      daterange(:fecha_entrada, :fecha_salida, '[]')
-            """)
-            ocupadas = current_app.db.execute(query_conflicto, {
-                "lugar_id": lugar_id,
-                "tenant_id": tenant_id,
-                "reserva_id": reserva_id,
-                "fecha_entrada": datos["fecha_entrada"],
-                "fecha_salida": datos["fecha_salida"]
-            }).scalar()
+        # Bloqueado hasta el commit antes de escribir (mismo orden que las altas)
+        capacidad = bloquear_lugares(db, tenant_id, [lugar_id]).get(lugar_id)
+
+        # Validar que el lugar siga teniendo disponibilidad en las nuevas
+        # fechas (las que no vengan se quedan como estaban)
+        entrada = datos.get("fecha_entrada", lugar_row[1])
+        salida = datos.get("fecha_salida", lugar_row[2])
+        if "fecha_entrada" in datos or "fecha_salida" in datos:
+            # El índice no puede descontar la propia reserva: solo sirve si
+            # las fechas nuevas no pisan las viejas
+            ocupadas = ocupacion_maxima(
+                db, tenant_id, lugar_id, entrada, salida,
+                excluir=reserva_id,
+                usar_indice=(str(entrada) > str(lugar_row[2])
+                             or str(salida) < str(lugar_row[1])))
 
             if ocupadas >= capacidad:
+                db.rollback()
                 return {"error": "No hay disponibilidad en ese rango de fechas"}, 409
 
         # Actualizar campos en reservas_muelle
@@ -144,11 +127,18 @@ def editar_reserva_admin_muelle(tenant_id, reserva_id, datos):
             SET {', '.join(set_clauses)}
             WHERE reserva_id = :reserva_id
         """
-        current_app.db.execute(text(sql), valores)
-        current_app.db.commit()
+        db.execute(text(sql), valores)
+
+        cambios = [
+            (lugar_id, lugar_row[1], lugar_row[2], -1),
+            (lugar_id, datos.get("fecha_entrada", lugar_row[1]), datos.get("fecha_salida", lugar_row[2]), +1),
+        ]
+        aplicar_ocupacion(db, tenant_id, cambios)
+        incrementar_version(db, tenant_id, [lugar_id])
+        confirmar_ocupacion(db, tenant_id, cambios)
 
         return {"mensaje": "Reserva actualizada correctamente"}
 
     except Exception as e:
-        current_app.db.rollback()
+        db.rollback()
         return {"error": str(e)}, 500
\ No newline at end of file
@@ -99,11 +99,15 @@ def login():
     try:
         usuario = db.query(Usuario).filter_by(correo=correo).first()
         if usuario and bcrypt.checkpw(clave.encode("utf-8"), usuario.clave.encode("utf-8")):
+            # El tipo de negocio va en el token: así las rutas no tienen que
+            # consultarlo en cada petición (ver logica/negocios.py)
+            negocio = db.get(Negocio, usuario.tenant_id)
             access_token = create_access_token(
                 identity=str(usuario.id),
                 additional_claims={
                     "rol_id": usuario.rol_id,
-                    "tenant_id": usuario.tenant_id
+                    "tenant_id": usuario.tenant_id,
+                    "tipo_negocio": negocio.tipo if negocio else None
                 }
             )
             # --- LOG AÑADIDO ---
@@ -8,6 +8,7 @@ def extraer_identidad(func):
             "usuario_id": get_jwt_identity(),
             "tenant_id": get_jwt().get("tenant_id"),
             "rol_id": get_jwt().get("rol_id"),
+            "tipo_negocio": get_jwt().get("tipo_negocio"),
         }
         return func(*args, identidad=identidad, **kwargs)
     return wrapper
\ No newline at end of file
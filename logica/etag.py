@@ -0,0 +1,74 @@
+# logica/etag.py
+#
+# GET condicionales (ETag / If-None-Match -> 304) para las lecturas que los
+# clientes refrescan sin parar: /api/reservas, /api/admin/reservas,
+# /api/admin/lugares y /api/disponibilidad.
+#
+# El ETag sale de la versión del tenant (logica/versiones.py), que sube en
+# la misma transacción que cualquier alta, edición o baja de reservas y
+# lugares, más la ruta con sus parámetros y quién pregunta (el listado de
+# un usuario no es el de otro aunque la versión sea la misma). Si el
+# cliente ya tiene ese ETag se le contesta 304 con una sola consulta (la
+# de la versión), sin ejecutar el listado ni serializar el JSON. asgi.py
+# calcula los mismos ETags (calcular_etag / cliente_tiene).
+#
+# - ETAG_SEMILLA: forma parte de todos los ETags. Cambiarla al desplegar
+#   una versión que cambie el formato de las respuestas invalida lo que
+#   tienen guardado los clientes aunque los datos no hayan cambiado.
+
+import hashlib
+import os
+import threading
+
+from flask import Response, request
+from werkzeug.http import parse_etags
+
+from logica.versiones import version_tenant
+
+ETAG_SEMILLA = os.getenv("ETAG_SEMILLA", "1")
+
+_candado = threading.Lock()
+_contadores = {"no_modificadas": 0, "completas": 0}
+
+
+def calcular_etag(version, tenant_id, quien, ruta):
+    huella = hashlib.sha1(f"{ETAG_SEMILLA}|{tenant_id}|{quien}|{ruta}".encode()).hexdigest()[:16]
+    return f"{version}-{huella}"
+
+
+def cliente_tiene(if_none_match, etag):
+    """True si la cabecera If-None-Match ya incluye el ETag (comparación débil)."""
+    tiene = bool(if_none_match) and parse_etags(if_none_match).contains_weak(etag)
+    with _candado:
+        _contadores["no_modificadas" if tiene else "completas"] += 1
+    return tiene
+
+
+# --- Modo Flask ---
+
+def etag_peticion(db, tenant_id, quien=None):
+    """ETag de la petición en curso con la versión actual del tenant."""
+    return calcular_etag(version_tenant(db, tenant_id), tenant_id, quien, request.full_path)
+
+
+def no_modificada(etag):
+    """Response 304 si el cliente ya tiene esta versión; si no, None."""
+    if not cliente_tiene(request.headers.get("If-None-Match"), etag):
+        return None
+    return con_etag(Response(status=304), etag)
+
+
+def con_etag(respuesta, etag):
+    respuesta.set_etag(etag)
+    # El ETag depende de quién pregunta: una cache compartida no puede mezclar tokens
+    respuesta.vary.add("Authorization")
+    return respuesta
+
+
+def estadisticas():
+    with _candado:
+        total = _contadores["no_modificadas"] + _contadores["completas"]
+        return {
+            **_contadores,
+            "tasa_304": round(_contadores["no_modificadas"] / total, 4) if total else None,
+        }
@@ -0,0 +1,181 @@
+# logica/exportacion.py
+#
+# Exportaciones completas (CSV o NDJSON) con COPY ... TO STDOUT: Postgres
+# escribe las filas ya formateadas y Python solo pasa los bytes a la
+# respuesta, sin crear un diccionario por fila ni codificar JSON. Es lo que
+# usa /api/admin/reservas/exportar (el volcado anual de contabilidad); para
+# listados que luego procesa la propia app está logica/streaming.py.
+#
+# copy_expert de psycopg2 es bloqueante y empuja los datos (llama a write()
+# por cada fila), así que corre en un hilo que junta las filas en trozos de
+# EXPORTACION_BYTES_POR_TROZO y los deja en una cola de como mucho
+# EXPORTACION_TROZOS_EN_COLA: si el cliente lee despacio el hilo espera, y
+# la memoria por exportación no pasa de trozo x cola.
+#
+# - Un error de SQL sale antes de enviar nada (se espera al primer trozo):
+#   la ruta todavía puede contestar 500.
+# - Si el cliente corta, se cancela el COPY en el servidor y el hilo acaba.
+# - Si falla a mitad, el CSV o el NDJSON quedan cortados; el detalle sale
+#   en el log.
+#
+# Solo en el modo Flask (COPY es de psycopg2; asgi.py usa asyncpg).
+
+import os
+import queue
+import threading
+import traceback
+
+from flask import Response, stream_with_context
+
+FORMATOS_EXPORTACION = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+EXPORTACION_BYTES_POR_TROZO = int(os.getenv("EXPORTACION_BYTES_POR_TROZO", "65536"))
+EXPORTACION_TROZOS_EN_COLA = int(os.getenv("EXPORTACION_TROZOS_EN_COLA", "16"))
+
+_FIN = object()
+
+
+def formato_exportacion(args):
+    """'csv' (por defecto) o 'ndjson'. ValueError si no se conoce."""
+    formato = (args.get("formato") or "csv").strip().lower()
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato de exportación no soportado: {formato} (usa {', '.join(FORMATOS_EXPORTACION)})")
+    return formato
+
+
+def sentencia_copy(cursor, dialecto, consulta, parametros, formato):
+    """COPY de la consulta (un text() de SQLAlchemy) con los parámetros ya escritos."""
+    # COPY no admite parámetros: se escriben con el escapado de psycopg2
+    compilada = consulta.compile(dialect=dialecto)
+    select = cursor.mogrify(str(compilada), compilada.construct_params(parametros)).decode()
+    if formato == "csv":
+        return f"COPY ({select}) TO STDOUT WITH (FORMAT csv, HEADER)"
+    # Una fila JSON por línea. En formato text COPY doblaría las barras
+    # invertidas del JSON; en csv, con comillas y separador que el JSON nunca
+    # lleva sin escapar, lo deja tal cual
+    return (f"COPY (SELECT row_to_json(x) FROM ({select}) x) TO STDOUT "
+            f"WITH (FORMAT csv, QUOTE E'\\x01', DELIMITER E'\\x02')")
+
+
+class _EscritorCola:
+    """El 'fichero' de copy_expert: junta las filas en trozos y los deja en la cola."""
+
+    def __init__(self, cola, cancelada):
+        self.cola = cola
+        self.cancelada = cancelada
+        self.buffer = bytearray()
+
+    def write(self, datos):
+        self.buffer += datos
+        if len(self.buffer) >= EXPORTACION_BYTES_POR_TROZO:
+            self.vaciar()
+
+    def vaciar(self):
+        if self.buffer:
+            self.poner(bytes(self.buffer))
+            self.buffer.clear()
+
+    def poner(self, elemento):
+        # Cancelada: se descarta lo que llegue hasta que Postgres corte el COPY
+        while not self.cancelada.is_set():
+            try:
+                self.cola.put(elemento, timeout=0.5)
+                return
+            except queue.Full:
+                pass
+
+
+def _copiar(conexion, sql, escritor):
+    try:
+        with conexion.cursor() as cursor:
+            cursor.copy_expert(sql, escritor)
+        escritor.vaciar()
+        escritor.poner(_FIN)
+    except Exception as e:
+        escritor.poner(e)
+
+
+class Exportacion:
+    """
+    Iterador de trozos (bytes) de un COPY ... TO STDOUT. Usa la conexión de
+    la petición (db) desde un hilo propio; close() espera a que el hilo
+    termine antes de que la conexión vuelva al pool.
+    """
+
+    def __init__(self, db, consulta, parametros, formato):
+        self.db = db
+        self.conexion = db.connection.dbapi_connection
+        with self.conexion.cursor() as cursor:
+            sql = sentencia_copy(cursor, db.dialect, consulta, parametros, formato)
+        self.cola = queue.Queue(maxsize=EXPORTACION_TROZOS_EN_COLA)
+        self.cancelada = threading.Event()
+        self.completa = False
+        self.terminada = False
+        self.hilo = threading.Thread(
+            target=_copiar, args=(self.conexion, sql, _EscritorCola(self.cola, self.cancelada)),
+            name="exportacion", daemon=True,
+        )
+        self.hilo.start()
+        # Un error de SQL sale aquí, antes de la respuesta
+        self.primero = self._siguiente()
+
+    def _siguiente(self):
+        trozo = self.cola.get()
+        if trozo is _FIN or isinstance(trozo, Exception):
+            self.completa = True
+            self.close()
+            if trozo is _FIN:
+                raise StopIteration
+            raise trozo
+        return trozo
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        if self.primero is not None:
+            trozo, self.primero = self.primero, None
+            return trozo
+        if self.terminada:
+            raise StopIteration
+        return self._siguiente()
+
+    def close(self):
+        if self.terminada:
+            return
+        self.terminada = True
+        if self.completa:
+            self.hilo.join()
+            return
+        # El cliente cortó: se cancela el COPY y el hilo sale con el error.
+        # La conexión no vuelve al pool: la cancelación llega por otra vía y
+        # podría alcanzar a la siguiente consulta que la usara
+        self.cancelada.set()
+        self.conexion.cancel()
+        self.hilo.join()
+        self.db.invalidate()
+
+
+def exportar(db, consulta, parametros, formato):
+    """Exportacion lista para respuesta_exportacion(). Lanza los errores de SQL ya."""
+    try:
+        return Exportacion(db, consulta, parametros, formato)
+    except StopIteration:
+        # Sin filas (ni cabecera: no debería pasar con csv)
+        return iter(())
+
+
+def respuesta_exportacion(db, trozos, formato, nombre):
+    """Response de Flask que envía 'trozos' como fichero adjunto 'nombre.<formato>'."""
+    def generar():
+        try:
+            yield from trozos
+        except Exception:
+            db.rollback()
+            traceback.print_exc()
+        finally:
+            if hasattr(trozos, "close"):
+                trozos.close()
+
+    respuesta = Response(stream_with_context(generar()), mimetype=FORMATOS_EXPORTACION[formato])
+    respuesta.headers["Content-Disposition"] = f'attachment; filename="{nombre}.{formato}"'
+    return respuesta
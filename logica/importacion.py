@@ -0,0 +1,184 @@
+# logica/importacion.py
+#
+# Importación masiva desde CSV (alta de un muelle nuevo: sus lugares y las
+# reservas históricas). El archivo se carga tal cual con COPY ... FROM STDIN
+# en una tabla temporal de texto, se valida con unas pocas sentencias sobre
+# todo el conjunto (no fila a fila desde Python) y las filas buenas se
+# guardan con INSERT ... SELECT, todo en una transacción. Cada fila mala
+# vuelve con su número de línea y el motivo.
+#
+# Modos (?modo=...), como en el alta en lote:
+# - todo_o_nada (por defecto): si alguna fila falla no se guarda ninguna
+# - parcial: se guardan las que pasan la validación
+#
+# - IMPORTACION_MAX_ERRORES: errores que se devuelven como mucho (el total
+#   va aparte)
+# - IMPORTACION_MAX_DIAS: estancia máxima de una reserva importada (cada día
+#   es una fila de ocupacion_diaria; un año mal escrito no debe generar miles)
+#
+# Desde la línea de comandos, con las mismas reglas que los endpoints:
+#
+#     python -m logica.importacion lugares lugares.csv --tenant 1
+#     python -m logica.importacion reservas reservas.csv --tenant 1 --modo parcial
+
+import argparse
+import csv
+import os
+
+import psycopg2
+from sqlalchemy import text
+
+MODOS_IMPORTACION = ("todo_o_nada", "parcial")
+IMPORTACION_MAX_ERRORES = int(os.getenv("IMPORTACION_MAX_ERRORES", "1000"))
+IMPORTACION_MAX_DIAS = int(os.getenv("IMPORTACION_MAX_DIAS", "366"))
+
+
+def archivo_de_peticion(request):
+    """El CSV de la petición: campo 'archivo' de un multipart o el cuerpo (text/csv)."""
+    if request.mimetype == "multipart/form-data":
+        archivo = request.files.get("archivo")
+        return archivo.stream if archivo else None
+    return request.stream
+
+
+class _ConCabecera:
+    """El archivo con su primera línea (ya leída) otra vez delante, para COPY."""
+
+    def __init__(self, linea, archivo):
+        self.linea = linea
+        self.archivo = archivo
+
+    def read(self, tamano=-1):
+        if self.linea:
+            linea, self.linea = self.linea, b""
+            return linea
+        return self.archivo.read(tamano)
+
+
+def _leer_cabecera(linea, columnas, obligatorias):
+    cabecera = [c.strip().lower() for c in next(csv.reader([linea.decode("utf-8-sig")]), [])]
+    if not cabecera or cabecera == [""]:
+        raise ValueError("El CSV está vacío o no tiene cabecera")
+    desconocidas = [c for c in cabecera if c not in columnas]
+    if desconocidas:
+        raise ValueError(f"Columna desconocida: {desconocidas[0]} (se admiten {', '.join(columnas)})")
+    if len(set(cabecera)) < len(cabecera):
+        raise ValueError("Hay columnas repetidas en la cabecera")
+    for alternativas in obligatorias:
+        if not any(c in cabecera for c in alternativas):
+            raise ValueError(f"Falta la columna obligatoria: {' o '.join(alternativas)}")
+    return cabecera
+
+
+def cargar_csv(db, tabla, columnas, obligatorias, archivo):
+    """
+    Crea la tabla temporal 'tabla' (fila, una columna TEXT por cada una de
+    'columnas', error) y carga el CSV con COPY. 'fila' es la línea del
+    archivo (la cabecera es la 1) mientras ningún campo entre comillas
+    tenga saltos de línea. obligatorias: lista de tuplas de columnas
+    de las que tiene que venir al menos una. Devuelve cuántas filas cargó.
+    ValueError si la cabecera no sirve.
+    """
+    linea = archivo.readline()
+    cabecera = _leer_cabecera(linea, columnas, obligatorias)
+    db.execute(text(f"""
+        CREATE TEMP TABLE {tabla} (
+            fila BIGINT GENERATED ALWAYS AS IDENTITY (START WITH 2),
+            {', '.join(f'{c} TEXT' for c in columnas)},
+            error TEXT
+        ) ON COMMIT DROP
+    """))
+    # COPY vuelve a recibir la cabecera (y se la salta) para que las líneas
+    # de sus errores sean las del archivo
+    with db.connection.dbapi_connection.cursor() as cursor:
+        cursor.copy_expert(
+            f"COPY {tabla} ({', '.join(cabecera)}) FROM STDIN WITH (FORMAT csv, HEADER, ENCODING 'UTF8')",
+            _ConCabecera(linea, archivo))
+        return cursor.rowcount
+
+
+def _errores(db, tabla):
+    total = db.execute(text(f"SELECT COUNT(*) FROM {tabla} WHERE error IS NOT NULL")).scalar()
+    errores = [dict(fila) for fila in db.execute(text(f"""
+        SELECT fila, error FROM {tabla} WHERE error IS NOT NULL ORDER BY fila LIMIT :limite
+    """), {"limite": IMPORTACION_MAX_ERRORES}).mappings()]
+    return total, errores
+
+
+def analizar_si_crece(db, tabla, filas):
+    """
+    ANALYZE de 'tabla' si se le acaban de añadir más filas de las que tenía
+    según sus estadísticas (la primera importación de una instalación nueva).
+    Sin esto las comprobaciones de claves ajenas contra ella, que se planifican
+    con las estadísticas de cuando estaba vacía, la recorren entera por cada
+    fila de la siguiente tabla.
+    """
+    estimadas = db.execute(text(
+        "SELECT reltuples FROM pg_class WHERE oid = CAST(:tabla AS regclass)"), {"tabla": tabla}).scalar()
+    if filas > max(estimadas or 0, 0):
+        db.execute(text(f"ANALYZE {tabla}"))
+
+
+def importar_csv(db, archivo, modo, tabla, columnas, obligatorias, validar, guardar):
+    """
+    Carga, valida y guarda un CSV en una transacción.
+    - validar(db): marca 'error' en las filas que no sirven y devuelve el
+      nombre de la tabla (fila, error, ...) con el resultado
+    - guardar(db, tabla_validada): inserta las filas sin error, hace el
+      commit y devuelve cuántas guardó
+    Devuelve (respuesta, status): 201 si entraron todas, 200 si en modo
+    parcial quedaron filas fuera, 409 si no se guardó nada, 400 si el
+    archivo no se puede leer.
+    """
+    if modo not in MODOS_IMPORTACION:
+        return {"error": f"Modo no válido: {modo} (usa {' o '.join(MODOS_IMPORTACION)})"}, 400
+    if archivo is None:
+        return {"error": "Envía el CSV en el cuerpo (text/csv) o en el campo 'archivo'"}, 400
+    try:
+        filas = cargar_csv(db, tabla, columnas, obligatorias, archivo)
+    except (ValueError, UnicodeDecodeError, psycopg2.DataError) as e:
+        # Cabecera mala o CSV que COPY no entiende (el mensaje trae la línea)
+        db.rollback()
+        return {"error": f"CSV no válido: {str(e).strip()}"}, 400
+    if not filas:
+        db.rollback()
+        return {"error": "El CSV no tiene filas"}, 400
+
+    tabla_validada = validar(db)
+    total_errores, errores = _errores(db, tabla_validada)
+    respuesta = {"filas": filas, "total_errores": total_errores, "errores": errores}
+    if total_errores == filas or (total_errores and modo == "todo_o_nada"):
+        db.rollback()
+        return {"importadas": 0, **respuesta}, 409
+
+    importadas = guardar(db, tabla_validada)
+    print(f"✅ Importación: {importadas} de {filas} filas guardadas en {tabla}")
+    return {"importadas": importadas, **respuesta}, 201 if not total_errores else 200
+
+
+if __name__ == "__main__":
+    import json
+
+    from config.bd import engine
+    from logica.negocios import obtener_tipo_negocio_por_tenant
+    from logica.admin.admin_factory import obtener_admin_handler
+    from logica.admin.lugares_admin import importar_lugares_admin
+
+    parser = argparse.ArgumentParser(description="Importa lugares o reservas desde un CSV")
+    parser.add_argument("que", choices=["lugares", "reservas"])
+    parser.add_argument("archivo", help="Ruta del CSV (con cabecera)")
+    parser.add_argument("--tenant", type=int, required=True)
+    parser.add_argument("--modo", choices=MODOS_IMPORTACION, default="todo_o_nada")
+    args = parser.parse_args()
+
+    with engine.connect() as conexion, open(args.archivo, "rb") as archivo:
+        tipo_negocio = obtener_tipo_negocio_por_tenant(args.tenant, conexion)
+        if not tipo_negocio:
+            raise SystemExit(f"❌ El tenant {args.tenant} no existe")
+        if args.que == "lugares":
+            respuesta, status = importar_lugares_admin(conexion, args.tenant, tipo_negocio, archivo, args.modo)
+        else:
+            handler = obtener_admin_handler(tipo_negocio, conexion, args.tenant)
+            respuesta, status = handler.importar_reservas(archivo, args.modo)
+    print(json.dumps(respuesta, ensure_ascii=False, indent=2))
+    raise SystemExit(0 if status < 300 else 1)
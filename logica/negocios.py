@@ -1,12 +1,109 @@
+import os
+import threading
+import time
+from collections import OrderedDict
 from sqlalchemy import text
-from flask import current_app
 
-def obtener_tipo_negocio_por_tenant(tenant_id):
+# =========================================================================
+# CACHE DEL TIPO DE NEGOCIO POR TENANT
+# El tipo de un negocio prácticamente no cambia, así que no hace falta
+# preguntarlo a la BD en cada petición.
+# - CACHE_TENANTS_TTL: segundos que vale una entrada
+# - CACHE_TENANTS_MAX: número máximo de tenants guardados (se expulsa el más antiguo)
+# =========================================================================
+CACHE_TENANTS_TTL = float(os.getenv("CACHE_TENANTS_TTL", "300"))
+CACHE_TENANTS_MAX = int(os.getenv("CACHE_TENANTS_MAX", "1024"))
+
+
+class CacheTenants:
+    def __init__(self, ttl, max_entradas):
+        self.ttl = ttl
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()  # tenant_id -> (tipo, expira_en)
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desde_token = 0
+        self.expulsiones = 0
+
+    def obtener(self, tenant_id):
+        with self._candado:
+            entrada = self._datos.get(tenant_id)
+            if entrada is None or entrada[1] < time.monotonic():
+                self._datos.pop(tenant_id, None)
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(tenant_id)
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, tenant_id, tipo):
+        with self._candado:
+            self._datos[tenant_id] = (tipo, time.monotonic() + self.ttl)
+            self._datos.move_to_end(tenant_id)
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.expulsiones += 1
+
+    def contar_desde_token(self):
+        with self._candado:
+            self.desde_token += 1
+
+    def invalidar(self, tenant_id):
+        with self._candado:
+            self._datos.pop(tenant_id, None)
+
+    def invalidar_todo(self):
+        with self._candado:
+            self._datos.clear()
+
+    def estadisticas(self):
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desde_token": self.desde_token,
+                "expulsiones": self.expulsiones,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+            }
+
+
+cache_tenants = CacheTenants(CACHE_TENANTS_TTL, CACHE_TENANTS_MAX)
+
+
+def obtener_tipo_negocio_por_tenant(tenant_id, db):
+    tipo = cache_tenants.obtener(tenant_id)
+    if tipo is not None:
+        return tipo
     try:
         query = text("SELECT tipo FROM negocios WHERE id = :id")
-        result = current_app.db.execute(query, {"id": tenant_id}).fetchone()
-        return result[0] if result else None
+        result = db.execute(query, {"id": tenant_id}).fetchone()
+        if not result:
+            return None
+        cache_tenants.guardar(tenant_id, result[0])
+        return result[0]
     except Exception as e:
         print("❌ Error al obtener tipo de negocio:", e)
-        current_app.db.rollback()  # muy importante
-        return None
\ No newline at end of file
+        db.rollback()  # muy importante
+        return None
+
+def obtener_tipo_negocio(identidad, db):
+    """
+    Los tokens emitidos por /api/login ya traen 'tipo_negocio' en sus claims,
+    así que no hace falta consultar nada. Los tokens antiguos (sin ese claim)
+    pasan por la cache y, si no está, por la BD.
+    """
+    tipo = identidad.get("tipo_negocio")
+    if tipo:
+        cache_tenants.contar_desde_token()
+        return tipo
+    return obtener_tipo_negocio_por_tenant(identidad.get("tenant_id"), db)
+
+def invalidar_tipo_negocio(tenant_id=None):
+    # Llamar si se cambia el tipo de un negocio (None = vaciar toda la cache)
+    if tenant_id is None:
+        cache_tenants.invalidar_todo()
+    else:
+        cache_tenants.invalidar(tenant_id)
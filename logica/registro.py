@@ -0,0 +1,121 @@
+# logica/registro.py
+#
+# Registro de handlers por tipo de negocio y estado compartido por tenant.
+#
+# Cada vertical registra su clase con un decorador al importarse su módulo:
+#
+#     @registrar_handler("hotel")
+#     class ReservaHotel(ReservaBase): ...
+#
+# El módulo no se importa al arrancar: se importa la primera vez que llega
+# una petición de ese tipo (logica/reservas/<tipo>.py, logica/admin/<tipo>_admin.py).
+# Así un despliegue solo carga las verticales que usa y una vertical nueva
+# no necesita tocar las factories.
+
+import importlib
+import os
+import threading
+import time
+
+from sqlalchemy import text
+
+
+class RegistroHandlers:
+    def __init__(self, paquete, sufijo=""):
+        self.paquete = paquete
+        self.sufijo = sufijo
+        self._clases = {}
+        self._candado = threading.Lock()
+
+    def registrar(self, tipo):
+        def decorador(clase):
+            self._clases[tipo] = clase
+            return clase
+        return decorador
+
+    def clase(self, tipo):
+        if tipo not in self._clases and tipo.isidentifier():
+            modulo = f"{self.paquete}.{tipo}{self.sufijo}"
+            with self._candado:
+                try:
+                    importlib.import_module(modulo)
+                except ModuleNotFoundError as e:
+                    # Solo ignoramos que no exista el módulo de la vertical,
+                    # no un import roto dentro de él
+                    if e.name != modulo:
+                        raise
+        return self._clases.get(tipo)
+
+    def tipos_cargados(self):
+        return sorted(self._clases)
+
+
+# =========================================================================
+# ESTADO POR TENANT
+# Datos que cambian poco y que antes se consultaban en cada petición
+# (p. ej. la capacidad de cada lugar). Los handlers se crean por petición
+# porque usan la conexión de esa petición, pero comparten este estado.
+# - ESTADO_TENANT_TTL: segundos que vale lo guardado (por si otro proceso
+#   edita un lugar); las ediciones hechas en este proceso lo invalidan al momento.
+#   Un valor viejo solo puede servir para dejar pasar: quien va a rechazar
+#   con él lo vuelve a leer antes (capacidad_lugar(..., fresca=True)).
+# =========================================================================
+ESTADO_TENANT_TTL = float(os.getenv("ESTADO_TENANT_TTL", "60"))
+
+SQL_CAPACIDAD_LUGAR = text("""
+    SELECT capacidad FROM lugares
+    WHERE id = :lugar_id AND tenant_id = :tenant_id
+""")
+
+
+class EstadoTenant:
+    def __init__(self, tenant_id, ttl=ESTADO_TENANT_TTL):
+        self.tenant_id = tenant_id
+        self.ttl = ttl
+        self._capacidades = {}  # lugar_id -> (capacidad, expira_en)
+        self._candado = threading.Lock()
+
+    def capacidad_lugar(self, db, lugar_id, fresca=False):
+        """
+        Capacidad del lugar si existe y es de este tenant; None si no.
+        Los lugares inexistentes no se guardan. fresca=True la lee de la BD
+        aunque esté guardada (y guarda la nueva).
+        """
+        lugar_id = int(lugar_id)
+        with self._candado:
+            entrada = self._capacidades.get(lugar_id)
+        if not fresca and entrada is not None and entrada[1] >= time.monotonic():
+            return entrada[0]
+
+        capacidad = db.execute(SQL_CAPACIDAD_LUGAR, {
+            "lugar_id": lugar_id,
+            "tenant_id": self.tenant_id
+        }).scalar()
+        if capacidad is not None:
+            with self._candado:
+                self._capacidades[lugar_id] = (capacidad, time.monotonic() + self.ttl)
+        return capacidad
+
+    def invalidar(self):
+        with self._candado:
+            self._capacidades.clear()
+
+
+_estados = {}
+_candado_estados = threading.Lock()
+
+
+def estado_tenant(tenant_id):
+    with _candado_estados:
+        estado = _estados.get(tenant_id)
+        if estado is None:
+            estado = _estados[tenant_id] = EstadoTenant(tenant_id)
+        return estado
+
+
+def invalidar_estado_tenant(tenant_id):
+    # Llamar cuando se crea, edita o desactiva un lugar del tenant
+    with _candado_estados:
+        estado = _estados.get(tenant_id)
+    if estado is not None:
+        estado.invalidar()
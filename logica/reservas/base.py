@@ -1,7 +1,25 @@
+import heapq
+from datetime import datetime, timedelta
+
+from logica.registro import estado_tenant
+from logica.versiones import cache_disponibilidad, version_tenant
+from logica.singleflight import vuelos_disponibilidad
+from .disponibilidad import obtener_motor, dias_del_rango
+from .tramos import restar_de, calcular_tramos_con_cupos, huecos, etiquetas_dias
+
 class ReservaBase:
+    # Motor que calcula la ocupación diaria (ver disponibilidad.py) y consulta
+    # de estancias que solapan un rango, que usa el motor "barrido". Una
+    # vertical que defina sql_estancias_en_rango hereda
+    # consultar_disponibilidad_por_dias tal cual.
+    motor_disponibilidad = obtener_motor()
+    sql_estancias_en_rango = None
+
     def __init__(self, db, tenant_id):
         self.db = db
         self.tenant_id = tenant_id
+        # Estado compartido entre peticiones del mismo tenant (capacidades, etc.)
+        self.estado = estado_tenant(tenant_id)
 
     def crear_reserva(self, datos):
         """
@@ -12,11 +30,14 @@ class ReservaBase:
 
     # --- CORRECCIÓN 1 ---
     # Ahora acepta un 'usuario_id' opcional con 'None' como default.
-    def listar_reservas(self, usuario_id=None):
+    def listar_reservas(self, usuario_id=None, filtros=None, stream=False):
         """
         Lista las reservas.
         Si usuario_id se provee, filtra por ese usuario.
         Si usuario_id es None, lista todas las del tenant.
+        filtros (paginacion.leer_filtros) trae la página y el resto de filtros.
+        Con stream=True devuelve un iterador que lee por lotes
+        (streaming.filas_por_lotes) en vez de una lista.
         """
         raise NotImplementedError("Subclase debe implementar listar_reservas")
 
@@ -26,5 +47,148 @@ class ReservaBase:
     def consultar_disponibilidad_por_dias(self, fecha_inicio, fecha_fin):
         """
         Consulta la disponibilidad entre dos fechas.
+        Devuelve por cada lugar sus tramos consecutivos con cupo.
+        """
+        if self.sql_estancias_en_rango is None:
+            raise NotImplementedError("Subclase debe definir sql_estancias_en_rango")
+
+        try:
+            # Fechas como date (asyncpg no convierte strings por su cuenta)
+            fecha_inicio = datetime.strptime(fecha_inicio, "%Y-%m-%d").date()
+            fecha_fin = datetime.strptime(fecha_fin, "%Y-%m-%d").date()
+            if fecha_fin < fecha_inicio:
+                return []
+
+            # El resultado vale mientras no cambie la versión del tenant
+            # (cualquier reserva o lugar nuevo, editado o borrado la sube)
+            clave = (self.tenant_id, self.motor_disponibilidad.nombre, fecha_inicio, fecha_fin)
+            version = version_tenant(self.db, self.tenant_id)
+            disponibilidad = cache_disponibilidad.obtener(clave, version) if cache_disponibilidad.activa else None
+            if disponibilidad is not None:
+                return disponibilidad
+
+            def calcular():
+                resultado = self._calcular_disponibilidad(fecha_inicio, fecha_fin)
+                if cache_disponibilidad.activa:
+                    cache_disponibilidad.guardar(clave, version, resultado)
+                return resultado
+
+            # Peticiones idénticas y simultáneas esperan a un único cálculo
+            return vuelos_disponibilidad.ejecutar((clave, version), calcular)
+
+        except Exception as e:
+            return {"error": str(e)}
+
+    def _calcular_disponibilidad(self, fecha_inicio, fecha_fin):
+        ocupacion = self.motor_disponibilidad.ocupacion(
+            self.db, self.tenant_id, fecha_inicio, fecha_fin, self.sql_estancias_en_rango
+        )
+
+        disponibilidad = []
+        for lugar, ocupadas in ocupacion:
+            disponibles = restar_de(lugar.capacidad, ocupadas)
+            disponibilidad.append({
+                "lugar_id": lugar.lugar_id,
+                "nombre": lugar.nombre,
+                "capacidad": lugar.capacidad,
+                "tramos_disponibles": calcular_tramos_con_cupos(fecha_inicio, disponibles)
+            })
+
+        return disponibilidad
+
+    def buscar_ventanas(self, duracion_dias, desde, horizonte_dias, lugar_id=None, zona=None, n=1):
         """
-        raise NotImplementedError("Subclase debe implementar consultar_disponibilidad_por_dias")
\ No newline at end of file
+        Las n ventanas más tempranas de 'duracion_dias' días seguidos con cupo
+        entre 'desde' y 'desde + horizonte_dias - 1', opcionalmente en un
+        lugar o una zona. Cada hueco libre de un lugar aporta como mucho una
+        ventana (la primera fecha en la que cabe la estancia).
+        """
+        if self.sql_estancias_en_rango is None:
+            raise NotImplementedError("Subclase debe definir sql_estancias_en_rango")
+
+        fecha_fin = desde + timedelta(days=horizonte_dias - 1)
+        ocupacion = self.motor_disponibilidad.ocupacion(
+            self.db, self.tenant_id, desde, fecha_fin, self.sql_estancias_en_rango
+        )
+
+        candidatas = []
+        for lugar, ocupadas in ocupacion:
+            if lugar_id is not None and lugar.lugar_id != lugar_id:
+                continue
+            if zona is not None and lugar.zona != zona:
+                continue
+            disponibles = restar_de(lugar.capacidad, ocupadas)
+            for inicio, fin, cupos in huecos(disponibles, duracion_dias):
+                candidatas.append((inicio, lugar.lugar_id, fin, cupos, lugar))
+
+        etiquetas = etiquetas_dias(desde, horizonte_dias)
+        return [
+            {
+                "lugar_id": lugar.lugar_id,
+                "nombre": lugar.nombre,
+                "zona": lugar.zona,
+                "inicio": etiquetas[inicio],
+                "fin": etiquetas[inicio + duracion_dias - 1],
+                "libre_hasta": etiquetas[fin],
+                "cupos": cupos,
+            }
+            for inicio, _, fin, cupos, lugar in heapq.nsmallest(n, candidatas, key=lambda c: (c[0], c[1]))
+        ]
+
+    def consultar_lote(self, candidatos):
+        """
+        Comprueba muchas combinaciones (lugar_id, fecha_entrada, fecha_salida)
+        a la vez: una sola consulta trae la ocupación de esos lugares en el
+        rango que las cubre a todas y cada candidato se evalúa en memoria.
+        Devuelve, en el mismo orden, si cabe una reserva más y cuántos cupos
+        quedan (mínimo por día) en cada uno. ValueError si los candidatos
+        válidos abarcan más de DISPONIBILIDAD_MAX_DIAS.
+        """
+        if self.sql_estancias_en_rango is None:
+            raise NotImplementedError("Subclase debe definir sql_estancias_en_rango")
+
+        validos = []
+        resultados = []
+        for candidato in candidatos:
+            resultado = {
+                "lugar_id": candidato.get("lugar_id"),
+                "fecha_entrada": candidato.get("fecha_entrada"),
+                "fecha_salida": candidato.get("fecha_salida"),
+            }
+            resultados.append(resultado)
+            try:
+                lugar_id = int(candidato["lugar_id"])
+                entrada = datetime.strptime(candidato["fecha_entrada"], "%Y-%m-%d").date()
+                salida = datetime.strptime(candidato["fecha_salida"], "%Y-%m-%d").date()
+            except (KeyError, TypeError, ValueError):
+                resultado["error"] = "Se requiere lugar_id, fecha_entrada y fecha_salida (YYYY-MM-DD)"
+                continue
+            if salida < entrada:
+                resultado["error"] = "La fecha de salida no puede ser anterior a la fecha de entrada"
+                continue
+            validos.append((resultado, lugar_id, entrada, salida))
+
+        if not validos:
+            return resultados
+
+        desde = min(v[2] for v in validos)
+        hasta = max(v[3] for v in validos)
+        # El motor arma un arreglo por lugar de [desde, hasta]: se limita
+        # antes de consultar nada
+        dias_del_rango(desde, hasta)
+        ocupacion = self.motor_disponibilidad.ocupacion(
+            self.db, self.tenant_id, desde, hasta, self.sql_estancias_en_rango,
+            lugar_ids=sorted({v[1] for v in validos})
+        )
+        disponibles = {lugar.lugar_id: restar_de(lugar.capacidad, ocupadas) for lugar, ocupadas in ocupacion}
+
+        for resultado, lugar_id, entrada, salida in validos:
+            dias = disponibles.get(lugar_id)
+            if dias is None:
+                resultado["error"] = "El lugar no existe o no pertenece a este negocio"
+                continue
+            cupos = int(min(dias[(entrada - desde).days:(salida - desde).days + 1]))
+            resultado["disponible"] = cupos > 0
+            resultado["cupos_restantes"] = max(cupos, 0)
+
+        return resultados
@@ -0,0 +1,157 @@
+# logica/reservas/disponibilidad.py
+#
+# Motores de disponibilidad: calculan, para cada lugar del tenant, la
+# ocupación de cada día de un rango como arreglo de enteros (posición =
+# días desde fecha_inicio). ReservaBase.consultar_disponibilidad_por_dias
+# los usa, así que cualquier vertical que defina su consulta de estancias
+# (sql_estancias_en_rango) tiene disponibilidad sin escribir nada más.
+#
+# - "tabla":   lee la tabla ocupacion_diaria (ver ocupacion.py). Solo sirve
+#              para verticales que la mantienen al crear/editar/borrar.
+# - "barrido": lee solo las reservas del tenant que solapan el rango y
+#              cuenta los días con un arreglo de diferencias, O(R + D) por
+#              lugar. No depende de ninguna tabla auxiliar.
+#
+# Los dos resuelven todo con una sola consulta a la BD.
+#
+# MOTOR_DISPONIBILIDAD elige el motor por defecto (tabla si no se indica).
+# DISPONIBILIDAD_MAX_DIAS limita el rango: cada lugar lleva un arreglo con
+# un entero por día, y un rango de siglos pediría gigas (ValueError).
+
+import os
+import threading
+
+from sqlalchemy import text
+
+from .tramos import arreglo_dias, asignar_por_desplazamiento, ocupacion_por_barrido
+
+MOTOR_DISPONIBILIDAD = os.getenv("MOTOR_DISPONIBILIDAD", "tabla").strip().lower()
+DISPONIBILIDAD_MAX_DIAS = int(os.getenv("DISPONIBILIDAD_MAX_DIAS", str(5 * 366)))
+
+# Ocupación ya calculada por día. Una fila por lugar: los días con reservas
+# como desplazamiento desde :fecha_inicio y su ocupación (NULL si el lugar
+# no tiene ninguna en el rango). :lugares (opcional) limita a esos lugares.
+SQL_OCUPACION_DIARIA_RANGO = text("""
+    SELECT l.id AS lugar_id,
+           l.nombre,
+           l.capacidad,
+           l.zona,
+           array_agg(o.dia - CAST(:fecha_inicio AS DATE) ORDER BY o.dia)
+               FILTER (WHERE o.dia IS NOT NULL) AS desplazamientos,
+           array_agg(o.ocupadas ORDER BY o.dia)
+               FILTER (WHERE o.dia IS NOT NULL) AS ocupadas
+    FROM lugares l
+    LEFT JOIN ocupacion_diaria o ON o.lugar_id = l.id
+        AND o.dia BETWEEN :fecha_inicio AND :fecha_fin
+    WHERE l.tenant_id = :tenant_id
+      AND (CAST(:lugares AS INTEGER[]) IS NULL OR l.id = ANY(CAST(:lugares AS INTEGER[])))
+    GROUP BY l.id, l.nombre, l.capacidad, l.zona
+    ORDER BY l.id
+""")
+
+# Lugares del tenant con sus estancias en el rango (consulta de la vertical)
+# en una sola ida y vuelta
+SQL_BARRIDO = """
+    SELECT l.id AS lugar_id, l.nombre, l.capacidad, l.zona, e.desde, e.hasta
+    FROM lugares l
+    LEFT JOIN ({estancias}) e ON e.lugar_id = l.id
+    WHERE l.tenant_id = :tenant_id
+      AND (CAST(:lugares AS INTEGER[]) IS NULL OR l.id = ANY(CAST(:lugares AS INTEGER[])))
+    ORDER BY l.id
+"""
+_consultas_barrido = {}
+_candado_barrido = threading.Lock()
+
+
+def consulta_barrido(sql_estancias):
+    """SQL_BARRIDO con la consulta de estancias de una vertical (se compone una vez)."""
+    with _candado_barrido:
+        consulta = _consultas_barrido.get(sql_estancias)
+        if consulta is None:
+            consulta = _consultas_barrido[sql_estancias] = text(
+                SQL_BARRIDO.format(estancias=sql_estancias.text.strip())
+            )
+        return consulta
+
+
+def dias_del_rango(fecha_inicio, fecha_fin):
+    """Días de [fecha_inicio, fecha_fin]. ValueError si pasa de DISPONIBILIDAD_MAX_DIAS."""
+    n_dias = (fecha_fin - fecha_inicio).days + 1
+    if n_dias > DISPONIBILIDAD_MAX_DIAS:
+        raise ValueError(f"El rango de fechas no puede pasar de {DISPONIBILIDAD_MAX_DIAS} días")
+    return n_dias
+
+
+class MotorDisponibilidad:
+    nombre = None
+
+    def ocupacion(self, db, tenant_id, fecha_inicio, fecha_fin, sql_estancias=None, lugar_ids=None):
+        """
+        Lista de (lugar, ocupadas) con los lugares del tenant (todos, o solo
+        los de lugar_ids) ordenados por id. 'lugar' tiene lugar_id, nombre,
+        capacidad y zona; 'ocupadas' es un arreglo con una posición por día
+        de [fecha_inicio, fecha_fin]. Una sola consulta a la BD.
+        """
+        raise NotImplementedError("Subclase debe implementar ocupacion")
+
+
+class MotorTablaDiaria(MotorDisponibilidad):
+    nombre = "tabla"
+
+    def ocupacion(self, db, tenant_id, fecha_inicio, fecha_fin, sql_estancias=None, lugar_ids=None):
+        n_dias = dias_del_rango(fecha_inicio, fecha_fin)
+        rows = db.execute(SQL_OCUPACION_DIARIA_RANGO, {
+            "tenant_id": tenant_id,
+            "fecha_inicio": fecha_inicio,
+            "fecha_fin": fecha_fin,
+            "lugares": lugar_ids
+        }).fetchall()
+
+        resultado = []
+        for row in rows:
+            # Los días que no están en la tabla no tienen ninguna reserva
+            ocupadas = arreglo_dias(n_dias)
+            if row.desplazamientos:
+                asignar_por_desplazamiento(ocupadas, row.desplazamientos, row.ocupadas)
+            resultado.append((row, ocupadas))
+        return resultado
+
+
+class MotorBarrido(MotorDisponibilidad):
+    """
+    sql_estancias debe devolver una fila por lugar con reservas en el rango:
+    lugar_id, desde[] y hasta[], donde cada estancia ocupa los días
+    [desde, hasta) ya recortados al rango y contados desde :fecha_inicio.
+    """
+    nombre = "barrido"
+
+    def ocupacion(self, db, tenant_id, fecha_inicio, fecha_fin, sql_estancias=None, lugar_ids=None):
+        if sql_estancias is None:
+            raise NotImplementedError("La vertical no define sql_estancias_en_rango")
+
+        n_dias = dias_del_rango(fecha_inicio, fecha_fin)
+        rows = db.execute(consulta_barrido(sql_estancias), {
+            "tenant_id": tenant_id,
+            "fecha_inicio": fecha_inicio,
+            "fecha_fin": fecha_fin,
+            "lugares": lugar_ids
+        }).fetchall()
+
+        resultado = []
+        for row in rows:
+            if row.desde is None:
+                ocupadas = arreglo_dias(n_dias)
+            else:
+                ocupadas = ocupacion_por_barrido(n_dias, row.desde, row.hasta)
+            resultado.append((row, ocupadas))
+        return resultado
+
+
+MOTORES = {motor.nombre: motor for motor in (MotorTablaDiaria(), MotorBarrido())}
+
+
+def obtener_motor(nombre=None):
+    nombre = (nombre or MOTOR_DISPONIBILIDAD).strip().lower()
+    if nombre not in MOTORES:
+        raise ValueError(f"Motor de disponibilidad no soportado: {nombre}")
+    return MOTORES[nombre]
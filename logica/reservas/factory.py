@@ -1,15 +1,15 @@
 # logica/reservas/factory.py
 
-from .muelle import ReservaMuelle
-from .hotel import ReservaHotel
-from .restaurante import ReservaRestaurante
+from logica.registro import RegistroHandlers
+
+# tipo de negocio -> clase (se carga logica/reservas/<tipo>.py la primera vez)
+registro_reservas = RegistroHandlers(__package__)
+
+def registrar_handler(tipo):
+    return registro_reservas.registrar(tipo)
 
 def obtener_reserva_handler(tipo_negocio, db, tenant_id):
-    if tipo_negocio == "muelle":
-        return ReservaMuelle(db, tenant_id)
-    elif tipo_negocio == "hotel":
-        return ReservaHotel(db, tenant_id)
-    elif tipo_negocio == "restaurante":
-        return ReservaRestaurante(db, tenant_id)
-    else:
+    clase = registro_reservas.clase(tipo_negocio) if tipo_negocio else None
+    if clase is None:
         raise ValueError("Tipo de negocio no soportado")
+    return clase(db, tenant_id)
@@ -1,5 +1,7 @@
 from .base import ReservaBase
+from .factory import registrar_handler
 
+@registrar_handler("hotel")
 class ReservaHotel(ReservaBase):
     def crear_reserva(self, datos):
         ...
\ No newline at end of file
@@ -0,0 +1,300 @@
+# logica/reservas/indice_ocupacion.py
+#
+# Índice en memoria de la ocupación diaria (opcional, INDICE_OCUPACION=true).
+#
+# Para cada lugar se guarda un árbol de segmentos sobre los próximos
+# INDICE_OCUPACION_DIAS días que responde "máximo de reservas simultáneas en
+# [entrada, salida]" en O(log n), sin ir a Postgres. Se usa en las
+# comprobaciones de cupo al crear o editar reservas.
+#
+# - Se calienta al arrancar (app.py) a partir de la tabla ocupacion_diaria.
+# - El horizonte empieza el día en que se calentó. Un hilo (iniciar_revision)
+#   lo vuelve a calentar cada INDICE_OCUPACION_REVISION segundos para los
+#   tenants cuyo origen ya pasó, así los días pasados no ocupan el árbol y
+#   siempre quedan INDICE_OCUPACION_DIAS días por delante. Lo hace con los
+#   lugares del tenant bloqueados (desplazar): ninguna escritura queda a
+#   medias entre lo leído de la BD y el índice.
+# - Cada escritura lo actualiza con los mismos cambios que se pasan a
+#   aplicar_ocupacion() justo antes del commit, con los lugares todavía
+#   bloqueados (confirmar_ocupacion), y lo deshace si el commit falla.
+# - Si no puede responder con seguridad (tenant o lugar sin calentar, fechas
+#   fuera del horizonte, índice desactivado) devuelve None y el llamador
+#   consulta la BD como siempre.
+#
+# ⚠ Solo es válido con UN proceso escribiendo (un worker de Flask, con los
+# hilos que se quiera). Con varios workers o réplicas de la app cada uno
+# vería solo sus propias escrituras: en ese caso hay que dejarlo desactivado.
+# Tras reconstruir ocupacion_diaria a mano (python -m logica.reservas.ocupacion)
+# hay que reiniciar la app.
+
+import os
+import threading
+import time
+import traceback
+from datetime import date, timedelta
+
+from sqlalchemy import text
+
+INDICE_OCUPACION = os.getenv("INDICE_OCUPACION", "false").lower() == "true"
+INDICE_OCUPACION_DIAS = int(os.getenv("INDICE_OCUPACION_DIAS", "730"))
+INDICE_OCUPACION_REVISION = int(os.getenv("INDICE_OCUPACION_REVISION", "600"))
+
+SQL_TENANTS_INDICE = text("""
+    SELECT id FROM negocios
+    WHERE CAST(:tenant_id AS INTEGER) IS NULL OR id = :tenant_id
+""")
+
+SQL_LUGARES_INDICE = text("""
+    SELECT id, tenant_id FROM lugares
+    WHERE CAST(:tenant_id AS INTEGER) IS NULL OR tenant_id = :tenant_id
+""")
+
+# Mismo candado que bloquear_lugares (logica/versiones.py), para todo el tenant
+SQL_BLOQUEAR_LUGARES_INDICE = text("""
+    SELECT id FROM lugares WHERE tenant_id = :tenant_id ORDER BY id FOR UPDATE
+""")
+
+SQL_OCUPACION_INDICE = text("""
+    SELECT lugar_id, dia - CAST(:origen AS DATE) AS desplazamiento, ocupadas
+    FROM ocupacion_diaria
+    WHERE dia BETWEEN :origen AND :hasta
+      AND (CAST(:tenant_id AS INTEGER) IS NULL OR tenant_id = :tenant_id)
+""")
+
+
+class ArbolOcupacion:
+    """
+    Árbol de segmentos sobre n días con suma en rango y máximo en rango
+    (ambos sobre [a, b] inclusivo). La suma pendiente de cada nodo no se
+    propaga hacia abajo: se tiene en cuenta al subir.
+    """
+
+    def __init__(self, valores):
+        self.n = len(valores)
+        tam = 1
+        while tam < self.n:
+            tam *= 2
+        self.tam = tam
+        self.maximo = [0] * (2 * tam)
+        self.pendiente = [0] * (2 * tam)
+        self.maximo[tam:tam + self.n] = valores
+        for nodo in range(tam - 1, 0, -1):
+            self.maximo[nodo] = max(self.maximo[2 * nodo], self.maximo[2 * nodo + 1])
+
+    def sumar(self, a, b, valor):
+        self._sumar(1, 0, self.tam - 1, a, b, valor)
+
+    def _sumar(self, nodo, izq, der, a, b, valor):
+        if b < izq or der < a:
+            return
+        if a <= izq and der <= b:
+            self.maximo[nodo] += valor
+            self.pendiente[nodo] += valor
+            return
+        medio = (izq + der) // 2
+        self._sumar(2 * nodo, izq, medio, a, b, valor)
+        self._sumar(2 * nodo + 1, medio + 1, der, a, b, valor)
+        self.maximo[nodo] = max(self.maximo[2 * nodo], self.maximo[2 * nodo + 1]) + self.pendiente[nodo]
+
+    def maximo_en(self, a, b):
+        return self._maximo(1, 0, self.tam - 1, a, b)
+
+    def _maximo(self, nodo, izq, der, a, b):
+        if a <= izq and der <= b:
+            return self.maximo[nodo]
+        medio = (izq + der) // 2
+        resultado = None
+        if a <= medio:
+            resultado = self._maximo(2 * nodo, izq, medio, a, b)
+        if b > medio:
+            derecha = self._maximo(2 * nodo + 1, medio + 1, der, a, b)
+            resultado = derecha if resultado is None else max(resultado, derecha)
+        return resultado + self.pendiente[nodo]
+
+
+def _fecha(valor):
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor))
+
+
+class IndiceOcupacion:
+    def __init__(self, dias):
+        self.dias = dias
+        self._tenants = {}  # tenant_id -> (origen, {lugar_id: ArbolOcupacion})
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def calentar(self, db, tenant_id=None, origen=None, solo_lugares=None):
+        """
+        Carga desde ocupacion_diaria un tenant (o todos si tenant_id es None).
+        Con solo_lugares se quedan fuera los demás lugares (se consultan en la BD).
+        """
+        origen = origen or date.today()
+        hasta = origen + timedelta(days=self.dias - 1)
+        valores = {}
+        for lugar in db.execute(SQL_LUGARES_INDICE, {"tenant_id": tenant_id}):
+            if solo_lugares is not None and lugar.id not in solo_lugares:
+                continue
+            valores[lugar.id] = (lugar.tenant_id, [0] * self.dias)
+        for row in db.execute(SQL_OCUPACION_INDICE, {
+            "tenant_id": tenant_id, "origen": origen, "hasta": hasta
+        }):
+            if row.lugar_id in valores:
+                valores[row.lugar_id][1][row.desplazamiento] = row.ocupadas
+
+        # Los tenants sin lugares también quedan calientes (sus lugares nuevos
+        # se añaden con registrar_lugar)
+        tenants = {row.id: {} for row in db.execute(SQL_TENANTS_INDICE, {"tenant_id": tenant_id})}
+        for lugar_id, (tenant, dias) in valores.items():
+            tenants.setdefault(tenant, {})[lugar_id] = ArbolOcupacion(dias)
+        with self._candado:
+            if tenant_id is not None:
+                if tenant_id in tenants:
+                    self._tenants[tenant_id] = (origen, tenants[tenant_id])
+                else:
+                    # El negocio ya no existe
+                    self._tenants.pop(tenant_id, None)
+            else:
+                self._tenants = {tenant: (origen, arboles) for tenant, arboles in tenants.items()}
+
+    def desplazar(self, db, hoy=None):
+        """
+        Vuelve a calentar, con origen hoy, los tenants calentados antes de hoy.
+        Bloquea antes los lugares del tenant: las escrituras en curso (que ya
+        tocaron el índice, ver confirmar_ocupacion) terminan antes de leer la
+        BD y las nuevas esperan a que esté el índice nuevo. Un lugar creado
+        mientras tanto queda fuera hasta el siguiente desplazamiento.
+        Devuelve los tenants desplazados.
+        """
+        hoy = hoy or date.today()
+        with self._candado:
+            pendientes = [tenant for tenant, (origen, _) in self._tenants.items() if origen < hoy]
+        for tenant_id in pendientes:
+            try:
+                bloqueados = {row.id for row in db.execute(SQL_BLOQUEAR_LUGARES_INDICE, {"tenant_id": tenant_id})}
+                self.calentar(db, tenant_id, origen=hoy, solo_lugares=bloqueados)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+        return pendientes
+
+    def _rango(self, origen, entrada, salida):
+        a = (_fecha(entrada) - origen).days
+        b = (_fecha(salida) - origen).days
+        return a, b
+
+    def maximo_ocupadas(self, tenant_id, lugar_id, entrada, salida):
+        """Máximo de reservas en un mismo día de [entrada, salida], o None si no lo sabe."""
+        with self._candado:
+            datos = self._tenants.get(tenant_id)
+            arbol = datos[1].get(int(lugar_id)) if datos else None
+            if arbol is not None:
+                a, b = self._rango(datos[0], entrada, salida)
+                if 0 <= a <= b < arbol.n:
+                    self.aciertos += 1
+                    return arbol.maximo_en(a, b)
+            self.fallos += 1
+            return None
+
+    def aplicar(self, tenant_id, cambios):
+        """Mismos cambios que aplicar_ocupacion() (ver confirmar_ocupacion)."""
+        with self._candado:
+            datos = self._tenants.get(tenant_id)
+            if datos is None:
+                return
+            origen, arboles = datos
+            for lugar_id, entrada, salida, signo in cambios:
+                arbol = arboles.get(int(lugar_id))
+                if arbol is None:
+                    continue
+                # Los días fuera del horizonte no se guardan (se consultan en la BD)
+                a, b = self._rango(origen, entrada, salida)
+                a, b = max(a, 0), min(b, arbol.n - 1)
+                if a <= b:
+                    arbol.sumar(a, b, signo)
+
+    def registrar_lugar(self, tenant_id, lugar_id):
+        # Un lugar recién creado no tiene reservas
+        with self._candado:
+            datos = self._tenants.get(tenant_id)
+            if datos is not None:
+                datos[1][int(lugar_id)] = ArbolOcupacion([0] * self.dias)
+
+    def invalidar(self, tenant_id=None):
+        with self._candado:
+            if tenant_id is None:
+                self._tenants.clear()
+            else:
+                self._tenants.pop(tenant_id, None)
+
+    def estadisticas(self):
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                "activo": INDICE_OCUPACION,
+                "tenants": len(self._tenants),
+                "lugares": sum(len(arboles) for _, arboles in self._tenants.values()),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+            }
+
+
+indice_ocupacion = IndiceOcupacion(INDICE_OCUPACION_DIAS)
+
+
+def calentar_indice_ocupacion(db):
+    indice_ocupacion.calentar(db)
+    print(f"✅ Índice de ocupación en memoria: {indice_ocupacion.estadisticas()}")
+
+
+def iniciar_revision(engine, cada=INDICE_OCUPACION_REVISION):
+    """Hilo que desplaza el índice cuando cambia el día (ver desplazar)."""
+
+    def revisar():
+        while True:
+            time.sleep(cada)
+            try:
+                with engine.connect() as conexion:
+                    desplazados = indice_ocupacion.desplazar(conexion)
+                if desplazados:
+                    print(f"✅ Índice de ocupación desplazado a {date.today()} para los tenants {desplazados}")
+            except Exception:
+                traceback.print_exc()
+
+    hilo = threading.Thread(target=revisar, name="indice_ocupacion", daemon=True)
+    hilo.start()
+    return hilo
+
+
+def maximo_ocupadas(tenant_id, lugar_id, entrada, salida):
+    if not INDICE_OCUPACION:
+        return None
+    return indice_ocupacion.maximo_ocupadas(tenant_id, lugar_id, entrada, salida)
+
+
+def registrar_ocupacion(tenant_id, cambios):
+    if INDICE_OCUPACION:
+        indice_ocupacion.aplicar(tenant_id, cambios)
+
+
+def registrar_lugar_nuevo(tenant_id, lugar_id):
+    if INDICE_OCUPACION:
+        indice_ocupacion.registrar_lugar(tenant_id, lugar_id)
+
+
+def confirmar_ocupacion(db, tenant_id, cambios):
+    """
+    Commit de una escritura de reservas. El índice se actualiza antes, mientras
+    la transacción aún tiene bloqueados los lugares: quien espera ese bloqueo
+    para comprobar cupo ya encuentra la reserva en el índice. Si el commit
+    falla se deshace el cambio.
+    """
+    registrar_ocupacion(tenant_id, cambios)
+    try:
+        db.commit()
+    except BaseException:
+        registrar_ocupacion(tenant_id, [(lugar_id, entrada, salida, -signo)
+                                        for lugar_id, entrada, salida, signo in cambios])
+        raise
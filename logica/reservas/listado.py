@@ -0,0 +1,68 @@
+# logica/reservas/listado.py
+#
+# Mantenimiento de la tabla reservas_listado, el modelo de lectura de los
+# listados (/api/reservas y /api/admin/reservas): una fila por reserva de
+# muelle con los nombres de usuario y lugar ya resueltos. Los disparadores
+# de init_db.FUNCIONES la mantienen al día en cada escritura; esto solo hace
+# falta para rellenarla la primera vez (init_db lo hace si está vacía) o si
+# se ha tocado a mano:
+#
+#     python -m logica.reservas.listado            # todos los tenants
+#     python -m logica.reservas.listado --tenant 1
+
+import argparse
+
+from sqlalchemy import text
+
+SQL_BORRAR_LISTADO = text("""
+    DELETE FROM reservas_listado
+    WHERE CAST(:tenant_id AS INTEGER) IS NULL OR tenant_id = :tenant_id
+""")
+
+SQL_RECONSTRUIR_LISTADO = text("""
+    INSERT INTO reservas_listado (
+        reserva_id, tenant_id, usuario_id, lugar_id, fecha,
+        fecha_entrada, fecha_salida, tipo_embarcacion,
+        requiere_pintura, requiere_mecanica, requiere_motor, usuario, lugar
+    )
+    SELECT rg.id, rg.tenant_id, rg.usuario_id, rg.lugar_id, rg.fecha,
+           rm.fecha_entrada, rm.fecha_salida, rm.tipo_embarcacion,
+           rm.requiere_pintura, rm.requiere_mecanica, rm.requiere_motor, u.nombre, l.nombre
+    FROM reservas_generales rg
+    JOIN reservas_muelle rm ON rg.id = rm.reserva_id
+    JOIN usuarios u ON rg.usuario_id = u.id
+    LEFT JOIN lugares l ON rg.lugar_id = l.id
+    WHERE CAST(:tenant_id AS INTEGER) IS NULL OR rg.tenant_id = :tenant_id
+""")
+
+SQL_LISTADO_PENDIENTE = text("""
+    SELECT NOT EXISTS (SELECT 1 FROM reservas_listado)
+       AND EXISTS (SELECT 1 FROM reservas_muelle)
+""")
+
+
+def reconstruir_listado(db, tenant_id=None):
+    """Rehace la tabla desde las reservas (backfill). Hace commit."""
+    db.execute(SQL_BORRAR_LISTADO, {"tenant_id": tenant_id})
+    db.execute(SQL_RECONSTRUIR_LISTADO, {"tenant_id": tenant_id})
+    db.commit()
+
+
+def rellenar_si_vacio(db):
+    """Backfill al desplegar sobre una BD que ya tenía reservas. True si lo hizo."""
+    if not db.execute(SQL_LISTADO_PENDIENTE).scalar():
+        return False
+    reconstruir_listado(db)
+    return True
+
+
+if __name__ == "__main__":
+    from config.bd import engine
+
+    parser = argparse.ArgumentParser(description="Reconstruye la tabla reservas_listado")
+    parser.add_argument("--tenant", type=int, default=None, help="Solo este tenant (por defecto todos)")
+    args = parser.parse_args()
+
+    with engine.connect() as conexion:
+        reconstruir_listado(conexion, args.tenant)
+    print("✅ Listado de reservas reconstruido.")
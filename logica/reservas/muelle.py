@@ -1,9 +1,142 @@
 from .base import ReservaBase
+from .factory import registrar_handler
+from .indice_ocupacion import maximo_ocupadas, confirmar_ocupacion
+from .paginacion import leer_filtros
+from logica.streaming import filas_por_lotes
 from sqlalchemy import text
-from datetime import datetime
 
+# Consultas preparadas una sola vez a nivel de módulo (SQLAlchemy reutiliza
+# su compilación entre peticiones)
+
+# Máximo de reservas del lugar en un mismo día de [entrada, salida] (la
+# ocupación real, no cuántas se solapan con el rango en algún momento).
+# Sin expandir días: cada estancia que solapa aporta +1 el día que entra en
+# el rango y -1 el día siguiente al que sale, y el máximo de la suma
+# acumulada por día es el pico. :excluir deja fuera una reserva (la que se
+# está editando). crear_reserva_muelle() hace lo mismo en la BD (ver
+# init_db.FUNCIONES).
+#
+# Se recorren las reservas del lugar (índice tenant_id, lugar_id) y se busca
+# cada detalle por clave. El LIMIT 1 (reserva_id es la clave, no quita nada)
+# impide que el planificador lo convierta en un hash join con un Seq Scan de
+# reservas_muelle cuando el rango es largo y solapa con media tabla.
+SQL_OCUPACION_MAXIMA = text("""
+    SELECT COALESCE(MAX(ocupadas), 0) FROM (
+        SELECT SUM(SUM(e.delta)) OVER (ORDER BY e.dia) AS ocupadas
+        FROM reservas_generales rg
+        CROSS JOIN LATERAL (
+            SELECT rm.fecha_entrada, rm.fecha_salida FROM reservas_muelle rm
+            WHERE rm.reserva_id = rg.id
+              AND daterange(rm.fecha_entrada, rm.fecha_salida, '[]') &&
+                  daterange(CAST(:fecha_entrada AS DATE), CAST(:fecha_salida AS DATE), '[]')
+            LIMIT 1
+        ) rm
+        CROSS JOIN LATERAL (VALUES
+            (GREATEST(rm.fecha_entrada, CAST(:fecha_entrada AS DATE)), 1),
+            (LEAST(rm.fecha_salida, CAST(:fecha_salida AS DATE)) + 1, -1)
+        ) AS e(dia, delta)
+        WHERE rg.lugar_id = :lugar_id
+          AND rg.tenant_id = :tenant_id
+          AND (CAST(:excluir AS INTEGER) IS NULL OR rg.id <> :excluir)
+        GROUP BY e.dia
+    ) x
+""")
+
+# Alta completa en una sola ida y vuelta: bloqueo del lugar, cupo, los dos
+# INSERT, ocupación diaria y versión (función creada por init_db)
+SQL_CREAR_RESERVA = text("""
+    SELECT estado, id_reserva FROM crear_reserva_muelle(
+        CAST(:tenant_id AS INTEGER), CAST(:usuario_id AS INTEGER), CAST(:lugar_id AS INTEGER),
+        CAST(:fecha AS DATE), CAST(:fecha_entrada AS DATE), CAST(:fecha_salida AS DATE),
+        CAST(:tipo_embarcacion AS VARCHAR), CAST(:requiere_pintura AS BOOLEAN),
+        CAST(:requiere_mecanica AS BOOLEAN), CAST(:requiere_motor AS BOOLEAN)
+    )
+""")
+
+# Filtros y página de los listados (ver paginacion.py), compartidos con el
+# listado de admin. Se leen de reservas_listado (ver listado.py), que ya
+# trae los nombres de usuario y lugar: sin joins, cada página es un solo
+# recorrido de índice en orden que para al llenarla. Los NULL desactivan
+# cada filtro; psycopg2 manda los valores ya escritos en la consulta, así
+# que el plan se hace con los filtros que de verdad vienen:
+# - sin filtros, fechas o cursor: ix_reservas_listado_tenant_entrada
+# - usuario / lugar / tipo_embarcacion: ix_reservas_listado_tenant_usuario /
+#   _tenant_lugar / _tenant_tipo
+# - desde: ix_reservas_listado_tenant_salida cuando deja pocas filas (el
+#   planificador las trae por ese índice y ordena solo esas); si deja
+#   muchas, sigue siendo mejor recorrer _tenant_entrada en orden
+# El cursor compara (fecha_entrada, reserva_id), las columnas del índice.
+FILTROS_LISTADO = """
+    WHERE rl.tenant_id = :tenant_id
+      AND (CAST(:usuario_id AS INTEGER) IS NULL OR rl.usuario_id = :usuario_id)
+      AND (CAST(:lugar_id AS INTEGER) IS NULL OR rl.lugar_id = :lugar_id)
+      AND (CAST(:tipo_embarcacion AS VARCHAR) IS NULL OR rl.tipo_embarcacion = :tipo_embarcacion)
+      AND (CAST(:desde AS DATE) IS NULL OR rl.fecha_salida >= :desde)
+      AND (CAST(:hasta AS DATE) IS NULL OR rl.fecha_entrada <= :hasta)
+      AND (CAST(:cursor_fecha AS DATE) IS NULL
+           OR (rl.fecha_entrada, rl.reserva_id) < (CAST(:cursor_fecha AS DATE), CAST(:cursor_id AS INTEGER)))
+    ORDER BY rl.fecha_entrada DESC, rl.reserva_id DESC
+    LIMIT :limite
+"""
+
+SQL_LISTAR_RESERVAS = text("""
+    SELECT rl.reserva_id,
+           rl.fecha,
+           rl.fecha_entrada,
+           rl.fecha_salida,
+           rl.tipo_embarcacion,
+           rl.requiere_pintura,
+           rl.requiere_mecanica,
+           rl.requiere_motor,
+           rl.usuario,
+           rl.lugar,
+           rl.usuario_id,
+           rl.lugar_id
+    FROM reservas_listado rl
+""" + FILTROS_LISTADO)
+
+# Estancias que solapan [:fecha_inicio, :fecha_fin] para el motor "barrido"
+# (ver disponibilidad.py): una fila por lugar, con cada estancia recortada al
+# rango como días [desde, hasta) contados desde :fecha_inicio.
+SQL_ESTANCIAS_EN_RANGO = text("""
+    SELECT rg.lugar_id,
+           array_agg(GREATEST(rm.fecha_entrada, CAST(:fecha_inicio AS DATE))
+                     - CAST(:fecha_inicio AS DATE)) AS desde,
+           array_agg(LEAST(rm.fecha_salida, CAST(:fecha_fin AS DATE))
+                     - CAST(:fecha_inicio AS DATE) + 1) AS hasta
+    FROM reservas_generales rg
+    JOIN reservas_muelle rm ON rm.reserva_id = rg.id
+    WHERE rg.tenant_id = :tenant_id
+      AND daterange(rm.fecha_entrada, rm.fecha_salida, '[]') &&
+          daterange(CAST(:fecha_inicio AS DATE), CAST(:fecha_fin AS DATE), '[]')
+    GROUP BY rg.lugar_id
+""")
+
+
+def ocupacion_maxima(db, tenant_id, lugar_id, fecha_entrada, fecha_salida, excluir=None, usar_indice=True):
+    """
+    Máximo de reservas simultáneas del lugar en [fecha_entrada, fecha_salida]:
+    se compara con la capacidad al crear o mover una reserva. Responde el
+    índice en memoria si puede (no sabe descontar 'excluir': quien edita pasa
+    usar_indice=False si las fechas nuevas pisan las viejas) y si no, la BD.
+    """
+    if usar_indice:
+        ocupadas = maximo_ocupadas(tenant_id, lugar_id, fecha_entrada, fecha_salida)
+        if ocupadas is not None:
+            return ocupadas
+    return db.execute(SQL_OCUPACION_MAXIMA, {
+        "tenant_id": tenant_id,
+        "lugar_id": lugar_id,
+        "fecha_entrada": fecha_entrada,
+        "fecha_salida": fecha_salida,
+        "excluir": excluir
+    }).scalar()
+
+
+@registrar_handler("muelle")
 class ReservaMuelle(ReservaBase):
-    
+    sql_estancias_en_rango = SQL_ESTANCIAS_EN_RANGO
+
     def crear_reserva(self, datos):
         print("📥 Datos recibidos:", datos)
 
@@ -18,80 +151,46 @@ class ReservaMuelle(ReservaBase):
             from datetime import datetime
             datos['fecha'] = datetime.now().strftime('%Y-%m-%d')
 
-            # 3. Validar disponibilidad antes de crear
             lugar_id = datos["lugar_id"]
             fecha_entrada = datos["fecha_entrada"]
             fecha_salida = datos["fecha_salida"]
 
-            # Verificar que el lugar existe y pertenece al tenant
-            query_lugar = text("""
-                SELECT capacidad FROM lugares 
-                WHERE id = :lugar_id AND tenant_id = :tenant_id
-            """)
-            capacidad = self.db.execute(query_lugar, {
-                "lugar_id": lugar_id,
-                "tenant_id": datos["tenant_id"]
-            }).scalar()
-
-            if not capacidad:
-                return {"error": "El lugar no existe o no pertenece a este negocio"}, 404
-
-            # Verificar disponibilidad
-            query_ocupacion = text("""
-                SELECT COUNT(*) FROM reservas_generales rg
-                JOIN reservas_muelle rm ON rg.id = rm.reserva_id
-                WHERE rg.lugar_id = :lugar_id
-                  AND rg.tenant_id = :tenant_id
-                  AND daterange(rm.fecha_entrada, rm.fecha_salida, '[]') &&
-                      daterange(:fecha_entrada, :fecha_salida, '[]')
-            """)
-            ocupadas = self.db.execute(query_ocupacion, {
-                "lugar_id": lugar_id,
+            # 3. Si el índice en memoria ya sabe que no cabe, no se bloquea el
+            #    lugar. La capacidad guardada puede ser vieja (otro proceso la
+            #    subió): antes de rechazar se lee la vigente
+            ocupadas = maximo_ocupadas(datos["tenant_id"], lugar_id, fecha_entrada, fecha_salida)
+            if ocupadas is not None:
+                capacidad = self.estado.capacidad_lugar(self.db, lugar_id)
+                if capacidad and ocupadas >= capacidad:
+                    capacidad = self.estado.capacidad_lugar(self.db, lugar_id, fresca=True)
+                if capacidad and ocupadas >= capacidad:
+                    return {"error": "No hay disponibilidad en ese rango de fechas"}, 409
+
+            # 4. Validar y crear en la BD en una sola llamada (lugar bloqueado
+            #    hasta el commit, ver crear_reserva_muelle en init_db.py)
+            estado, reserva_id = self.db.execute(SQL_CREAR_RESERVA, {
                 "tenant_id": datos["tenant_id"],
-                "fecha_entrada": fecha_entrada,
-                "fecha_salida": fecha_salida
-            }).scalar()
-
-            if ocupadas >= capacidad:
-                return {"error": "No hay disponibilidad en ese rango de fechas"}, 409
-
-            # 4. Insertar en reservas_generales
-            query_reserva_general = text("""
-                INSERT INTO reservas_generales (usuario_id, lugar_id, fecha, tenant_id)
-                VALUES (:usuario_id, :lugar_id, :fecha, :tenant_id)
-                RETURNING id
-            """)
-            
-            reserva_id = self.db.execute(query_reserva_general, {
                 "usuario_id": datos["usuario_id"],
-                "lugar_id": datos["lugar_id"],
+                "lugar_id": lugar_id,
                 "fecha": datos["fecha"],
-                "tenant_id": datos["tenant_id"]
-            }).scalar()
-
-            # 5. Insertar en reservas_muelle
-            query_reserva_muelle = text("""
-                INSERT INTO reservas_muelle (
-                    reserva_id, fecha_entrada, fecha_salida, tipo_embarcacion,
-                    requiere_pintura, requiere_mecanica, requiere_motor
-                ) VALUES (
-                    :reserva_id, :fecha_entrada, :fecha_salida, :tipo_embarcacion,
-                    :requiere_pintura, :requiere_mecanica, :requiere_motor
-                )
-            """)
-            
-            self.db.execute(query_reserva_muelle, {
-                "reserva_id": reserva_id,
-                "fecha_entrada": datos["fecha_entrada"],
-                "fecha_salida": datos["fecha_salida"],
+                "fecha_entrada": fecha_entrada,
+                "fecha_salida": fecha_salida,
                 "tipo_embarcacion": datos["tipo_embarcacion"],
                 "requiere_pintura": datos.get("requiere_pintura", False),
                 "requiere_mecanica": datos.get("requiere_mecanica", False),
                 "requiere_motor": datos.get("requiere_motor", False)
-            })
+            }).one()
+
+            if estado == 404:
+                self.db.rollback()
+                return {"error": "El lugar no existe o no pertenece a este negocio"}, 404
+            if estado == 409:
+                self.db.rollback()  # suelta el bloqueo del lugar
+                return {"error": "No hay disponibilidad en ese rango de fechas"}, 409
 
-            # 6. Confirmar la transacción
-            self.db.commit()
+            # 5. Confirmar la transacción (y soltar el bloqueo del lugar)
+            cambios = [(lugar_id, fecha_entrada, fecha_salida, +1)]
+            confirmar_ocupacion(self.db, datos["tenant_id"], cambios)
 
             print(f"✅ Reserva creada exitosamente con ID: {reserva_id}")
             return {
@@ -107,33 +206,16 @@ class ReservaMuelle(ReservaBase):
             return {"error": f"Error interno del servidor: {str(e)}"}, 500
 
     
-    def listar_reservas(self, usuario_id=None):
+    def listar_reservas(self, usuario_id=None, filtros=None, stream=False):
+        parametros = {
+            **(filtros or leer_filtros({}, stream=stream)),
+            "tenant_id": self.tenant_id,
+            "usuario_id": int(usuario_id) if usuario_id is not None else None # <-- Usamos el argumento
+        }
+        if stream:
+            return filas_por_lotes(self.db, SQL_LISTAR_RESERVAS, parametros)
         try:
-            query = text("""
-                SELECT rg.id AS reserva_id,
-                       TO_CHAR(rg.fecha, 'YYYY-MM-DD') AS fecha,
-                       TO_CHAR(rm.fecha_entrada, 'YYYY-MM-DD') AS fecha_entrada,
-                       TO_CHAR(rm.fecha_salida, 'YYYY-MM-DD') AS fecha_salida,
-                       rm.tipo_embarcacion,
-                       rm.requiere_pintura,
-                       rm.requiere_mecanica,
-                       rm.requiere_motor,
-                       u.nombre AS usuario,
-                       l.nombre AS lugar,
-                       rg.usuario_id,
-                       rg.lugar_id
-                FROM reservas_generales rg
-                JOIN reservas_muelle rm ON rg.id = rm.reserva_id
-                JOIN usuarios u ON rg.usuario_id = u.id
-                LEFT JOIN lugares l ON rg.lugar_id = l.id
-                WHERE rg.tenant_id = :tenant_id 
-                  AND (:usuario_id IS NULL OR rg.usuario_id = :usuario_id)
-                ORDER BY rm.fecha_entrada DESC
-            """)
-            result = self.db.execute(query, {
-                "tenant_id": self.tenant_id,
-                "usuario_id": usuario_id # <-- Usamos el argumento
-            }).mappings()
+            result = self.db.execute(SQL_LISTAR_RESERVAS, parametros).mappings()
             
             reservas = [dict(row) for row in result]
             print(f"🔍 Filtrando por usuario_id: {usuario_id}. Reservas encontradas: {len(reservas)}")
@@ -142,125 +224,3 @@ class ReservaMuelle(ReservaBase):
         except Exception as e:
             print(f"❌ Error al listar reservas: {str(e)}")
             return {"error": str(e)}
-
-    def consultar_disponibilidad_por_dias(self, fecha_inicio, fecha_fin):
-        try:
-            query = text("""
-                WITH dias AS (
-                    SELECT generate_series(:fecha_inicio, :fecha_fin, interval '1 day')::date AS dia
-                ),
-                ocupacion AS (
-                    SELECT
-                        l.id AS lugar_id,
-                        l.nombre AS nombre,
-                        l.capacidad AS capacidad,
-                        d.dia,
-                        COUNT(DISTINCT rm.reserva_id) AS ocupadas
-                    FROM lugares l
-                    JOIN dias d ON TRUE
-                    LEFT JOIN reservas_generales rg ON l.id = rg.lugar_id
-                    LEFT JOIN reservas_muelle rm ON rg.id = rm.reserva_id
-                        AND d.dia BETWEEN rm.fecha_entrada AND rm.fecha_salida
-                    WHERE l.tenant_id = :tenant_id
-                    GROUP BY l.id, l.nombre, l.capacidad, d.dia
-                    ORDER BY l.id, d.dia
-                )
-                SELECT * FROM ocupacion
-            """)
-
-            rows = self.db.execute(query, {
-                "tenant_id": self.tenant_id,
-                "fecha_inicio": fecha_inicio,
-                "fecha_fin": fecha_fin
-            }).fetchall()
-
-            from datetime import datetime, timedelta
-
-            def calcular_tramos_con_cupos(disponibles_por_dia):
-                fechas = sorted(disponibles_por_dia.keys())
-                tramos = []
-                inicio = None
-                fin = None
-                min_cupos = None
-
-                for fecha_str in fechas:
-                    disponibles = disponibles_por_dia[fecha_str]
-                    fecha = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-
-                    if disponibles > 0:
-                        if inicio is None:
-                            inicio = fecha
-                            fin = fecha
-                            min_cupos = disponibles
-                        elif fecha == fin + timedelta(days=1):
-                            fin = fecha
-                            min_cupos = min(min_cupos, disponibles)
-                        else:
-                            tramos.append({
-                                "inicio": inicio.strftime("%Y-%m-%d"),
-                                "fin": fin.strftime("%Y-%m-%d"),
-                                "cupos": min_cupos
-                            })
-                            inicio = fecha
-                            fin = fecha
-                            min_cupos = disponibles
-                    else:
-                        if inicio is not None:
-                            tramos.append({
-                                "inicio": inicio.strftime("%Y-%m-%d"),
-                                "fin": fin.strftime("%Y-%m-%d"),
-                                "cupos": min_cupos
-                            })
-                            inicio = None
-                            fin = None
-                            min_cupos = None
-
-                if inicio is not None:
-                    tramos.append({
-                        "inicio": inicio.strftime("%Y-%m-%d"),
-                        "fin": fin.strftime("%Y-%m-%d"),
-                        "cupos": min_cupos
-                    })
-
-                # Detectar si hay días completamente libres después del último tramo
-                if fechas:
-                    ultima_fecha = datetime.strptime(fechas[-1], "%Y-%m-%d").date()
-                    if disponibilidad_total_desde(ultima_fecha + timedelta(days=1)):
-                        tramos.append({
-                            "inicio_abierta": (ultima_fecha + timedelta(days=1)).strftime("%Y-%m-%d")
-                        })
-
-                return tramos
-
-            def disponibilidad_total_desde(fecha):
-               # puedes mejorar esto según tu sistema (ej. revisar si hay reservas futuras)
-               return True  # Por ahora asumimos que desde el día siguiente no hay reservas
-            # Agrupar por lugar y aplicar lógica de tramos
-            disponibilidad = []
-            por_lugar = {}
-
-            for row in rows:
-                lugar_id = row.lugar_id
-                dia_str = row.dia.strftime("%Y-%m-%d")
-                disponibles = row.capacidad - row.ocupadas
-
-                if lugar_id not in por_lugar:
-                    por_lugar[lugar_id] = {
-                        "lugar_id": lugar_id,
-                        "nombre": row.nombre,
-                        "capacidad": row.capacidad,
-                        "disponibles_por_dia": {}
-                    }
-
-                por_lugar[lugar_id]["disponibles_por_dia"][dia_str] = disponibles
-
-            # En el ciclo final
-            for lugar in por_lugar.values():
-                lugar["tramos_disponibles"] = calcular_tramos_con_cupos(lugar["disponibles_por_dia"])
-                del lugar["disponibles_por_dia"]
-                disponibilidad.append(lugar)
-            
-            return disponibilidad
-
-        except Exception as e:
-            return {"error": str(e)}
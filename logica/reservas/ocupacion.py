@@ -0,0 +1,111 @@
+# logica/reservas/ocupacion.py
+#
+# Mantenimiento de la tabla ocupacion_diaria (lugar, día -> reservas).
+# Cada alta, edición o baja de una reserva llama a aplicar_ocupacion() dentro
+# de su propia transacción, antes del commit. Al desplegar, init_db rellena
+# los tenants que tienen reservas y ninguna fila aquí (rellenar_si_vacia).
+# Para rehacerla a mano:
+#
+#     python -m logica.reservas.ocupacion            # todos los tenants
+#     python -m logica.reservas.ocupacion --tenant 1
+
+import argparse
+from datetime import date
+
+from sqlalchemy import text
+
+# Suma (o resta) una reserva en cada día de [entrada, salida].
+# Las filas se procesan ordenadas por (lugar, día) para que dos transacciones
+# que tocan el mismo lugar no se bloqueen en orden cruzado.
+SQL_APLICAR_OCUPACION = text("""
+    INSERT INTO ocupacion_diaria (lugar_id, dia, tenant_id, ocupadas)
+    SELECT c.lugar_id, d.dia::date, :tenant_id, SUM(c.signo)
+    FROM unnest(
+        CAST(:lugares AS INTEGER[]),
+        CAST(:entradas AS DATE[]),
+        CAST(:salidas AS DATE[]),
+        CAST(:signos AS INTEGER[])
+    ) AS c(lugar_id, entrada, salida, signo)
+    CROSS JOIN LATERAL generate_series(c.entrada, c.salida, interval '1 day') AS d(dia)
+    GROUP BY c.lugar_id, d.dia::date
+    ORDER BY c.lugar_id, d.dia::date
+    ON CONFLICT (lugar_id, dia)
+    DO UPDATE SET ocupadas = ocupacion_diaria.ocupadas + EXCLUDED.ocupadas
+""")
+
+SQL_BORRAR_OCUPACION = text("""
+    DELETE FROM ocupacion_diaria
+    WHERE CAST(:tenant_id AS INTEGER) IS NULL OR tenant_id = :tenant_id
+""")
+
+SQL_RECONSTRUIR_OCUPACION = text("""
+    INSERT INTO ocupacion_diaria (lugar_id, dia, tenant_id, ocupadas)
+    SELECT rg.lugar_id, d.dia::date, rg.tenant_id, COUNT(*)
+    FROM reservas_generales rg
+    JOIN reservas_muelle rm ON rg.id = rm.reserva_id
+    CROSS JOIN LATERAL generate_series(rm.fecha_entrada, rm.fecha_salida, interval '1 day') AS d(dia)
+    WHERE CAST(:tenant_id AS INTEGER) IS NULL OR rg.tenant_id = :tenant_id
+    GROUP BY rg.lugar_id, d.dia::date, rg.tenant_id
+""")
+
+# Tenants con reservas de muelle y sin ninguna fila de ocupación: la tabla
+# no se ha rellenado nunca para ellos (toda reserva ocupa al menos un día)
+SQL_TENANTS_SIN_OCUPACION = text("""
+    SELECT DISTINCT rg.tenant_id
+    FROM reservas_generales rg
+    JOIN reservas_muelle rm ON rg.id = rm.reserva_id
+    WHERE NOT EXISTS (SELECT 1 FROM ocupacion_diaria o WHERE o.tenant_id = rg.tenant_id)
+    ORDER BY rg.tenant_id
+""")
+
+
+def _fecha(valor):
+    return valor if isinstance(valor, date) else date.fromisoformat(str(valor))
+
+
+def aplicar_ocupacion(db, tenant_id, cambios):
+    """
+    cambios: lista de (lugar_id, fecha_entrada, fecha_salida, signo), con
+    signo +1 al crear una reserva y -1 al quitarla. No hace commit: va en
+    la misma transacción que la escritura de la reserva.
+    """
+    cambios = [c for c in cambios if c[3]]
+    if not cambios:
+        return
+    db.execute(SQL_APLICAR_OCUPACION, {
+        "tenant_id": tenant_id,
+        "lugares": [int(c[0]) for c in cambios],
+        "entradas": [_fecha(c[1]) for c in cambios],
+        "salidas": [_fecha(c[2]) for c in cambios],
+        "signos": [c[3] for c in cambios],
+    })
+
+
+def reconstruir_ocupacion(db, tenant_id=None):
+    """Recalcula la tabla desde las reservas (backfill). Hace commit."""
+    db.execute(SQL_BORRAR_OCUPACION, {"tenant_id": tenant_id})
+    db.execute(SQL_RECONSTRUIR_OCUPACION, {"tenant_id": tenant_id})
+    db.commit()
+
+
+def rellenar_si_vacia(db):
+    """
+    Backfill al desplegar sobre una BD que ya tenía reservas: reconstruye
+    cada tenant que no tiene ninguna fila. Devuelve los tenants rellenados.
+    """
+    tenants = [row.tenant_id for row in db.execute(SQL_TENANTS_SIN_OCUPACION)]
+    for tenant_id in tenants:
+        reconstruir_ocupacion(db, tenant_id)
+    return tenants
+
+
+if __name__ == "__main__":
+    from config.bd import engine
+
+    parser = argparse.ArgumentParser(description="Reconstruye la tabla ocupacion_diaria")
+    parser.add_argument("--tenant", type=int, default=None, help="Solo este tenant (por defecto todos)")
+    args = parser.parse_args()
+
+    with engine.connect() as conexion:
+        reconstruir_ocupacion(conexion, args.tenant)
+    print("✅ Ocupación diaria reconstruida.")
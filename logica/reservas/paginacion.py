@@ -0,0 +1,86 @@
+# logica/reservas/paginacion.py
+#
+# Paginación por clave (keyset) y filtros de los listados de reservas
+# (/api/reservas y /api/admin/reservas).
+#
+# Las reservas salen de reservas_listado ordenadas por (fecha_entrada,
+# reserva_id) descendente, el orden de sus índices ix_reservas_listado_*
+# (ver FILTROS_LISTADO en muelle.py). Cada página trae
+# como mucho 'limite' filas; si viene llena, la respuesta lleva en la
+# cabecera X-Siguiente-Cursor la clave de su última fila y la siguiente
+# petición la manda como ?cursor=... para seguir justo después, sin OFFSET
+# (que obligaría a recorrer todas las filas de las páginas anteriores).
+#
+# El cuerpo sigue siendo la misma lista de reservas de siempre.
+
+import base64
+import os
+from datetime import datetime
+
+LISTADO_LIMITE_DEFECTO = int(os.getenv("LISTADO_LIMITE_DEFECTO", "100"))
+LISTADO_LIMITE_MAX = 1000
+CABECERA_CURSOR = "X-Siguiente-Cursor"
+
+
+def codificar_cursor(fecha_entrada, reserva_id):
+    clave = f"{fecha_entrada}|{reserva_id}".encode()
+    return base64.urlsafe_b64encode(clave).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor):
+    """(fecha_entrada, reserva_id) del cursor; ValueError si no es válido."""
+    try:
+        clave = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        fecha_entrada, reserva_id = clave.split("|")
+        return datetime.strptime(fecha_entrada, "%Y-%m-%d").date(), int(reserva_id)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Cursor inválido")
+
+
+def _fecha(valor):
+    return datetime.strptime(valor, "%Y-%m-%d").date() if valor else None
+
+
+def leer_filtros(args, admin=False, stream=False):
+    """
+    Filtros del listado desde los parámetros de la URL (request.args o
+    request.query_params):
+      ?limite=100&cursor=...&desde=YYYY-MM-DD&hasta=YYYY-MM-DD
+       &lugar_id=..&tipo_embarcacion=..[&usuario_id=.. solo admin]
+    desde/hasta dejan las estancias que pisan algún día de ese rango.
+    En streaming (ver logica/streaming.py) no hay límite por defecto ni
+    máximo: la memoria ya no depende de las filas.
+    Lanza ValueError con el mensaje para el 400.
+    """
+    try:
+        limite = args.get("limite")
+        limite = int(limite) if limite else (None if stream else LISTADO_LIMITE_DEFECTO)
+        lugar_id = args.get("lugar_id")
+        usuario_id = args.get("usuario_id") if admin else None
+        filtros = {
+            "limite": limite,
+            "desde": _fecha(args.get("desde")),
+            "hasta": _fecha(args.get("hasta")),
+            "lugar_id": int(lugar_id) if lugar_id else None,
+            "usuario_id": int(usuario_id) if usuario_id else None,
+            "tipo_embarcacion": args.get("tipo_embarcacion") or None,
+            "cursor_fecha": None,
+            "cursor_id": None,
+        }
+    except ValueError:
+        raise ValueError("Parámetros inválidos: 'limite', 'lugar_id' y 'usuario_id' son enteros "
+                         "y 'desde'/'hasta' son 'YYYY-MM-DD'")
+
+    if limite is not None and not (limite >= 1 and (stream or limite <= LISTADO_LIMITE_MAX)):
+        raise ValueError(f"'limite' debe estar entre 1 y {LISTADO_LIMITE_MAX}")
+    if args.get("cursor"):
+        filtros["cursor_fecha"], filtros["cursor_id"] = decodificar_cursor(args["cursor"])
+    return filtros
+
+
+def siguiente_cursor(reservas, filtros):
+    """Cursor de la página siguiente, o None si esta era la última."""
+    if not isinstance(reservas, list) or len(reservas) < filtros["limite"]:
+        return None
+    ultima = reservas[-1]
+    return codificar_cursor(ultima["fecha_entrada"], ultima["reserva_id"])
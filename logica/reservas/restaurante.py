@@ -1,4 +1,7 @@
 from .base import ReservaBase
+from .factory import registrar_handler
+
+@registrar_handler("restaurante")
 class ReservaRestaurante(ReservaBase):
     def crear_reserva(self, datos):
         # lógica para restaurantes
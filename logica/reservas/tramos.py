@@ -0,0 +1,154 @@
+# logica/reservas/tramos.py
+#
+# Tramos de disponibilidad a partir de la disponibilidad diaria de un lugar.
+#
+# La disponibilidad se guarda como un arreglo de enteros indexado por el
+# desplazamiento en días desde la fecha de inicio (posición 0 = inicio), así
+# no hay que formatear ni parsear una fecha por cada día y lugar: las fechas
+# en texto se generan una sola vez por rango consultado.
+#
+# Con NumPy los tramos se calculan de forma vectorizada (run-length + mínimo
+# por tramo); sin NumPy se usa un recorrido lineal equivalente.
+
+from array import array
+from datetime import timedelta
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # NumPy es opcional
+    np = None
+
+
+def arreglo_dias(n_dias, valor=0):
+    """Arreglo de n_dias enteros inicializado a 'valor'."""
+    if np is not None:
+        return np.full(n_dias, valor, dtype=np.int64)
+    return array("q", [valor]) * n_dias
+
+
+def asignar_por_desplazamiento(arreglo, desplazamientos, valores):
+    """arreglo[desplazamientos[i]] = valores[i]"""
+    if np is not None:
+        arreglo[np.asarray(desplazamientos, dtype=np.int64)] = valores
+        return
+    for desplazamiento, valor in zip(desplazamientos, valores):
+        arreglo[desplazamiento] = valor
+
+
+def restar_de(capacidad, ocupadas):
+    """Disponibles por día = capacidad - ocupadas."""
+    if np is not None:
+        return capacidad - ocupadas
+    return array("q", (capacidad - x for x in ocupadas))
+
+
+def ocupacion_por_barrido(n_dias, desde, hasta):
+    """
+    Ocupación diaria a partir de estancias [desde[i], hasta[i]) expresadas en
+    desplazamientos de día (ya recortadas al rango): arreglo de diferencias
+    (+1 al entrar, -1 al salir) y suma acumulada. O(R + D).
+    """
+    if np is not None:
+        diferencias = np.zeros(n_dias + 1, dtype=np.int64)
+        np.add.at(diferencias, np.asarray(desde, dtype=np.int64), 1)
+        np.add.at(diferencias, np.asarray(hasta, dtype=np.int64), -1)
+        return np.cumsum(diferencias[:-1])
+
+    diferencias = [0] * (n_dias + 1)
+    for d in desde:
+        diferencias[d] += 1
+    for h in hasta:
+        diferencias[h] -= 1
+    ocupadas = array("q", [0]) * n_dias
+    acumulado = 0
+    for i in range(n_dias):
+        acumulado += diferencias[i]
+        ocupadas[i] = acumulado
+    return ocupadas
+
+
+def _tramos_numpy(disponibles, minimo=1):
+    libre = np.asarray(disponibles) >= minimo
+    if not libre.any():
+        return [], [], []
+    bordes = np.diff(np.concatenate(([0], libre.astype(np.int8), [0])))
+    inicios = np.flatnonzero(bordes == 1)
+    fines = np.flatnonzero(bordes == -1)  # exclusivo
+    # Mínimo de cada tramo [inicio, fin): reduceat sobre pares (inicio, fin)
+    # con un centinela al final para que 'fin' nunca se salga del arreglo
+    con_centinela = np.append(np.asarray(disponibles), 0)
+    indices = np.empty(len(inicios) * 2, dtype=np.int64)
+    indices[0::2] = inicios
+    indices[1::2] = fines
+    minimos = np.minimum.reduceat(con_centinela, indices)[0::2]
+    return inicios.tolist(), (fines - 1).tolist(), minimos.tolist()
+
+
+def _tramos_python(disponibles, minimo=1):
+    inicios, fines, minimos = [], [], []
+    n = len(disponibles)
+    i = 0
+    while i < n:
+        if disponibles[i] >= minimo:
+            menor = disponibles[i]
+            j = i
+            while j + 1 < n and disponibles[j + 1] >= minimo:
+                j += 1
+                if disponibles[j] < menor:
+                    menor = disponibles[j]
+            inicios.append(i)
+            fines.append(j)
+            minimos.append(menor)
+            i = j + 1
+        else:
+            i += 1
+    return inicios, fines, minimos
+
+
+@lru_cache(maxsize=64)
+def etiquetas_dias(fecha_inicio, n_dias):
+    # 'YYYY-MM-DD' de cada desplazamiento; se calcula una vez por rango y se
+    # comparte entre todos los lugares de la misma consulta
+    return tuple((fecha_inicio + timedelta(days=n)).strftime("%Y-%m-%d") for n in range(n_dias + 1))
+
+
+def _tramos(disponibles, minimo=1):
+    if np is not None:
+        return _tramos_numpy(disponibles, minimo)
+    return _tramos_python(disponibles, minimo)
+
+
+def calcular_tramos_con_cupos(fecha_inicio, disponibles):
+    """
+    Devuelve los tramos consecutivos con cupo (> 0) y el cupo mínimo de cada
+    uno, más un tramo abierto desde el día siguiente al último consultado.
+    """
+    inicios, fines, minimos = _tramos(disponibles)
+
+    etiquetas = etiquetas_dias(fecha_inicio, len(disponibles))
+    tramos = [
+        {"inicio": etiquetas[inicio], "fin": etiquetas[fin], "cupos": int(minimo)}
+        for inicio, fin, minimo in zip(inicios, fines, minimos)
+    ]
+
+    # Desde el día siguiente al rango consultado asumimos que no hay reservas
+    if len(disponibles):
+        tramos.append({"inicio_abierta": etiquetas[len(disponibles)]})
+
+    return tramos
+
+
+def huecos(disponibles, duracion, minimo=1):
+    """
+    Tramos seguidos de al menos 'duracion' días con 'minimo' cupos o más:
+    lista de (inicio, fin, cupos) en desplazamientos de día, donde 'cupos'
+    es el mínimo de los primeros 'duracion' días (la estancia más temprana
+    que cabe en el tramo). Un recorrido O(D) por lugar.
+    """
+    inicios, fines, _ = _tramos(disponibles, minimo)
+    return [
+        (inicio, fin, int(min(disponibles[inicio:inicio + duracion])))
+        for inicio, fin in zip(inicios, fines)
+        if fin - inicio + 1 >= duracion
+    ]
@@ -0,0 +1,88 @@
+# logica/singleflight.py
+#
+# Agrupa llamadas idénticas y simultáneas: la primera petición con una clave
+# calcula el resultado y las que llegan mientras tanto esperan y reciben el
+# mismo resultado (o la misma excepción) en vez de repetir la consulta.
+# Solo agrupa dentro de un proceso.
+#
+# - SINGLEFLIGHT_TIMEOUT: segundos que una petición espera a la que calcula;
+#   si se pasa, recibe TimeoutError.
+
+import asyncio
+import os
+import threading
+
+SINGLEFLIGHT_TIMEOUT = float(os.getenv("SINGLEFLIGHT_TIMEOUT", "10"))
+
+
+class _Vuelo:
+    def __init__(self):
+        self.listo = threading.Event()
+        self.resultado = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self, timeout=SINGLEFLIGHT_TIMEOUT):
+        self.timeout = timeout
+        self._vuelos = {}  # clave -> _Vuelo en curso
+        self._candado = threading.Lock()
+        self.calculos = 0
+        self.compartidos = 0
+        self.timeouts = 0
+
+    def ejecutar(self, clave, funcion):
+        if _en_bucle_async():
+            # En modo ASGI los handlers corren en el hilo del event loop: esperar
+            # aquí bloquearía también a la petición que está calculando
+            return funcion()
+
+        with self._candado:
+            vuelo = self._vuelos.get(clave)
+            lider = vuelo is None
+            if lider:
+                vuelo = self._vuelos[clave] = _Vuelo()
+                self.calculos += 1
+
+        if not lider:
+            if not vuelo.listo.wait(self.timeout):
+                with self._candado:
+                    self.timeouts += 1
+                raise TimeoutError(f"Tiempo de espera agotado ({self.timeout}s) esperando el cálculo en curso")
+            with self._candado:
+                self.compartidos += 1
+            if vuelo.error is not None:
+                raise vuelo.error
+            return vuelo.resultado
+
+        try:
+            vuelo.resultado = funcion()
+            return vuelo.resultado
+        except BaseException as e:
+            vuelo.error = e
+            raise
+        finally:
+            # Se quita antes de avisar: quien llegue después calcula de nuevo
+            with self._candado:
+                del self._vuelos[clave]
+            vuelo.listo.set()
+
+    def estadisticas(self):
+        with self._candado:
+            return {
+                "en_curso": len(self._vuelos),
+                "calculos": self.calculos,
+                "compartidos": self.compartidos,
+                "timeouts": self.timeouts,
+            }
+
+
+def _en_bucle_async():
+    try:
+        asyncio.get_running_loop()
+        return True
+    except RuntimeError:
+        return False
+
+
+vuelos_disponibilidad = SingleFlight()
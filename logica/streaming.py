@@ -0,0 +1,93 @@
+# logica/streaming.py
+#
+# Respuestas en streaming para listados grandes (exportaciones). En vez de
+# cargar todas las filas en una lista y pasarla a jsonify (la lista y el
+# JSON enteros en memoria a la vez), la consulta se lee con un cursor del
+# servidor, STREAM_FILAS_POR_LOTE filas cada vez, y cada lote se escribe en
+# la respuesta en cuanto llega: la memoria por petición no depende de
+# cuántas filas tenga el tenant.
+#
+# Formatos (?stream=...):
+# - json:   el mismo arreglo JSON de siempre, enviado por trozos
+# - ndjson: una fila JSON por línea (application/x-ndjson)
+# Con Accept: application/x-ndjson no hace falta el parámetro.
+#
+# Si la consulta falla a mitad ya no se puede cambiar el 200: el arreglo
+# JSON queda sin cerrar (el cliente lo ve inválido) y en NDJSON la última
+# línea es {"error": ...}. El detalle sale en el log.
+#
+# Solo en el modo Flask: asgi.py sigue devolviendo páginas normales.
+
+import os
+import traceback
+from itertools import islice
+
+from flask import Response, stream_with_context
+
+from config.serializacion import a_json
+
+FORMATOS_STREAM = {"json": "application/json", "ndjson": "application/x-ndjson"}
+STREAM_FILAS_POR_LOTE = int(os.getenv("STREAM_FILAS_POR_LOTE", "1000"))
+
+
+def formato_stream(request):
+    """'json', 'ndjson' o None (respuesta normal). ValueError si no se conoce."""
+    formato = (request.args.get("stream") or "").strip().lower()
+    if not formato and FORMATOS_STREAM["ndjson"] in request.headers.get("Accept", ""):
+        formato = "ndjson"
+    if formato and formato not in FORMATOS_STREAM:
+        raise ValueError(f"Formato de stream no soportado: {formato} (usa {', '.join(FORMATOS_STREAM)})")
+    return formato or None
+
+
+def filas_por_lotes(db, consulta, parametros):
+    """
+    Ejecuta la consulta con un cursor del servidor y devuelve un iterador de
+    diccionarios que va pidiendo las filas por lotes. La consulta se lanza
+    ya (un error de SQL sale aquí, no a mitad de la respuesta).
+    """
+    resultado = db.execute(consulta, parametros, execution_options={
+        "stream_results": True,
+        "yield_per": STREAM_FILAS_POR_LOTE,
+    })
+    return (dict(fila) for fila in resultado.mappings())
+
+
+def _lotes(filas):
+    filas = iter(filas)
+    while lote := list(islice(filas, STREAM_FILAS_POR_LOTE)):
+        yield lote
+
+
+def _trozos(filas, formato):
+    # Un trozo por lote; cada fila se codifica igual que con jsonify
+    if formato == "ndjson":
+        for lote in _lotes(filas):
+            yield b"".join(a_json(fila) + b"\n" for fila in lote)
+        return
+
+    yield b"["
+    separador = b""
+    for lote in _lotes(filas):
+        yield separador + b",".join(a_json(fila) for fila in lote)
+        separador = b","
+    yield b"]"
+
+
+def respuesta_stream(db, filas, formato):
+    """
+    Response de Flask que escribe 'filas' (iterable de diccionarios) por
+    trozos. La transacción de db se confirma al terminar de escribir (la
+    conexión sigue siendo la de la petición y vuelve al pool después).
+    """
+    def generar():
+        try:
+            yield from _trozos(filas, formato)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            traceback.print_exc()
+            if formato == "ndjson":
+                yield a_json({"error": f"Listado interrumpido: {str(e)}"}) + b"\n"
+
+    return Response(stream_with_context(generar()), mimetype=FORMATOS_STREAM[formato])
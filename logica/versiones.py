@@ -0,0 +1,162 @@
+# logica/versiones.py
+#
+# Versión de los datos de cada tenant y cache de respuestas que depende de ella.
+#
+# Cada lugar tiene una columna 'version' que se incrementa, en la misma
+# transacción, con cualquier escritura que cambie su disponibilidad (crear,
+# editar o borrar una reserva, editar o desactivar el lugar). La versión del
+# tenant es SUM(version) + COUNT(*) de sus lugares: solo puede crecer, así que
+# si no cambió tampoco cambió nada de lo que se calculó con ella. Al estar en
+# la BD vale aunque haya varios procesos escribiendo.
+#
+# La misma fila sirve de candado de admisión: quien va a comprobar el cupo de
+# un lugar y reservar la bloquea antes (bloquear_lugares) y la suelta con el
+# commit. Las reservas de un mismo lugar se comprueban de una en una; las de
+# lugares distintos no se esperan entre sí.
+#
+# - CACHE_DISPONIBILIDAD_BYTES: memoria aproximada máxima de la cache (0 = desactivada)
+# - CACHE_DISPONIBILIDAD_MAX: número máximo de entradas
+
+import os
+import threading
+from collections import OrderedDict
+
+from sqlalchemy import text
+
+CACHE_DISPONIBILIDAD_BYTES = int(os.getenv("CACHE_DISPONIBILIDAD_BYTES", str(32 * 1024 * 1024)))
+CACHE_DISPONIBILIDAD_MAX = int(os.getenv("CACHE_DISPONIBILIDAD_MAX", "4096"))
+
+# Se bloquean en orden de id para que dos escrituras sobre los mismos
+# lugares no se esperen en orden cruzado
+SQL_INCREMENTAR_VERSION = text("""
+    UPDATE lugares SET version = version + 1
+    WHERE id IN (
+        SELECT id FROM lugares
+        WHERE id = ANY(CAST(:lugares AS INTEGER[])) AND tenant_id = :tenant_id
+        ORDER BY id
+        FOR UPDATE
+    )
+""")
+
+SQL_BLOQUEAR_LUGARES = text("""
+    SELECT id, capacidad FROM lugares
+    WHERE id = ANY(CAST(:lugares AS INTEGER[])) AND tenant_id = :tenant_id
+    ORDER BY id
+    FOR UPDATE
+""")
+
+SQL_VERSION_TENANT = text("""
+    SELECT COALESCE(SUM(version), 0) + COUNT(*) FROM lugares WHERE tenant_id = :tenant_id
+""")
+
+
+def incrementar_version(db, tenant_id, lugar_ids):
+    """Marca como cambiados los lugares. No hace commit: va con la escritura."""
+    lugares = sorted({int(lugar_id) for lugar_id in lugar_ids if lugar_id is not None})
+    if lugares:
+        db.execute(SQL_INCREMENTAR_VERSION, {"lugares": lugares, "tenant_id": tenant_id})
+
+
+def bloquear_lugares(db, tenant_id, lugar_ids):
+    """
+    Bloquea los lugares hasta el commit o rollback y devuelve {lugar_id: capacidad}
+    de los que existen y son del tenant. La capacidad se lee ya bloqueada, así
+    que es la vigente. Llamar antes de contar las reservas ocupadas.
+    """
+    lugares = sorted({int(lugar_id) for lugar_id in lugar_ids if lugar_id is not None})
+    if not lugares:
+        return {}
+    rows = db.execute(SQL_BLOQUEAR_LUGARES, {"lugares": lugares, "tenant_id": tenant_id})
+    return {row.id: row.capacidad for row in rows}
+
+
+def version_tenant(db, tenant_id):
+    return db.execute(SQL_VERSION_TENANT, {"tenant_id": tenant_id}).scalar()
+
+
+def _tamano(valor):
+    # Estimación barata del tamaño de una respuesta JSON (dicts, listas, textos, números)
+    if isinstance(valor, dict):
+        return 64 + sum(_tamano(k) + _tamano(v) for k, v in valor.items())
+    if isinstance(valor, (list, tuple)):
+        return 56 + sum(_tamano(v) for v in valor)
+    if isinstance(valor, str):
+        return 49 + len(valor)
+    return 28
+
+
+class CacheVersionada:
+    """
+    Cache LRU de respuestas. Cada entrada guarda la versión con la que se
+    calculó y solo se devuelve si la versión actual es la misma.
+    """
+
+    def __init__(self, max_bytes, max_entradas):
+        self.max_bytes = max_bytes
+        self.max_entradas = max_entradas
+        self._datos = OrderedDict()  # clave -> (version, valor, tamano)
+        self._bytes = 0
+        self._candado = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.obsoletas = 0
+        self.expulsiones = 0
+
+    @property
+    def activa(self):
+        return self.max_bytes > 0 and self.max_entradas > 0
+
+    def obtener(self, clave, version):
+        with self._candado:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            if entrada[0] != version:
+                # Calculada con datos viejos: ya no sirve
+                self._quitar(clave)
+                self.obsoletas += 1
+                self.fallos += 1
+                return None
+            self._datos.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave, version, valor):
+        tamano = _tamano(valor)
+        if tamano > self.max_bytes:
+            return
+        with self._candado:
+            if clave in self._datos:
+                self._quitar(clave)
+            self._datos[clave] = (version, valor, tamano)
+            self._bytes += tamano
+            while self._datos and (self._bytes > self.max_bytes or len(self._datos) > self.max_entradas):
+                self._quitar(next(iter(self._datos)))
+                self.expulsiones += 1
+
+    def _quitar(self, clave):
+        _, _, tamano = self._datos.pop(clave)
+        self._bytes -= tamano
+
+    def invalidar_todo(self):
+        with self._candado:
+            self._datos.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        with self._candado:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._datos),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "obsoletas": self.obsoletas,
+                "expulsiones": self.expulsiones,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else None,
+            }
+
+
+cache_disponibilidad = CacheVersionada(CACHE_DISPONIBILIDAD_BYTES, CACHE_DISPONIBILIDAD_MAX)
@@ -18,6 +18,8 @@ from modelos.negocio_model import Negocio
 from modelos.lugar_model import Lugar
 from modelos.reserva_general_model import ReservaGeneral
 from modelos.reserva_muelle import ReservaMuelle
+from modelos.ocupacion_diaria_model import OcupacionDiaria
+from modelos.reserva_listado_model import ReservaListado
 
 # El resto de tu código sigue igual
 DATABASE_URL = os.getenv(
@@ -1,6 +1,6 @@
 # En modelos/lugar_model.py
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey
 from config.bd import Base
 
 class Lugar(Base):
@@ -13,4 +13,7 @@ class Lugar(Base):
     tipo = Column(String(50), nullable=True) # ej: 'muelle', 'estetica'
     
     # Clave foránea para vincularlo al negocio (tenant)
-    tenant_id = Column(Integer, ForeignKey("negocios.id"), nullable=False)
\ No newline at end of file
+    tenant_id = Column(Integer, ForeignKey("negocios.id"), nullable=False)
+
+    # Sube con cada escritura que cambia su disponibilidad (logica/versiones.py)
+    version = Column(BigInteger, nullable=False, default=0, server_default="0")
\ No newline at end of file
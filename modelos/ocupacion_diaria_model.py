@@ -0,0 +1,14 @@
+from sqlalchemy import Column, Integer, ForeignKey, Date
+from config.bd import Base
+
+class OcupacionDiaria(Base):
+    __tablename__ = "ocupacion_diaria"
+
+    # Cuántas reservas ocupan un lugar cada día. Se mantiene en la misma
+    # transacción que las reservas (logica/reservas/ocupacion.py) para que
+    # la disponibilidad sea un simple recorrido por rango.
+    lugar_id = Column(Integer, ForeignKey("lugares.id"), primary_key=True)
+    dia = Column(Date, primary_key=True)
+
+    tenant_id = Column(Integer, ForeignKey("negocios.id"), nullable=False)
+    ocupadas = Column(Integer, nullable=False, default=0)
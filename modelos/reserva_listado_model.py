@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Date, Boolean
+from config.bd import Base
+
+class ReservaListado(Base):
+    __tablename__ = "reservas_listado"
+
+    # Modelo de lectura de los listados: una fila por reserva de muelle con
+    # los datos de reservas_generales y reservas_muelle y los nombres del
+    # usuario y del lugar ya puestos. Lo mantienen disparadores de la BD
+    # (init_db.FUNCIONES) y se puede rehacer con logica/reservas/listado.py.
+    # Sin claves foráneas: es una copia derivada, no la fuente.
+    reserva_id = Column(Integer, primary_key=True)
+    tenant_id = Column(Integer, nullable=False)
+    usuario_id = Column(Integer, nullable=False)
+    lugar_id = Column(Integer, nullable=False)
+    fecha = Column(Date, nullable=False)
+
+    fecha_entrada = Column(Date, nullable=False)
+    fecha_salida = Column(Date, nullable=False)
+    tipo_embarcacion = Column(String(100), nullable=False)
+    requiere_pintura = Column(Boolean, nullable=False, default=False)
+    requiere_mecanica = Column(Boolean, nullable=False, default=False)
+    requiere_motor = Column(Boolean, nullable=False, default=False)
+
+    usuario = Column(String(100), nullable=False)
+    lugar = Column(String(100), nullable=True)
@@ -0,0 +1,181 @@
+# test/test_indice_ocupacion.py
+#
+# Índice de ocupación en memoria (logica/reservas/indice_ocupacion.py):
+# - ArbolOcupacion: suma y máximo en rango contra una lista día a día
+# - IndiceOcupacion: calentar, aplicar y consultar con una BD de mentira
+#   que devuelve las filas de cada consulta; desplazar, que lo vuelve a
+#   calentar cuando cambia el día; y confirmar_ocupacion, que deshace el
+#   cambio si el commit falla
+# No necesita base de datos.
+#
+#   python -m pytest test/test_indice_ocupacion.py
+
+import random
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from logica.reservas import indice_ocupacion as modulo
+from logica.reservas.indice_ocupacion import (
+    ArbolOcupacion, IndiceOcupacion, SQL_BLOQUEAR_LUGARES_INDICE, SQL_LUGARES_INDICE, SQL_OCUPACION_INDICE,
+    SQL_TENANTS_INDICE,
+)
+
+ORIGEN = date(2025, 1, 1)
+DIAS = 30
+
+
+class BDFalsa:
+    """Devuelve filas fijas para cada consulta del índice y cuenta los commits; el commit puede fallar."""
+
+    def __init__(self, lugares, ocupacion, tenants, falla_commit=False, bloqueados=()):
+        self.filas = {
+            SQL_BLOQUEAR_LUGARES_INDICE: [SimpleNamespace(id=l) for l in bloqueados],
+            SQL_LUGARES_INDICE: [SimpleNamespace(id=l, tenant_id=t) for l, t in lugares],
+            SQL_OCUPACION_INDICE: [SimpleNamespace(lugar_id=l, desplazamiento=d, ocupadas=o) for l, d, o in ocupacion],
+            SQL_TENANTS_INDICE: [SimpleNamespace(id=t) for t in tenants],
+        }
+        self.falla_commit = falla_commit
+        self.consultas = []
+        self.commits = 0
+
+    def execute(self, consulta, parametros):
+        self.consultas.append((consulta, parametros))
+        return iter(self.filas[consulta])
+
+    def commit(self):
+        if self.falla_commit:
+            raise RuntimeError("commit fallido")
+        self.commits += 1
+
+    def rollback(self):
+        pass
+
+
+def _dia(n):
+    return ORIGEN + timedelta(days=n)
+
+
+def _indice():
+    indice = IndiceOcupacion(DIAS)
+    # Tenant 1: lugar 10 con 2 reservas los días 3..5 y 1 el día 6; lugar 11 vacío.
+    # Tenant 2 sin lugares
+    indice.calentar(BDFalsa(
+        lugares=[(10, 1), (11, 1)],
+        ocupacion=[(10, 3, 2), (10, 4, 2), (10, 5, 2), (10, 6, 1)],
+        tenants=[1, 2],
+    ), origen=ORIGEN)
+    return indice
+
+
+def test_arbol_como_lista():
+    generador = random.Random(5)
+    for n in (1, 2, 7, 64, 100):
+        valores = [generador.randint(0, 5) for _ in range(n)]
+        arbol = ArbolOcupacion(list(valores))
+        for _ in range(300):
+            a = generador.randrange(n)
+            b = generador.randrange(a, n)
+            if generador.random() < 0.5:
+                valor = generador.choice([-1, 1, 2])
+                arbol.sumar(a, b, valor)
+                for i in range(a, b + 1):
+                    valores[i] += valor
+            else:
+                assert arbol.maximo_en(a, b) == max(valores[a:b + 1])
+        assert [arbol.maximo_en(i, i) for i in range(n)] == valores
+
+
+def test_calentar_y_consultar():
+    indice = _indice()
+
+    assert indice.maximo_ocupadas(1, 10, _dia(0), _dia(2)) == 0
+    assert indice.maximo_ocupadas(1, 10, _dia(0), _dia(3)) == 2
+    assert indice.maximo_ocupadas(1, 10, _dia(6), _dia(9)) == 1
+    assert indice.maximo_ocupadas(1, 11, _dia(0), _dia(DIAS - 1)) == 0
+    # Acepta fechas en texto, como llegan en el JSON
+    assert indice.maximo_ocupadas(1, "10", _dia(4).isoformat(), _dia(4).isoformat()) == 2
+
+
+@pytest.mark.parametrize("tenant_id, lugar_id, desde, hasta", [
+    (3, 10, 0, 1),             # tenant sin calentar
+    (1, 99, 0, 1),             # lugar desconocido
+    (2, 10, 0, 1),             # lugar de otro tenant
+    (1, 10, -1, 2),            # empieza antes del origen
+    (1, 10, DIAS - 2, DIAS),   # acaba después del horizonte
+])
+def test_sin_respuesta_fuera_de_lo_que_sabe(tenant_id, lugar_id, desde, hasta):
+    assert _indice().maximo_ocupadas(tenant_id, lugar_id, _dia(desde), _dia(hasta)) is None
+
+
+def test_aplicar_suma_y_resta():
+    indice = _indice()
+    indice.aplicar(1, [(10, _dia(5), _dia(8), +1), (11, _dia(0), _dia(1), +1)])
+
+    assert indice.maximo_ocupadas(1, 10, _dia(5), _dia(5)) == 3
+    assert indice.maximo_ocupadas(1, 10, _dia(7), _dia(8)) == 1
+    assert indice.maximo_ocupadas(1, 11, _dia(0), _dia(DIAS - 1)) == 1
+
+    indice.aplicar(1, [(10, _dia(5), _dia(8), -1)])
+    assert indice.maximo_ocupadas(1, 10, _dia(5), _dia(5)) == 2
+    assert indice.maximo_ocupadas(1, 10, _dia(7), _dia(8)) == 0
+
+
+def test_aplicar_recorta_al_horizonte():
+    indice = _indice()
+    indice.aplicar(1, [(11, _dia(-5), _dia(DIAS + 5), +1)])
+
+    assert indice.maximo_ocupadas(1, 11, _dia(0), _dia(DIAS - 1)) == 1
+
+
+def test_registrar_lugar_nuevo():
+    indice = _indice()
+    indice.registrar_lugar(2, 20)
+
+    assert indice.maximo_ocupadas(2, 20, _dia(0), _dia(DIAS - 1)) == 0
+    # Un tenant sin calentar sigue sin respuesta
+    indice.registrar_lugar(3, 30)
+    assert indice.maximo_ocupadas(3, 30, _dia(0), _dia(1)) is None
+
+
+def test_confirmar_ocupacion_deshace_si_falla_el_commit(monkeypatch):
+    indice = _indice()
+    monkeypatch.setattr(modulo, "INDICE_OCUPACION", True)
+    monkeypatch.setattr(modulo, "indice_ocupacion", indice)
+    cambios = [(10, _dia(0), _dia(1), +1)]
+
+    with pytest.raises(RuntimeError):
+        modulo.confirmar_ocupacion(BDFalsa([], [], [], falla_commit=True), 1, cambios)
+    assert indice.maximo_ocupadas(1, 10, _dia(0), _dia(1)) == 0
+
+    modulo.confirmar_ocupacion(BDFalsa([], [], []), 1, cambios)
+    assert indice.maximo_ocupadas(1, 10, _dia(0), _dia(1)) == 1
+
+
+def test_desplazar_al_cambiar_el_dia():
+    indice = _indice()
+    hoy = _dia(5)
+    # Lo que hay en ocupacion_diaria contado desde hoy (los días 5 y 6 de antes
+    # y una reserva el último día del horizonte nuevo, que antes no se veía)
+    bd = BDFalsa(
+        lugares=[(10, 1), (11, 1), (12, 1)],
+        ocupacion=[(10, 0, 2), (10, 1, 1), (11, DIAS - 1, 1), (12, 0, 1)],
+        tenants=[1, 2],
+        bloqueados=[10, 11],
+    )
+
+    assert indice.desplazar(bd, hoy=hoy) == [1, 2]
+    assert bd.commits == 2
+    assert indice.maximo_ocupadas(1, 10, _dia(5), _dia(5)) == 2
+    assert indice.maximo_ocupadas(1, 10, _dia(7), _dia(9)) == 0
+    assert indice.maximo_ocupadas(1, 11, _dia(5), _dia(5 + DIAS - 1)) == 1
+    # Los días anteriores a hoy ya no están
+    assert indice.maximo_ocupadas(1, 10, _dia(4), _dia(5)) is None
+    # Lugar creado sin bloquear: se consulta en la BD
+    assert indice.maximo_ocupadas(1, 12, _dia(5), _dia(5)) is None
+    bloqueos = [parametros for consulta, parametros in bd.consultas if consulta is SQL_BLOQUEAR_LUGARES_INDICE]
+    assert bloqueos == [{"tenant_id": 1}, {"tenant_id": 2}]
+
+    # Mismo día: no hace nada
+    assert indice.desplazar(bd, hoy=hoy) == []
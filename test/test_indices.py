@@ -0,0 +1,194 @@
+# test/test_indices.py
+#
+# Regresión de índices: siembra varios tenants, aplica el paquete de índices
+# de init_db y comprueba con EXPLAIN que ninguna consulta caliente recorre
+# entera (Seq Scan) una de las tablas grandes.
+#
+# Necesita Postgres (usa DATABASE_URL); sin BD el test se salta.
+#
+#   DATABASE_URL=postgresql://... python -m pytest test/test_indices.py
+
+import pytest
+from datetime import date, timedelta
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from config.bd import engine, Base
+from init_db import crear_indices, crear_funciones
+from modelos.negocio_model import Negocio
+from modelos.usuario_model import Usuario, Rol
+from modelos.lugar_model import Lugar
+from modelos.reserva_general_model import ReservaGeneral
+from modelos.reserva_muelle import ReservaMuelle
+from modelos.ocupacion_diaria_model import OcupacionDiaria
+from modelos.reserva_listado_model import ReservaListado
+from logica.registro import SQL_CAPACIDAD_LUGAR
+from logica.reservas.muelle import SQL_OCUPACION_MAXIMA, SQL_LISTAR_RESERVAS, SQL_ESTANCIAS_EN_RANGO
+from logica.reservas.disponibilidad import SQL_OCUPACION_DIARIA_RANGO, consulta_barrido
+from logica.reservas.ocupacion import reconstruir_ocupacion
+from logica.reservas.paginacion import leer_filtros
+from logica.admin.muelle_admin import SQL_LISTAR_RESERVAS_ADMIN
+
+TENANTS = [9101, 9102, 9103, 9104]
+LUGARES_POR_TENANT = 50
+USUARIOS_POR_TENANT = 200
+RESERVAS_POR_TENANT = 5000
+# Tenants de relleno con muchos usuarios y muchas reservas, como en una BD
+# con muchos negocios (si no, cada tenant de prueba es un cuarto de la tabla
+# y recorrerla entera sí sería lo correcto)
+TENANT_RELLENO = 9100
+USUARIOS_RELLENO = 20000
+TENANT_RELLENO_RESERVAS = 9099
+RESERVAS_RELLENO = 60000
+
+# 'lugares' no está: son unas pocas páginas y ahí un Seq Scan es lo correcto
+TABLAS_GRANDES = {"reservas_generales", "reservas_muelle", "ocupacion_diaria", "reservas_listado", "usuarios"}
+
+SQL_USUARIOS_TENANT = text("SELECT id, nombre, correo FROM usuarios WHERE tenant_id = :tenant_id AND rol_id = 1")
+
+
+def _sembrar_usuarios(conexion, tenant_id, n_usuarios):
+    conexion.execute(text("""
+        INSERT INTO negocios (id, nombre, tipo) VALUES (:t, 'Test índices', 'muelle')
+        ON CONFLICT (id) DO NOTHING
+    """), {"t": tenant_id})
+    conexion.execute(text("""
+        INSERT INTO usuarios (nombre, correo, clave, rol_id, tenant_id)
+        SELECT 'Usuario ' || n, 'indices-' || :t || '-' || n || '@example.com', 'x', 1, :t
+        FROM generate_series(1, :n) AS n
+    """), {"t": tenant_id, "n": n_usuarios})
+
+
+def _sembrar(conexion, tenant_id, n_usuarios=USUARIOS_POR_TENANT, n_reservas=RESERVAS_POR_TENANT):
+    _sembrar_usuarios(conexion, tenant_id, n_usuarios)
+    conexion.execute(text("""
+        INSERT INTO lugares (nombre, capacidad, zona, tipo, tenant_id)
+        SELECT 'Lugar ' || n, 20, 'Zona ' || (n % 4), 'muelle', :t
+        FROM generate_series(1, :n) AS n
+    """), {"t": tenant_id, "n": LUGARES_POR_TENANT})
+    conexion.execute(text("""
+        WITH ids AS (
+            SELECT (SELECT array_agg(id) FROM lugares WHERE tenant_id = :t) AS lugares,
+                   (SELECT array_agg(id) FROM usuarios WHERE tenant_id = :t) AS usuarios
+        ),
+        nuevas AS (
+            INSERT INTO reservas_generales (usuario_id, lugar_id, tenant_id, fecha)
+            SELECT ids.usuarios[1 + floor(random() * array_length(ids.usuarios, 1))::int],
+                   ids.lugares[1 + floor(random() * array_length(ids.lugares, 1))::int],
+                   :t, CURRENT_DATE
+            FROM ids, generate_series(1, :n)
+            RETURNING id
+        )
+        INSERT INTO reservas_muelle (reserva_id, fecha_entrada, fecha_salida, tipo_embarcacion,
+                                     requiere_pintura, requiere_mecanica, requiere_motor)
+        SELECT id, entrada, entrada + floor(random() * 15)::int, 'Yate', FALSE, FALSE, FALSE
+        FROM (SELECT id, CURRENT_DATE + floor(random() * 730)::int AS entrada FROM nuevas) x
+    """), {"t": tenant_id, "n": n_reservas})
+
+
+def _borrar(conexion, tenant_id):
+    for sql in (
+        "DELETE FROM ocupacion_diaria WHERE tenant_id = :t",
+        "DELETE FROM reservas_muelle WHERE reserva_id IN (SELECT id FROM reservas_generales WHERE tenant_id = :t)",
+        "DELETE FROM reservas_generales WHERE tenant_id = :t",
+        "DELETE FROM lugares WHERE tenant_id = :t",
+        "DELETE FROM usuarios WHERE tenant_id = :t",
+        "DELETE FROM negocios WHERE id = :t",
+    ):
+        conexion.execute(text(sql), {"t": tenant_id})
+
+
+@pytest.fixture(scope="module")
+def conexion():
+    try:
+        conexion = engine.connect()
+    except OperationalError:
+        pytest.skip("No hay base de datos disponible (DATABASE_URL)")
+
+    Base.metadata.create_all(bind=engine)
+    crear_indices(conexion)
+    # Los disparadores rellenan reservas_listado al sembrar (y la vacían al borrar)
+    crear_funciones(conexion)
+    _borrar(conexion, TENANT_RELLENO)
+    _sembrar_usuarios(conexion, TENANT_RELLENO, USUARIOS_RELLENO)
+    _borrar(conexion, TENANT_RELLENO_RESERVAS)
+    _sembrar(conexion, TENANT_RELLENO_RESERVAS, n_reservas=RESERVAS_RELLENO)
+    for tenant_id in TENANTS:
+        _borrar(conexion, tenant_id)
+        _sembrar(conexion, tenant_id)
+    conexion.commit()
+    for tenant_id in TENANTS:
+        reconstruir_ocupacion(conexion, tenant_id)
+    # VACUUM y no solo ANALYZE: los benchmarks siembran y borran cientos de
+    # miles de filas y las páginas muertas también cuentan para el plan
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as mantenimiento:
+        for tabla in TABLAS_GRANDES | {"lugares"}:
+            mantenimiento.execute(text(f"VACUUM ANALYZE {tabla}"))
+
+    yield conexion
+
+    conexion.rollback()
+    # Los usuarios de relleno al final: con las reservas ya borradas cada
+    # comprobación de la FK de reservas_generales.usuario_id es barata
+    for tenant_id in TENANTS + [TENANT_RELLENO_RESERVAS, TENANT_RELLENO]:
+        _borrar(conexion, tenant_id)
+    conexion.commit()
+    conexion.close()
+
+
+def _nodos(plan):
+    yield plan
+    for hijo in plan.get("Plans", []):
+        yield from _nodos(hijo)
+
+
+def _scans_secuenciales(conexion, consulta, parametros):
+    plan = conexion.execute(text("EXPLAIN (FORMAT JSON) " + consulta.text), parametros).scalar()
+    conexion.rollback()
+    return sorted({
+        nodo["Relation Name"]
+        for nodo in _nodos(plan[0]["Plan"])
+        if nodo["Node Type"] == "Seq Scan" and nodo.get("Relation Name") in TABLAS_GRANDES
+    })
+
+
+def _un_lugar_y_usuario(conexion, tenant_id):
+    lugar_id = conexion.execute(text("SELECT MIN(id) FROM lugares WHERE tenant_id = :t"), {"t": tenant_id}).scalar()
+    usuario_id = conexion.execute(text("SELECT MIN(id) FROM usuarios WHERE tenant_id = :t"), {"t": tenant_id}).scalar()
+    conexion.rollback()
+    return lugar_id, usuario_id
+
+
+HOY = date.today()
+PAGINA = leer_filtros({}, admin=True)
+
+CONSULTAS = {
+    "capacidad_lugar": (SQL_CAPACIDAD_LUGAR, lambda l, u: {"lugar_id": l}),
+    "ocupacion_maxima": (SQL_OCUPACION_MAXIMA, lambda l, u: {
+        "lugar_id": l, "fecha_entrada": HOY, "fecha_salida": HOY + timedelta(days=7), "excluir": None}),
+    "listar_reservas_usuario": (SQL_LISTAR_RESERVAS, lambda l, u: {**PAGINA, "usuario_id": u}),
+    "listar_admin": (SQL_LISTAR_RESERVAS_ADMIN, lambda l, u: PAGINA),
+    "listar_admin_lugar_fechas": (SQL_LISTAR_RESERVAS_ADMIN, lambda l, u: {
+        **PAGINA, "lugar_id": l, "desde": HOY, "hasta": HOY + timedelta(days=30)}),
+    "listar_admin_desde": (SQL_LISTAR_RESERVAS_ADMIN, lambda l, u: {
+        **PAGINA, "desde": HOY + timedelta(days=740)}),
+    "listar_admin_tipo_cursor": (SQL_LISTAR_RESERVAS_ADMIN, lambda l, u: {
+        **PAGINA, "tipo_embarcacion": "Yate", "cursor_fecha": HOY + timedelta(days=365), "cursor_id": 1}),
+    "estancias_en_rango": (SQL_ESTANCIAS_EN_RANGO, lambda l, u: {
+        "fecha_inicio": HOY, "fecha_fin": HOY + timedelta(days=30)}),
+    "ocupacion_diaria_rango": (SQL_OCUPACION_DIARIA_RANGO, lambda l, u: {
+        "fecha_inicio": HOY, "fecha_fin": HOY + timedelta(days=30), "lugares": None}),
+    "barrido": (consulta_barrido(SQL_ESTANCIAS_EN_RANGO), lambda l, u: {
+        "fecha_inicio": HOY, "fecha_fin": HOY + timedelta(days=30), "lugares": [l]}),
+    "usuarios_tenant": (SQL_USUARIOS_TENANT, lambda l, u: {}),
+}
+
+
+@pytest.mark.parametrize("nombre", sorted(CONSULTAS))
+def test_consulta_caliente_sin_seq_scan(conexion, nombre):
+    consulta, parametros = CONSULTAS[nombre]
+    tenant_id = TENANTS[0]
+    lugar_id, usuario_id = _un_lugar_y_usuario(conexion, tenant_id)
+    valores = {"tenant_id": tenant_id, **parametros(lugar_id, usuario_id)}
+
+    assert _scans_secuenciales(conexion, consulta, valores) == []
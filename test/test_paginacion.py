@@ -0,0 +1,131 @@
+# test/test_paginacion.py
+#
+# Cursor de la paginación por clave y lectura de filtros de los listados
+# (logica/reservas/paginacion.py): ida y vuelta del cursor, cursores
+# inválidos, límites por defecto y máximos, y valores mal formados -> ValueError.
+# No necesita base de datos.
+#
+#   python -m pytest test/test_paginacion.py
+
+import base64
+from datetime import date
+
+import pytest
+
+from logica.reservas.paginacion import (
+    LISTADO_LIMITE_DEFECTO, LISTADO_LIMITE_MAX, codificar_cursor, decodificar_cursor, leer_filtros,
+    siguiente_cursor,
+)
+
+
+def _b64(texto):
+    return base64.urlsafe_b64encode(texto.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("fecha_entrada, reserva_id", [
+    (date(2025, 1, 1), 1),
+    (date(2024, 2, 29), 123456789),
+    ("2030-12-31", 7),  # como sale del JSON del listado
+])
+def test_cursor_ida_y_vuelta(fecha_entrada, reserva_id):
+    cursor = codificar_cursor(fecha_entrada, reserva_id)
+
+    assert "=" not in cursor
+    esperada = fecha_entrada if isinstance(fecha_entrada, date) else date.fromisoformat(fecha_entrada)
+    assert decodificar_cursor(cursor) == (esperada, reserva_id)
+
+
+@pytest.mark.parametrize("cursor", [
+    "no es base64!",
+    _b64("2025-01-01"),             # sin id
+    _b64("2025-01-01|1|2"),         # de más
+    _b64("2025-13-01|1"),           # fecha imposible
+    _b64("01/01/2025|1"),           # otro formato
+    _b64("2025-01-01|uno"),         # id no entero
+    base64.urlsafe_b64encode(b"\xff\xfe|1").decode(),  # no es UTF-8
+])
+def test_cursor_invalido(cursor):
+    with pytest.raises(ValueError, match="Cursor inválido"):
+        decodificar_cursor(cursor)
+
+
+def test_filtros_por_defecto():
+    assert leer_filtros({}) == {
+        "limite": LISTADO_LIMITE_DEFECTO,
+        "desde": None,
+        "hasta": None,
+        "lugar_id": None,
+        "usuario_id": None,
+        "tipo_embarcacion": None,
+        "cursor_fecha": None,
+        "cursor_id": None,
+    }
+
+
+def test_filtros_completos():
+    filtros = leer_filtros({
+        "limite": "50",
+        "desde": "2025-01-01",
+        "hasta": "2025-02-01",
+        "lugar_id": "3",
+        "usuario_id": "9",
+        "tipo_embarcacion": "velero",
+        "cursor": codificar_cursor(date(2025, 1, 15), 42),
+    }, admin=True)
+
+    assert filtros == {
+        "limite": 50,
+        "desde": date(2025, 1, 1),
+        "hasta": date(2025, 2, 1),
+        "lugar_id": 3,
+        "usuario_id": 9,
+        "tipo_embarcacion": "velero",
+        "cursor_fecha": date(2025, 1, 15),
+        "cursor_id": 42,
+    }
+
+
+def test_usuario_id_solo_para_admin():
+    assert leer_filtros({"usuario_id": "9"})["usuario_id"] is None
+    # Ni siquiera se valida si no es admin
+    assert leer_filtros({"usuario_id": "x"})["usuario_id"] is None
+
+
+@pytest.mark.parametrize("limite", ["0", "-1", str(LISTADO_LIMITE_MAX + 1)])
+def test_limite_fuera_de_rango(limite):
+    with pytest.raises(ValueError, match="'limite' debe estar entre"):
+        leer_filtros({"limite": limite})
+
+
+def test_limite_en_streaming():
+    assert leer_filtros({}, stream=True)["limite"] is None
+    assert leer_filtros({"limite": str(LISTADO_LIMITE_MAX * 10)}, stream=True)["limite"] == LISTADO_LIMITE_MAX * 10
+    with pytest.raises(ValueError):
+        leer_filtros({"limite": "0"}, stream=True)
+
+
+@pytest.mark.parametrize("args", [
+    {"limite": "diez"},
+    {"lugar_id": "1.5"},
+    {"desde": "2025-02-30"},
+    {"hasta": "01/02/2025"},
+    {"usuario_id": "x"},
+    {"cursor": "no es base64!"},
+])
+def test_valores_mal_formados(args):
+    with pytest.raises(ValueError):
+        leer_filtros(args, admin=True)
+
+
+def test_siguiente_cursor():
+    filtros = {"limite": 2}
+    pagina = [
+        {"fecha_entrada": "2025-03-02", "reserva_id": 8},
+        {"fecha_entrada": "2025-03-01", "reserva_id": 5},
+    ]
+
+    assert decodificar_cursor(siguiente_cursor(pagina, filtros)) == (date(2025, 3, 1), 5)
+    # Página incompleta: era la última
+    assert siguiente_cursor(pagina[:1], filtros) is None
+    # Respuesta de error, no una lista de reservas
+    assert siguiente_cursor({"error": "x"}, filtros) is None
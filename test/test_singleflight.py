@@ -0,0 +1,160 @@
+# test/test_singleflight.py
+#
+# Agrupación de cálculos simultáneos (logica/singleflight.py): un solo
+# cálculo por clave, el resultado o la excepción llegan a todos los que
+# esperaban, TimeoutError si la espera se pasa y la clave se suelta al acabar.
+# No necesita base de datos.
+#
+#   python -m pytest test/test_singleflight.py
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from logica.singleflight import SingleFlight
+
+ESPERANDO = 4
+
+
+class _EventoContado(threading.Event):
+    """Event que avisa cuando hay n hilos esperando en él."""
+
+    def __init__(self, n):
+        super().__init__()
+        self.n = n
+        self.esperando = 0
+        self.todos = threading.Event()
+        self._candado = threading.Lock()
+
+    def wait(self, timeout=None):
+        with self._candado:
+            self.esperando += 1
+            if self.esperando >= self.n:
+                self.todos.set()
+        return super().wait(timeout)
+
+
+def _en_vuelo(vuelos, clave, resultado=None, error=None):
+    """
+    Lanza un líder bloqueado en el cálculo y ESPERANDO hilos más con la misma
+    clave; vuelve cuando todos están esperando.
+    Devuelve (hilos, salidas, soltar, llamadas).
+    """
+    soltar = threading.Event()
+    empezado = threading.Event()
+    llamadas = []
+    salidas = []
+
+    def funcion():
+        llamadas.append(1)
+        empezado.set()
+        soltar.wait(5)
+        if error is not None:
+            raise error
+        return resultado
+
+    def pedir():
+        try:
+            salidas.append(vuelos.ejecutar(clave, funcion))
+        except BaseException as e:
+            salidas.append(e)
+
+    lider = threading.Thread(target=pedir)
+    lider.start()
+    assert empezado.wait(5)
+    evento = _EventoContado(ESPERANDO)
+    vuelos._vuelos[clave].listo = evento
+
+    hilos = [threading.Thread(target=pedir) for _ in range(ESPERANDO)]
+    for hilo in hilos:
+        hilo.start()
+    assert evento.todos.wait(5)
+    return [lider] + hilos, salidas, soltar, llamadas
+
+
+def _terminar(hilos):
+    for hilo in hilos:
+        hilo.join(5)
+        assert not hilo.is_alive()
+
+
+def test_un_solo_calculo_para_todos():
+    vuelos = SingleFlight(timeout=5)
+    resultado = {"tramos": []}
+    hilos, salidas, soltar, llamadas = _en_vuelo(vuelos, "k", resultado=resultado)
+    soltar.set()
+    _terminar(hilos)
+
+    assert len(llamadas) == 1
+    assert len(salidas) == ESPERANDO + 1
+    assert all(salida is resultado for salida in salidas)
+    estadisticas = vuelos.estadisticas()
+    assert estadisticas["calculos"] == 1
+    assert estadisticas["compartidos"] == ESPERANDO
+    assert estadisticas["en_curso"] == 0
+
+
+def test_la_excepcion_llega_a_todos():
+    vuelos = SingleFlight(timeout=5)
+    error = ValueError("falló la consulta")
+    hilos, salidas, soltar, llamadas = _en_vuelo(vuelos, "k", error=error)
+    soltar.set()
+    _terminar(hilos)
+
+    assert len(llamadas) == 1
+    assert len(salidas) == ESPERANDO + 1
+    assert all(salida is error for salida in salidas)
+    assert vuelos.estadisticas()["en_curso"] == 0
+
+
+def test_timeout_de_los_que_esperan():
+    vuelos = SingleFlight(timeout=5)
+    hilos, salidas, soltar, llamadas = _en_vuelo(vuelos, "k", resultado=1)
+    vuelos.timeout = 0.05
+    # Los que ya esperan usan el timeout que leyeron; uno nuevo se rinde enseguida
+    inicio = time.monotonic()
+    with pytest.raises(TimeoutError):
+        vuelos.ejecutar("k", lambda: 2)
+    assert time.monotonic() - inicio < 2
+    assert vuelos.estadisticas()["timeouts"] == 1
+
+    soltar.set()
+    _terminar(hilos)
+    assert salidas == [1] * (ESPERANDO + 1)
+
+
+def test_claves_distintas_no_se_agrupan():
+    vuelos = SingleFlight(timeout=5)
+    hilos, salidas, soltar, llamadas = _en_vuelo(vuelos, "k", resultado=1)
+
+    assert vuelos.ejecutar("otra", lambda: 2) == 2
+
+    soltar.set()
+    _terminar(hilos)
+    assert vuelos.estadisticas()["calculos"] == 2
+
+
+def test_al_acabar_se_calcula_de_nuevo():
+    vuelos = SingleFlight(timeout=5)
+    assert vuelos.ejecutar("k", lambda: 1) == 1
+    assert vuelos.ejecutar("k", lambda: 2) == 2
+    with pytest.raises(KeyError):
+        vuelos.ejecutar("k", lambda: {}["x"])
+    assert vuelos.ejecutar("k", lambda: 3) == 3
+
+    estadisticas = vuelos.estadisticas()
+    assert estadisticas["calculos"] == 4
+    assert estadisticas["compartidos"] == 0
+    assert estadisticas["en_curso"] == 0
+
+
+def test_dentro_del_bucle_async_no_agrupa():
+    vuelos = SingleFlight(timeout=5)
+
+    async def pedir():
+        return vuelos.ejecutar("k", lambda: 1)
+
+    assert asyncio.run(pedir()) == 1
+    assert vuelos.estadisticas()["calculos"] == 0
@@ -0,0 +1,170 @@
+# test/test_tramos.py
+#
+# Equivalencia de logica/reservas/tramos.py (arreglos por desplazamiento de
+# día, con y sin NumPy) con el cálculo anterior: dict 'YYYY-MM-DD' ->
+# disponibles recorrido día a día, y la ocupación contada reserva a reserva.
+# No necesita base de datos.
+#
+#   python -m pytest test/test_tramos.py
+
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from logica.reservas import tramos
+
+INICIO = date(2024, 2, 27)  # cruza un 29 de febrero
+
+
+@pytest.fixture(params=["numpy", "python"])
+def motor(request, monkeypatch):
+    """Corre cada test con NumPy (si está instalado) y sin él."""
+    if request.param == "numpy":
+        if tramos.np is None:
+            pytest.skip("NumPy no está instalado")
+    else:
+        monkeypatch.setattr(tramos, "np", None)
+    return request.param
+
+
+def _tramos_anterior(disponibles_por_dia):
+    # Copia de la función anidada que tenía ReservaMuelle.consultar_disponibilidad_por_dias
+    fechas = sorted(disponibles_por_dia.keys())
+    resultado = []
+    inicio = None
+    fin = None
+    min_cupos = None
+
+    for fecha_str in fechas:
+        disponibles = disponibles_por_dia[fecha_str]
+        fecha = datetime.strptime(fecha_str, "%Y-%m-%d").date()
+
+        if disponibles > 0:
+            if inicio is None:
+                inicio = fecha
+                fin = fecha
+                min_cupos = disponibles
+            elif fecha == fin + timedelta(days=1):
+                fin = fecha
+                min_cupos = min(min_cupos, disponibles)
+            else:
+                resultado.append({"inicio": inicio.strftime("%Y-%m-%d"), "fin": fin.strftime("%Y-%m-%d"), "cupos": min_cupos})
+                inicio = fecha
+                fin = fecha
+                min_cupos = disponibles
+        else:
+            if inicio is not None:
+                resultado.append({"inicio": inicio.strftime("%Y-%m-%d"), "fin": fin.strftime("%Y-%m-%d"), "cupos": min_cupos})
+                inicio = None
+                fin = None
+                min_cupos = None
+
+    if inicio is not None:
+        resultado.append({"inicio": inicio.strftime("%Y-%m-%d"), "fin": fin.strftime("%Y-%m-%d"), "cupos": min_cupos})
+
+    if fechas:
+        ultima_fecha = datetime.strptime(fechas[-1], "%Y-%m-%d").date()
+        resultado.append({"inicio_abierta": (ultima_fecha + timedelta(days=1)).strftime("%Y-%m-%d")})
+
+    return resultado
+
+
+def _ocupacion_dia_a_dia(n_dias, desde, hasta):
+    ocupadas = [0] * n_dias
+    for d, h in zip(desde, hasta):
+        for dia in range(d, h):
+            ocupadas[dia] += 1
+    return ocupadas
+
+
+def _estancias(generador, n_dias, n_estancias):
+    desde, hasta = [], []
+    for _ in range(n_estancias):
+        d = generador.randrange(n_dias)
+        desde.append(d)
+        hasta.append(generador.randint(d, n_dias))  # [d, h), puede ser vacía
+    return desde, hasta
+
+
+def _arreglo(valores):
+    arreglo = tramos.arreglo_dias(len(valores))
+    tramos.asignar_por_desplazamiento(arreglo, range(len(valores)), valores)
+    return arreglo
+
+
+CASOS_DISPONIBLES = {
+    "vacio": [],
+    "un_dia_libre": [3],
+    "un_dia_lleno": [0],
+    "todo_libre": [2] * 10,
+    "todo_lleno": [0] * 10,
+    "sobrevendido": [1, -1, 2, 0, 3],
+    "bordes": [0, 1, 1, 0, 0, 4, 2, 0, 5],
+    "libre_al_final": [0, 0, 1, 2],
+}
+
+
+@pytest.mark.parametrize("nombre", sorted(CASOS_DISPONIBLES))
+def test_tramos_casos_como_antes(motor, nombre):
+    disponibles = CASOS_DISPONIBLES[nombre]
+    por_dia = {(INICIO + timedelta(days=n)).strftime("%Y-%m-%d"): v for n, v in enumerate(disponibles)}
+
+    assert tramos.calcular_tramos_con_cupos(INICIO, _arreglo(disponibles)) == _tramos_anterior(por_dia)
+
+
+def test_tramos_aleatorios_como_antes(motor):
+    generador = random.Random(7)
+    for _ in range(200):
+        capacidad = generador.randint(1, 6)
+        n_dias = generador.randint(1, 120)
+        ocupadas = [generador.randint(0, capacidad) for _ in range(n_dias)]
+        por_dia = {(INICIO + timedelta(days=n)).strftime("%Y-%m-%d"): capacidad - o for n, o in enumerate(ocupadas)}
+
+        disponibles = tramos.restar_de(capacidad, _arreglo(ocupadas))
+        assert tramos.calcular_tramos_con_cupos(INICIO, disponibles) == _tramos_anterior(por_dia)
+
+
+def test_restar_de(motor):
+    assert list(tramos.restar_de(5, _arreglo([0, 2, 5, 7]))) == [5, 3, 0, -2]
+
+
+def test_ocupacion_por_barrido_como_dia_a_dia(motor):
+    generador = random.Random(11)
+    for _ in range(200):
+        n_dias = generador.randint(1, 90)
+        desde, hasta = _estancias(generador, n_dias, generador.randint(0, 40))
+
+        ocupadas = tramos.ocupacion_por_barrido(n_dias, desde, hasta)
+        assert list(ocupadas) == _ocupacion_dia_a_dia(n_dias, desde, hasta)
+
+
+def test_ocupacion_por_barrido_sin_estancias(motor):
+    assert list(tramos.ocupacion_por_barrido(4, [], [])) == [0, 0, 0, 0]
+
+
+def test_ocupacion_por_barrido_estancia_hasta_el_final(motor):
+    # 'hasta' exclusivo puede valer n_dias (la estancia llega al último día)
+    assert list(tramos.ocupacion_por_barrido(3, [0, 1, 2], [3, 3, 3])) == [1, 2, 3]
+
+
+def test_huecos_como_fuerza_bruta(motor):
+    generador = random.Random(3)
+    for _ in range(200):
+        disponibles = [generador.randint(-1, 3) for _ in range(generador.randint(1, 60))]
+        duracion = generador.randint(1, 6)
+
+        esperado = []
+        i = 0
+        while i < len(disponibles):
+            if disponibles[i] < 1:
+                i += 1
+                continue
+            j = i
+            while j + 1 < len(disponibles) and disponibles[j + 1] >= 1:
+                j += 1
+            if j - i + 1 >= duracion:
+                esperado.append((i, j, min(disponibles[i:i + duracion])))
+            i = j + 1
+
+        assert tramos.huecos(_arreglo(disponibles), duracion) == esperado
@@ -0,0 +1,89 @@
+# test/test_versiones.py
+#
+# Cache de respuestas por versión (logica/versiones.py, CacheVersionada):
+# acierto solo con la misma versión, expulsión LRU por número de entradas y
+# por bytes, y valores más grandes que la cache que no se guardan.
+# No necesita base de datos.
+#
+#   python -m pytest test/test_versiones.py
+
+from logica.versiones import CacheVersionada, _tamano
+
+VALOR = {"tramos": [{"inicio": "2025-01-01", "fin": "2025-01-09", "cupos": 2}]}
+
+
+def test_acierto_con_la_misma_version():
+    cache = CacheVersionada(max_bytes=10_000, max_entradas=10)
+    cache.guardar("a", 7, VALOR)
+
+    assert cache.obtener("a", 7) is VALOR
+    assert cache.obtener("b", 7) is None
+    assert cache.estadisticas()["aciertos"] == 1
+    assert cache.estadisticas()["fallos"] == 1
+
+
+def test_version_distinta_descarta_la_entrada():
+    cache = CacheVersionada(max_bytes=10_000, max_entradas=10)
+    cache.guardar("a", 7, VALOR)
+
+    assert cache.obtener("a", 8) is None
+    # Ya no está ni con la versión vieja
+    assert cache.obtener("a", 7) is None
+    estadisticas = cache.estadisticas()
+    assert estadisticas["obsoletas"] == 1
+    assert estadisticas["entradas"] == 0
+    assert estadisticas["bytes"] == 0
+
+
+def test_expulsa_la_menos_usada_por_entradas():
+    cache = CacheVersionada(max_bytes=10_000, max_entradas=2)
+    cache.guardar("a", 1, VALOR)
+    cache.guardar("b", 1, VALOR)
+    cache.obtener("a", 1)  # 'a' pasa a ser la más reciente
+    cache.guardar("c", 1, VALOR)
+
+    assert cache.obtener("b", 1) is None
+    assert cache.obtener("a", 1) is VALOR
+    assert cache.obtener("c", 1) is VALOR
+    assert cache.estadisticas()["expulsiones"] == 1
+
+
+def test_expulsa_por_bytes():
+    tamano = _tamano(VALOR)
+    cache = CacheVersionada(max_bytes=2 * tamano + tamano // 2, max_entradas=100)
+    for clave in "abc":
+        cache.guardar(clave, 1, VALOR)
+
+    estadisticas = cache.estadisticas()
+    assert estadisticas["entradas"] == 2
+    assert estadisticas["bytes"] == 2 * tamano
+    assert estadisticas["expulsiones"] == 1
+    assert cache.obtener("a", 1) is None
+
+
+def test_no_guarda_valores_mas_grandes_que_la_cache():
+    cache = CacheVersionada(max_bytes=_tamano(VALOR) - 1, max_entradas=10)
+    cache.guardar("a", 1, VALOR)
+
+    assert cache.estadisticas()["entradas"] == 0
+    assert cache.estadisticas()["expulsiones"] == 0
+
+
+def test_guardar_otra_vez_reemplaza_sin_duplicar_bytes():
+    cache = CacheVersionada(max_bytes=10_000, max_entradas=10)
+    cache.guardar("a", 1, VALOR)
+    cache.guardar("a", 2, VALOR)
+
+    assert cache.estadisticas()["bytes"] == _tamano(VALOR)
+    assert cache.obtener("a", 2) is VALOR
+
+
+def test_invalidar_todo_y_desactivada():
+    cache = CacheVersionada(max_bytes=10_000, max_entradas=10)
+    cache.guardar("a", 1, VALOR)
+    cache.invalidar_todo()
+
+    assert cache.obtener("a", 1) is None
+    assert cache.estadisticas()["bytes"] == 0
+    assert CacheVersionada(max_bytes=0, max_entradas=10).activa is False
+    assert CacheVersionada(max_bytes=10, max_entradas=0).activa is False